@@ -0,0 +1,247 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`asyncio` counterpart of :mod:`ncclient.manager`. Sessions are run by the
+event loop instead of a thread per connection, and operations are coroutines::
+
+    async with await aio.connect_uds("/var/run/netconf.sock") as m:
+        reply = await m.get_config("running")
+"""
+
+import asyncio
+import functools
+import importlib.util
+from contextlib import asynccontextmanager
+
+from ncclient import operations
+from ncclient.manager import (OPERATIONS, make_device_handler, _extract_device_params,
+                              _extract_errors_params, _extract_manager_params,
+                              _extract_nc_params)
+from ncclient.operations.errors import TimeoutExpiredError
+from ncclient.transport.aio import AsyncSSHSession, AsyncTLSSession, AsyncUnixSocketSession
+from ncclient.xml_ import *
+
+
+async def _connect(session_cls, args, kwds, ssh=False):
+    device_params = _extract_device_params(kwds)
+    manager_params = _extract_manager_params(kwds)
+    nc_params = _extract_nc_params(kwds)
+    ignore_errors, raise_mode = _extract_errors_params(kwds)
+    manager_params["raise_mode"] = raise_mode
+
+    device_handler = make_device_handler(device_params, ignore_errors)
+    if ssh:
+        device_handler.add_additional_ssh_connect_params(kwds)
+    device_handler.add_additional_netconf_params(nc_params)
+    session = session_cls(device_handler)
+
+    try:
+        await session.connect(*args, **kwds)
+    except Exception:
+        session.close()
+        raise
+    return AsyncManager(session, device_handler, **manager_params)
+
+
+async def connect_ssh(*args, **kwds):
+    """Initialize an :class:`AsyncManager` over SSH, see
+    :meth:`ncclient.transport.aio.AsyncSSHSession.connect` for the arguments.
+    Needs the `asyncssh` package. The `device_params`, `manager_params`,
+    `nc_params` and `errors_params` are those of :func:`ncclient.manager.connect_ssh`."""
+    if importlib.util.find_spec('asyncssh') is None:
+        raise ValueError("SSH transport for asyncio is not available, install 'asyncssh' package.")
+    return await _connect(AsyncSSHSession, args, kwds, ssh=True)
+
+
+async def connect_tls(*args, **kwds):
+    """Initialize an :class:`AsyncManager` over the TLS transport, see
+    :meth:`ncclient.transport.TLSSession.connect` for the arguments."""
+    return await _connect(AsyncTLSSession, args, kwds)
+
+
+async def connect_uds(*args, **kwds):
+    """Initialize an :class:`AsyncManager` over the Unix Socket transport, see
+    :meth:`ncclient.transport.UnixSocketSession.connect` for the arguments."""
+    return await _connect(AsyncUnixSocketSession, args, kwds)
+
+
+async def connect(*args, **kwds):
+    "Initialize an :class:`AsyncManager` over SSH, see :func:`connect_ssh`."
+    return await connect_ssh(*args, **kwds)
+
+
+class AsyncManager:
+
+    """
+    Like :class:`~ncclient.manager.Manager`, but the operations are coroutines
+    which wait for the reply without blocking the event loop::
+
+        reply = await m.edit_config(config, target="candidate")
+
+    Any number of requests can be in flight on a session at once, e.g. with
+    :func:`asyncio.gather`. AsyncManager instances are also asynchronous
+    context managers, closing the session on exit.
+    """
+
+    HUGE_TREE_DEFAULT = False
+    """Default for `huge_tree` support for XML parsing of RPC replies (defaults to False)"""
+
+    def __init__(self, session, device_handler, timeout=30, raise_mode=operations.RaiseMode.ALL):
+        self._session = session
+        self._timeout = timeout
+        self._raise_mode = raise_mode
+        self._huge_tree = self.HUGE_TREE_DEFAULT
+        self._device_handler = device_handler
+        self._vendor_operations = {}
+        if device_handler:
+            self._vendor_operations.update(device_handler.add_additional_operations())
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close_session()
+        return False
+
+    def __set_timeout(self, timeout):
+        self._timeout = timeout
+
+    def __set_raise_mode(self, mode):
+        assert(mode in (operations.RaiseMode.NONE, operations.RaiseMode.ERRORS, operations.RaiseMode.ALL))
+        self._raise_mode = mode
+
+    def _rpc(self, cls):
+        return cls(self._session,
+                   device_handler=self._device_handler,
+                   async_mode=True,
+                   timeout=self._timeout,
+                   raise_mode=self._raise_mode,
+                   huge_tree=self._huge_tree)
+
+    async def _wait(self, rpc):
+        "Wait for the reply to *rpc*, and return it like a synchronous request does."
+        # not asyncio.wrap_future(): it would call rpc.result() in a callback,
+        # where an RPCError raised for the reply gets lost
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        def set_done():
+            if not done.done():
+                done.set_result(None)
+        rpc.add_done_callback(lambda _: loop.call_soon_threadsafe(set_done))
+        try:
+            await asyncio.wait_for(done, self._timeout)
+        except asyncio.TimeoutError:
+            rpc.cancel()
+            raise TimeoutExpiredError('ncclient timed out while waiting for an rpc reply.')
+        return rpc.result()
+
+    async def execute(self, cls, *args, **kwds):
+        return await self._wait(self._rpc(cls).request(*args, **kwds))
+
+    async def close_session(self):
+        "Request graceful termination of the NETCONF session, and close the transport once replied to."
+        rpc = self._rpc(operations.CloseSession)
+        try:
+            # CloseSession.request() would close the transport right away
+            rpc._request(new_ele("close-session"))
+            return await self._wait(rpc)
+        finally:
+            self._session.close()
+
+    @asynccontextmanager
+    async def locked(self, target):
+        """Returns an asynchronous context manager for a lock on a datastore,
+        where *target* is the name of the configuration datastore to lock, e.g.::
+
+            async with m.locked("running"):
+                # do your stuff
+        """
+        await self.execute(operations.Lock, target)
+        try:
+            yield self
+        finally:
+            await self.execute(operations.Unlock, target)
+
+    def __getattr__(self, method):
+        if method in self._vendor_operations:
+            return functools.partial(self.execute, self._vendor_operations[method])
+        elif method in OPERATIONS:
+            return functools.partial(self.execute, OPERATIONS[method])
+        else:
+            """Parse args/kwargs correctly in order to build XML element"""
+            async def _missing(*args, **kwargs):
+                m = method.replace('_', '-')
+                root = new_ele(m)
+                if args:
+                    for arg in args:
+                        sub_ele(root, arg)
+                return await self.rpc(root)
+            return _missing
+
+    async def take_notification(self, block=True, timeout=None):
+        """Attempt to retrieve one notification from the queue of received
+        notifications, like :meth:`ncclient.manager.Manager.take_notification`."""
+        return await self._session.take_notification_async(block, timeout)
+
+    @property
+    def client_capabilities(self):
+        """:class:`~ncclient.capabilities.Capabilities` object representing
+        the client's capabilities."""
+        return self._session._client_capabilities
+
+    @property
+    def server_capabilities(self):
+        """:class:`~ncclient.capabilities.Capabilities` object representing
+        the server's capabilities."""
+        return self._session._server_capabilities
+
+    @property
+    def session_id(self):
+        """`session-id` assigned by the NETCONF server."""
+        return self._session.id
+
+    @property
+    def connected(self):
+        """Whether currently connected to the NETCONF server."""
+        return self._session.connected
+
+    timeout = property(fget=lambda self: self._timeout, fset=__set_timeout)
+    """Specify the timeout for RPC requests."""
+
+    raise_mode = property(fget=lambda self: self._raise_mode,
+                          fset=__set_raise_mode)
+    """Specify which errors are raised as :exc:`~ncclient.operations.RPCError`
+    exceptions. Valid values are the constants defined in
+    :class:`~ncclient.operations.RaiseMode`.
+    The default value is :attr:`~ncclient.operations.RaiseMode.ALL`."""
+
+    @property
+    def huge_tree(self):
+        """Whether `huge_tree` support for XML parsing of RPC replies is enabled (default=False)
+        The default value is configurable through :attr:`~ncclient.aio.AsyncManager.HUGE_TREE_DEFAULT`"""
+        return self._huge_tree
+
+    @huge_tree.setter
+    def huge_tree(self, x):
+        self._huge_tree = x
+
+    @property
+    def streaming_parse(self):
+        """Whether replies are parsed while they are received instead of
+        once they are complete (default=False),
+        see :attr:`~ncclient.transport.Session.streaming_parse`"""
+        return self._session.streaming_parse
+
+    @streaming_parse.setter
+    def streaming_parse(self, x):
+        self._session.streaming_parse = x
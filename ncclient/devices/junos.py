@@ -22,7 +22,8 @@ from .default import DefaultDeviceHandler
 from ncclient.operations.third_party.juniper.rpc import GetConfiguration, LoadConfiguration, CompareConfiguration
 from ncclient.operations.third_party.juniper.rpc import ExecuteRpc, Command, Reboot, Halt, Commit, Rollback
 from ncclient.operations.rpc import RPCError
-from ncclient.xml_ import to_ele, replace_namespace, BASE_NS_1_0, NETCONF_MONITORING_NS
+from ncclient.xml_ import to_ele, to_xslt, replace_namespace, BASE_NS_1_0, NETCONF_MONITORING_NS
+from ncclient.xml_ import STRIP_NAMESPACES_XSLT
 from ncclient.transport.third_party.junos.parser import JunosXMLParser
 from ncclient.transport.parser import DefaultXMLParser
 from ncclient.transport.parser import SAXParserHandler
@@ -30,6 +31,17 @@ from ncclient.transport.parser import SAXParserHandler
 
 logger = logging.getLogger(__name__)
 
+# Puts every element of an <rpc-error> into the NETCONF base namespace
+ADD_NETCONF_NS_XSLT = b"""
+<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+  <xsl:output indent="yes"/>
+    <xsl:template match="*">
+    <xsl:element name="{local-name()}" namespace="urn:ietf:params:xml:ns:netconf:base:1.0">
+    <xsl:apply-templates select="@*|node()"/>
+    </xsl:element>
+  </xsl:template>
+</xsl:stylesheet>"""
+
 
 class JunosDeviceHandler(DefaultDeviceHandler):
     """
@@ -69,20 +81,10 @@ class JunosDeviceHandler(DefaultDeviceHandler):
                 r'<rpc-error>.*?</rpc-error>', raw, re.M | re.S)
             err_list = []
             if errs:
-                add_ns = """
-                        <xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
-                          <xsl:output indent="yes"/>
-                            <xsl:template match="*">
-                            <xsl:element name="{local-name()}" namespace="urn:ietf:params:xml:ns:netconf:base:1.0">
-                            <xsl:apply-templates select="@*|node()"/>
-                            </xsl:element>
-                          </xsl:template>
-                        </xsl:stylesheet>"""
                 for err in errs:
                     doc = etree.ElementTree(etree.XML(err))
                     # Adding namespace using xslt
-                    xslt = etree.XSLT(etree.XML(add_ns))
-                    transformed_xml = etree.XML(etree.tostring(xslt(doc)))
+                    transformed_xml = to_xslt(ADD_NETCONF_NS_XSLT)(doc).getroot()
                     err_list.append(RPCError(transformed_xml))
                 return RPCError(to_ele("<rpc-reply>"+''.join(errs)+"</rpc-reply>"), err_list)
         else:
@@ -103,29 +105,7 @@ class JunosDeviceHandler(DefaultDeviceHandler):
         return self.__reply_parsing_error_transform_by_cls.get(reply_cls)
 
     def transform_reply(self):
-        reply = '''<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
-        <xsl:output method="xml" indent="no"/>
-
-        <xsl:template match="/|comment()|processing-instruction()">
-            <xsl:copy>
-                <xsl:apply-templates/>
-            </xsl:copy>
-        </xsl:template>
-
-        <xsl:template match="*">
-            <xsl:element name="{local-name()}">
-                <xsl:apply-templates select="@*|node()"/>
-            </xsl:element>
-        </xsl:template>
-
-        <xsl:template match="@*">
-            <xsl:attribute name="{local-name()}">
-                <xsl:value-of select="."/>
-            </xsl:attribute>
-        </xsl:template>
-        </xsl:stylesheet>
-        '''
-        return reply.encode('UTF-8')
+        return STRIP_NAMESPACES_XSLT
 
     def get_xml_parser(self, session):
         # use_filter in device_params can be used to enabled using SAX parsing
@@ -112,6 +112,13 @@ def _extract_nc_params(kwds):
 
     return nc_params
 
+def _extract_reactor(kwds):
+    reactor = kwds.pop("reactor", None)
+    if reactor is True:
+        from ncclient.transport.reactor import get_reactor
+        reactor = get_reactor()
+    return reactor or None
+
 def connect_ssh(*args, **kwds):
     """Initialize a :class:`Manager` over the SSH transport.
     For documentation of arguments see :meth:`ncclient.transport.SSHSession.connect`.
@@ -137,6 +144,14 @@ def connect_ssh(*args, **kwds):
     (e.g. `errors_params={'raise_mode': 0}` for ignoring all RPC errors)
     See :class:`ncclient.operations.rpc.RaiseMode` for valid values of `raise_mode`
 
+    To run the session in a shared I/O thread instead of a thread of its own, add
+    `reactor=True` for the default :class:`~ncclient.transport.reactor.Reactor`, or
+    `reactor=<Reactor instance>`. To parse replies and notifications and call
+    the listeners on a thread pool instead of the I/O thread, add
+    `dispatch_executor=<concurrent.futures.ThreadPoolExecutor instance>`, see
+    :attr:`ncclient.transport.Session.dispatch_executor`. Both also work for
+    :func:`connect_tls` and :func:`connect_uds`.
+
     """
     # Extract device/manager/netconf parameter dictionaries, if they were passed into this function.
     # Remove them from kwds (which should keep only session.connect() parameters).
@@ -145,11 +160,15 @@ def connect_ssh(*args, **kwds):
     nc_params = _extract_nc_params(kwds)
     ignore_errors, raise_mode = _extract_errors_params(kwds)
     manager_params["raise_mode"] = raise_mode
+    reactor = _extract_reactor(kwds)
+    dispatch_executor = kwds.pop("dispatch_executor", None)
 
     device_handler = make_device_handler(device_params, ignore_errors)
     device_handler.add_additional_ssh_connect_params(kwds)
     device_handler.add_additional_netconf_params(nc_params)
     session = transport.SSHSession(device_handler)
+    session.reactor = reactor
+    session.dispatch_executor = dispatch_executor
 
     try:
        session.connect(*args, **kwds)
@@ -185,10 +204,14 @@ def connect_tls(*args, **kwargs):
     nc_params = _extract_nc_params(kwargs)
     ignore_errors, raise_mode = _extract_errors_params(kwargs)
     manager_params["raise_mode"] = raise_mode
+    reactor = _extract_reactor(kwargs)
+    dispatch_executor = kwargs.pop("dispatch_executor", None)
 
     device_handler = make_device_handler(device_params, ignore_errors)
     device_handler.add_additional_netconf_params(nc_params)
     session = transport.TLSSession(device_handler)
+    session.reactor = reactor
+    session.dispatch_executor = dispatch_executor
 
     session.connect(*args, **kwargs)
 
@@ -201,10 +224,14 @@ def connect_uds(*args, **kwargs):
     nc_params = _extract_nc_params(kwargs)
     ignore_errors, raise_mode = _extract_errors_params(kwargs)
     manager_params["raise_mode"] = raise_mode
+    reactor = _extract_reactor(kwargs)
+    dispatch_executor = kwargs.pop("dispatch_executor", None)
 
     device_handler = make_device_handler(device_params, ignore_errors)
     device_handler.add_additional_netconf_params(nc_params)
     session = transport.UnixSocketSession(device_handler)
+    session.reactor = reactor
+    session.dispatch_executor = dispatch_executor
 
     session.connect(*args, **kwargs)
 
@@ -325,6 +352,37 @@ class Manager:
                    raise_mode=self._raise_mode,
                    huge_tree=self._huge_tree).request(*args, **kwds)
 
+    def prepare(self, method, *args, **kwds):
+        """Build and serialize the request of the operation *method* once, for
+        sending it repeatedly, e.g.::
+
+            get_interfaces = m.prepare("get", filter=("subtree", interfaces))
+            while polling:
+                reply = get_interfaces.request()
+
+        *method* is the name of an operation, as used to call it on the
+        manager, and *args* and *kwds* are its arguments. The prepared
+        request uses the current timeout, raise mode, async mode and
+        huge_tree setting of the manager, unless the operation sets its own.
+        Operations that do more than send their request, like
+        `close_session`, cannot be prepared and raise
+        :exc:`~ncclient.operations.OperationError`.
+
+        :rtype: :class:`~ncclient.operations.PreparedRequest`
+        """
+        if method in self._vendor_operations:
+            cls = self._vendor_operations[method]
+        elif method in OPERATIONS:
+            cls = OPERATIONS[method]
+        else:
+            raise ValueError("Unknown operation %r" % method)
+        return operations.PreparedRequest(self._session, self._device_handler, cls,
+                                          args, kwds,
+                                          async_mode=self._async_mode,
+                                          timeout=self._timeout,
+                                          raise_mode=self._raise_mode,
+                                          huge_tree=self._huge_tree)
+
     def locked(self, target):
         """Returns a context manager for a lock on a datastore, where
         *target* is the name of the configuration datastore to lock, e.g.::
@@ -342,6 +400,45 @@ class Manager:
         """
         return operations.LockContext(self._session, self._device_handler, target)
 
+    def batch(self, window=operations.Batch.WINDOW):
+        """Returns a :class:`~ncclient.operations.Batch`, which sends requests
+        without waiting for the replies to the earlier ones, keeping up to
+        *window* in flight, e.g.::
+
+            with m.batch() as batch:
+                for name in names:
+                    batch.get(filter=("xpath", "/interfaces/interface[name='%s']" % name))
+            for name, result in zip(names, batch.results):
+                ...
+
+        Any operation of the manager can be called on the batch. The results
+        are in the order the requests were made, with the exception raised
+        in place of the result of a failed request. The current timeout,
+        raise mode and huge_tree setting of the manager apply.
+        """
+        ops = dict(OPERATIONS)
+        ops.update(self._vendor_operations)
+        return operations.Batch(self._session, self._device_handler, ops, window=window,
+                                timeout=self._timeout, raise_mode=self._raise_mode,
+                                huge_tree=self._huge_tree)
+
+    def transaction(self, lock=True, validate=True):
+        """Returns a :class:`~ncclient.operations.Transaction`, which changes
+        the candidate configuration and commits it with the requests
+        pipelined, e.g.::
+
+            txn = m.transaction()
+            txn.edit_config(config)
+            for step in txn.commit():
+                print(step.name, step.elapsed)
+
+        *lock* is whether to lock the candidate for the duration, *validate*
+        whether to validate it before committing.
+        """
+        return operations.Transaction(self._session, self._device_handler, lock=lock,
+                                      validate=validate, timeout=self._timeout,
+                                      huge_tree=self._huge_tree)
+
     def scp(self):
         return self._session.scp()
 
@@ -413,6 +510,18 @@ class Manager:
         """Whether currently connected to the NETCONF server."""
         return self._session.connected
 
+    @property
+    def expired_requests(self):
+        """Number of requests that were given up on before their reply
+        arrived, see :attr:`~ncclient.transport.Session.expired_requests`."""
+        return self._session.expired_requests
+
+    @property
+    def late_replies(self):
+        """Number of replies that arrived after their request had been given
+        up on, see :attr:`~ncclient.transport.Session.late_replies`."""
+        return self._session.late_replies
+
     async_mode = property(fget=lambda self: self._async_mode,
                           fset=__set_async_mode)
     """Specify whether operations are executed asynchronously (`True`) or
@@ -437,3 +546,14 @@ class Manager:
     @huge_tree.setter
     def huge_tree(self, x):
         self._huge_tree = x
+
+    @property
+    def streaming_parse(self):
+        """Whether replies are parsed while they are received instead of
+        once they are complete (default=False),
+        see :attr:`~ncclient.transport.Session.streaming_parse`"""
+        return self._session.streaming_parse
+
+    @streaming_parse.setter
+    def streaming_parse(self, x):
+        self._session.streaming_parse = x
@@ -13,7 +13,7 @@
 # limitations under the License.
 
 from ncclient.operations.errors import OperationError, TimeoutExpiredError, MissingCapabilityError
-from ncclient.operations.rpc import RPC, RPCReply, RPCError, RaiseMode, GenericRPC
+from ncclient.operations.rpc import RPC, RPCReply, RPCError, RaiseMode, GenericRPC, PreparedRequest
 
 # rfc4741 ops
 
@@ -21,6 +21,8 @@ from ncclient.operations.retrieve import Get, GetConfig, GetSchema, GetReply, Di
 from ncclient.operations.edit import EditConfig, CopyConfig, DeleteConfig, Validate, Commit, DiscardChanges, CancelCommit
 from ncclient.operations.session import CloseSession, KillSession
 from ncclient.operations.lock import Lock, Unlock, LockContext
+from ncclient.operations.transaction import Transaction, TransactionStep
+from ncclient.operations.batch import Batch
 from ncclient.operations.subscribe import CreateSubscription
 
 # others...
@@ -32,6 +34,7 @@ __all__ = [
     'RPCError',
     'RaiseMode',
     'GenericRPC',
+    'PreparedRequest',
     'Get',
     'GetConfig',
     'GetSchema',
@@ -46,6 +49,9 @@ __all__ = [
     'DeleteConfig',
     'Lock',
     'Unlock',
+    'Transaction',
+    'TransactionStep',
+    'Batch',
     'CreateSubscription',
     'PoweroffMachine',
     'RebootMachine',
@@ -0,0 +1,130 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Many requests on a session without waiting for each reply in turn"
+
+import functools
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from ncclient.operations.errors import TimeoutExpiredError
+from ncclient.operations.rpc import RaiseMode
+
+
+class Batch:
+
+    """Sends requests one after the other without waiting for their replies,
+    keeping at most *window* of them in flight. Operations are called on the
+    batch like on the :class:`~ncclient.manager.Manager`, and the results
+    are collected in the order the requests were made::
+
+        with m.batch(window=16) as batch:
+            for path in paths:
+                batch.get(filter=("xpath", path))
+        for result in batch.results:
+            ...
+
+    Each result is what the operation returns in synchronous mode, or the
+    exception it raised instead, e.g. :exc:`~ncclient.operations.RPCError`
+    or :exc:`~ncclient.operations.TimeoutExpiredError`. An exception does not
+    stop the other requests.
+
+    Initialise with (:class:`Session <ncclient.transport.Session>`) instance
+    and a dictionary of the operation classes by name. *timeout*,
+    *raise_mode* and *huge_tree* apply to each request."""
+
+    WINDOW = 32
+    "Default number of requests in flight at once."
+
+    def __init__(self, session, device_handler, operations, window=WINDOW, timeout=30,
+                 raise_mode=RaiseMode.ALL, huge_tree=False):
+        if window < 1:
+            raise ValueError('The window must allow at least one request in flight')
+        self._session = session
+        self._device_handler = device_handler
+        self._operations = operations
+        self._window = window
+        self._timeout = timeout
+        self._raise_mode = raise_mode
+        self._huge_tree = huge_tree
+        self._results = []
+        self._pending = deque() # (index, rpc) in flight, oldest first
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.wait()
+        else:
+            # nobody is going to look at the replies
+            while self._pending:
+                self._pending.popleft()[1].cancel()
+        return False
+
+    def __getattr__(self, method):
+        if method.startswith('_') or method not in self._operations:
+            raise AttributeError("%r object has no attribute %r" % (self.__class__.__name__, method))
+        return functools.partial(self.execute, self._operations[method])
+
+    def execute(self, cls, *args, **kwds):
+        """Send the request of the operation *cls* with *args* and *kwds*,
+        after waiting for the oldest request in flight if the window is
+        full. Returns the :class:`~ncclient.operations.RPC`, or None if the
+        request could not be made."""
+        self._collect(self._window - 1)
+        rpc = None
+        try:
+            rpc = cls(self._session,
+                      device_handler=self._device_handler,
+                      async_mode=True,
+                      timeout=self._timeout,
+                      raise_mode=self._raise_mode,
+                      huge_tree=self._huge_tree)
+            rpc.request(*args, **kwds)
+        except Exception as e:
+            # e.g. a missing capability, nothing has been sent
+            if rpc is not None:
+                rpc.cancel()
+            self._results.append(e)
+            return None
+        self._pending.append((len(self._results), rpc))
+        self._results.append(None)
+        return rpc
+
+    def wait(self):
+        "Wait for the replies to all requests made so far, and return the :attr:`results`."
+        self._collect(0)
+        return list(self._results)
+
+    @property
+    def results(self):
+        """The result of each request in the order they were made, or the
+        exception raised instead. Waits for outstanding replies first."""
+        return self.wait()
+
+    @property
+    def in_flight(self):
+        "Number of requests whose results have not been collected yet."
+        return len(self._pending)
+
+    def _collect(self, keep):
+        "Wait for the oldest requests in flight until no more than *keep* are left."
+        while len(self._pending) > keep:
+            index, rpc = self._pending.popleft()
+            try:
+                self._results[index] = rpc.result(self._timeout)
+            except FutureTimeoutError:
+                rpc.cancel()
+                self._results[index] = TimeoutExpiredError('ncclient timed out while waiting for an rpc reply.')
+            except Exception as e:
+                self._results[index] = e
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from ncclient.xml_ import *
+from ncclient.transport import Priority
 
 from ncclient.operations.rpc import RPC
 
@@ -176,6 +177,8 @@ class CancelCommit(RPC):
 
     DEPENDS = [':candidate', ':confirmed-commit']
 
+    PRIORITY = Priority.HIGH
+
     def request(self, persist_id=None):
         """Cancel an ongoing confirmed commit. Depends on the `:candidate` and `:confirmed-commit` capabilities.
 
@@ -15,6 +15,7 @@
 "Locking-related NETCONF operations"
 
 from ncclient.xml_ import *
+from ncclient.transport import Priority
 
 from ncclient.operations.rpc import RaiseMode, RPC
 
@@ -24,6 +25,7 @@ class Lock(RPC):
 
     "`lock` RPC"
 
+    PRIORITY = Priority.HIGH
 
     def request(self, target="candidate"):
         """Allows the client to lock the configuration system of a device.
@@ -39,6 +41,9 @@ class Unlock(RPC):
 
     "`unlock` RPC"
 
+    # not urgent: overtaking a queued edit-config or discard-changes would
+    # unlock the datastore before it is restored
+
     def request(self, target="candidate"):
         """Release a configuration lock, previously obtained with the lock operation.
 
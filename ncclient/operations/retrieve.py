@@ -52,6 +52,16 @@ class GetReply(RPCReply):
     data = data_ele
     "Same as :attr:`data_ele`"
 
+    def xpath(self, expression, namespaces=None):
+        """Evaluate the XPath *expression* against the *data* element.
+
+        The compiled expression is taken from :data:`~ncclient.xml_.xpath_cache`. *namespaces* is a dict of prefixes added to :data:`~ncclient.xml_.XPATH_NAMESPACES`.
+        """
+        data = self.data_ele
+        if data is None:
+            return []
+        return xpath_cache.get(expression, xpath_namespaces(namespaces))(data)
+
 
 class GetSchemaReply(GetReply):
     """Reply for GetSchema called with specific parsing hook."""
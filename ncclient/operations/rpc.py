@@ -12,12 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from itertools import count
 from threading import Event, Lock, RLock
-from uuid import uuid4
+from time import monotonic
 
 from ncclient.xml_ import *
 from ncclient.logging_ import SessionLoggerAdapter
-from ncclient.transport import SessionListener
+from ncclient.transport import SessionListener, Priority
 from ncclient.operations import util
 from ncclient.operations.errors import OperationError, TimeoutExpiredError, MissingCapabilityError
 
@@ -145,6 +148,7 @@ class RPCReply:
     "Subclasses can specify a different error class, but it should be a subclass of `RPCError`."
 
     def __init__(self, raw, huge_tree=False, parsing_error_transform=None):
+        # bytes as received from the session, or a string
         self._raw = raw
         self._parsing_error_transform = parsing_error_transform
         self._parsed = False
@@ -153,12 +157,14 @@ class RPCReply:
         self._huge_tree = huge_tree
 
     def __repr__(self):
-        return self._raw
+        return self.xml
 
     def parse(self):
         "Parses the *rpc-reply*."
         if self._parsed: return
-        root = self._root = to_ele(self._raw, huge_tree=self._huge_tree) # The <rpc-reply> element
+        if self._root is None:
+            self._root = to_ele(self._raw, huge_tree=self._huge_tree)
+        root = self._root # The <rpc-reply> element
         # Per RFC 4741 an <ok/> tag is sent when there are no errors or warnings
         ok = root.find(qualify("ok"))
         if ok is None:
@@ -188,9 +194,16 @@ class RPCReply:
     def set_parsing_error_transform(self, transform_function):
         self._parsing_error_transform = transform_function
 
+    def set_root(self, root):
+        "Use the already parsed *root* element of the reply instead of parsing the raw reply again."
+        self._root = root
+
     @property
     def xml(self):
         "*rpc-reply* element as returned."
+        if isinstance(self._raw, bytes):
+            # only decoded when asked for
+            self._raw = self._raw.decode('UTF-8')
         return self._raw
 
     @property
@@ -217,6 +230,14 @@ class RPCReply:
 
 class RPCReplyListener(SessionListener): # internal use
 
+    raw_bytes = True
+
+    LATE_IDS_MAX = 1024
+    "How many *message-id*'s of expired RPCs are remembered so that a late reply can be recognized."
+
+    SWEEP_INTERVAL = 1.0
+    "Minimum number of seconds between two sweeps for expired RPCs."
+
     # Use a re-entrant lock so nested/recursive attempts to create the listener
     # (e.g. during teardown while another RPC is in flight) do not deadlock.
     creation_lock = RLock()
@@ -229,18 +250,134 @@ class RPCReplyListener(SessionListener): # internal use
                 instance = object.__new__(cls)
                 instance._lock = Lock()
                 instance._id2rpc = {}
+                instance._sent = set() # ids of the RPCs counted in Session.in_flight
+                instance._session = session
+                instance._ids = count(1)
+                instance._deadlines = {}
+                instance._late_ids = OrderedDict()
+                instance._next_sweep = 0
                 instance._device_handler = device_handler
+                if device_handler.perform_qualify_check():
+                    instance.root_tags = (qualify("rpc-reply"),)
                 #instance._pipelined = session.can_pipeline
                 session.add_listener(instance)
                 instance.logger = SessionLoggerAdapter(logger,
                                                        {'session': session})
             return instance
 
+    def next_id(self):
+        """Allocate the next *message-id* for this session.
+
+        Ids are consecutive integers starting at 1, so they are short on the wire and never repeat
+        for the lifetime of the session. Drawing from :func:`itertools.count` is atomic, so no lock
+        is needed."""
+        return str(next(self._ids))
+
     def register(self, id, rpc):
         with self._lock:
             self._id2rpc[id] = rpc
+        self._maybe_sweep()
+
+    def unregister(self, id):
+        """Forget the RPC with *message-id* *id*, a reply to it is no longer expected. Returns the RPC,
+        or `None` if it was not registered (anymore)."""
+        with self._lock:
+            self._deadlines.pop(id, None)
+            rpc = self._id2rpc.pop(id, None)
+            released = self._unsent(id)
+        if released:
+            self._session._release_request()
+        return rpc
+
+    def sent(self, id):
+        """Count the RPC with *message-id* *id* in the :attr:`~ncclient.transport.Session.in_flight`
+        requests of the session until its reply is delivered or it is given up on."""
+        with self._lock:
+            if id in self._id2rpc:
+                self._sent.add(id)
+                return
+        # given up on already
+        self._session._release_request()
+
+    def _unsent(self, id):
+        # caller holds the lock; whether the RPC was counted in flight
+        if id in self._sent:
+            self._sent.remove(id)
+            return True
+        return False
+
+    def set_deadline(self, id, deadline):
+        """Expire the RPC with *message-id* *id* if no reply was delivered by *deadline*, a
+        :func:`time.monotonic` timestamp, at the first sweep after it. The RPC then fails with
+        :exc:`TimeoutExpiredError`. RPCs without a deadline stay registered until replied to."""
+        with self._lock:
+            if id in self._id2rpc:
+                self._deadlines[id] = deadline
+
+    def expire(self, id):
+        """Stop waiting for a reply to the RPC with *message-id* *id*. If the reply shows up later it
+        is dropped and counted in :attr:`late_replies`."""
+        with self._lock:
+            released = self._expire(id)
+        if released:
+            self._session._release_request()
+
+    def _expire(self, id):
+        # caller holds the lock; returns whether the RPC was counted in flight
+        self._deadlines.pop(id, None)
+        if self._id2rpc.pop(id, None) is not None:
+            self._session._expired_requests += 1
+            self._late_ids[id] = None
+            if len(self._late_ids) > self.LATE_IDS_MAX:
+                self._late_ids.popitem(last=False)
+        return self._unsent(id)
+
+    def sweep(self, now=None):
+        "Expire every RPC whose deadline has passed, returning how many were expired."
+        if now is None:
+            now = monotonic()
+        with self._lock:
+            self._next_sweep = now + self.SWEEP_INTERVAL
+            expired = [(id, self._id2rpc.get(id)) for id, deadline in self._deadlines.items()
+                       if deadline <= now]
+            released = sum(self._expire(id) for id, _ in expired)
+        if released:
+            self._session._release_request(released)
+        if expired:
+            self.logger.debug("Expired %d RPC(s) without reply", len(expired))
+        for _, rpc in expired:
+            if rpc is not None and not rpc.done():
+                # nothing else would complete an asynchronous RPC
+                rpc.deliver_error(TimeoutExpiredError('ncclient timed out while waiting for an rpc reply.'))
+        return len(expired)
+
+    def _maybe_sweep(self):
+        now = monotonic()
+        if self._deadlines and now >= self._next_sweep:
+            self.sweep(now)
+
+    @property
+    def in_flight(self):
+        "Number of RPCs waiting for a reply."
+        return len(self._id2rpc)
+
+    @property
+    def expired(self):
+        "Number of RPCs that were given up on before their reply arrived, see :attr:`~ncclient.transport.Session.expired_requests`."
+        return self._session.expired_requests
+
+    @property
+    def late_replies(self):
+        "Number of replies that arrived after their RPC had expired, see :attr:`~ncclient.transport.Session.late_replies`."
+        return self._session.late_replies
 
     def callback(self, root, raw):
+        self._deliver(root, raw)
+
+    def callback_ele(self, root, raw, ele):
+        self._deliver(root, raw, ele)
+
+    def _deliver(self, root, raw, ele=None):
         tag, attrs = root
         if self._device_handler.perform_qualify_check():
             if tag != qualify("rpc-reply"):
@@ -251,23 +388,40 @@ class RPCReplyListener(SessionListener): # internal use
         else:
             id = attrs["message-id"]  # get the msgid
             with self._lock:
-                try:
-                    rpc = self._id2rpc[id]  # the corresponding rpc
-                    self.logger.debug("Delivering to %r", rpc)
-                    rpc.deliver_reply(raw)
-                except KeyError:
-                    raise OperationError("Unknown 'message-id': %s" % id)
-                # no catching other exceptions, fail loudly if must
-                else:
-                    # if no error delivering, can del the reference to the RPC
-                    del self._id2rpc[id]
+                # the corresponding rpc; taking it out of the table here means the
+                # reply is delivered without holding the lock
+                rpc = self._id2rpc.pop(id, None)
+                if rpc is not None:
+                    self._deadlines.pop(id, None)
+                    released = self._unsent(id)
+                elif id in self._late_ids:
+                    del self._late_ids[id]
+                    self._session._late_replies += 1
+                    self.logger.info("Dropping late reply to expired 'message-id': %s", id)
+                    return
+            if rpc is None:
+                raise OperationError("Unknown 'message-id': %s" % id)
+            if released:
+                self._session._release_request()
+            self.logger.debug("Delivering to %r", rpc)
+            # no catching exceptions, fail loudly if must
+            if ele is None:
+                rpc.deliver_reply(raw)
+            else:
+                rpc.deliver_reply(raw, ele)
+            self._maybe_sweep()
 
     def errback(self, err):
-        try:
-            for rpc in self._id2rpc.values():
-                rpc.deliver_error(err)
-        finally:
+        with self._lock:
+            rpcs = list(self._id2rpc.values())
             self._id2rpc.clear()
+            self._deadlines.clear()
+            released = len(self._sent)
+            self._sent.clear()
+        if released:
+            self._session._release_request(released)
+        for rpc in rpcs:
+            rpc.deliver_error(err)
 
 
 class RaiseMode:
@@ -289,9 +443,14 @@ class RaiseMode:
     "Don't look at the `error-type`, always raise."
 
 
-class RPC:
+class RPC(Future):
+
+    """Base class for all operations, directly corresponding to *rpc* requests. Handles making the request, and taking delivery of the reply.
 
-    """Base class for all operations, directly corresponding to *rpc* requests. Handles making the request, and taking delivery of the reply."""
+    An RPC is a :class:`concurrent.futures.Future` for its reply, so asynchronous requests can be
+    waited on with :func:`concurrent.futures.wait` and :func:`concurrent.futures.as_completed`, and
+    take callbacks with :meth:`add_done_callback`. Callbacks run in the session thread and should not
+    block. See :meth:`result` and :meth:`cancel`."""
 
     DEPENDS = []
     """Subclasses can specify their dependencies on capabilities as a list of URI's or abbreviated names, e.g. ':writable-running'. These are verified at the time of instantiation. If the capability is not available, :exc:`MissingCapabilityError` is raised."""
@@ -299,6 +458,11 @@ class RPC:
     REPLY_CLS = RPCReply
     "By default :class:`RPCReply`. Subclasses can specify a :class:`RPCReply` subclass."
 
+    PRIORITY = Priority.NORMAL
+    "Default :attr:`priority` of the requests. Subclasses for urgent operations specify :attr:`Priority.HIGH <ncclient.transport.Priority.HIGH>`."
+
+    PREPARABLE = True
+    "Whether the request can be sent as a :class:`PreparedRequest`. Subclasses whose `request` does more than building the operation and handing it to :meth:`_request` specify False."
 
     def __init__(self, session, device_handler, async_mode=False, timeout=30, raise_mode=RaiseMode.NONE, huge_tree=False):
         """
@@ -314,6 +478,7 @@ class RPC:
 
         *huge_tree* parse xml with huge_tree support (e.g. for large text config retrieval), see :attr:`huge_tree`
         """
+        Future.__init__(self)
         self._session = session
         try:
             for cap in self.DEPENDS:
@@ -324,11 +489,13 @@ class RPC:
         self._timeout = timeout
         self._raise_mode = raise_mode
         self._huge_tree = huge_tree
-        self._id = uuid4().urn # Keeps things simple instead of having a class attr with running ID that has to be locked
+        self._priority = self.PRIORITY
         self._listener = RPCReplyListener(session, device_handler)
+        self._id = self._listener.next_id()
         self._listener.register(self._id, self)
         self._reply = None
         self._error = None
+        self._result_value = None
         self._event = Event()
         self._device_handler = device_handler
         self.logger = SessionLoggerAdapter(logger, {'session': session})
@@ -339,20 +506,37 @@ class RPC:
         ele = new_ele("rpc", {"message-id": self._id},
                       **self._device_handler.get_xml_extra_prefix_kwargs())
         ele.append(subele)
-        return to_xml(ele)
+        return to_xml_bytes(ele)
 
     def _request(self, op):
         """Implementations of :meth:`request` call this method to send the request and process the reply.
 
         In synchronous mode, blocks until the reply is received and returns :class:`RPCReply`. Depending on the :attr:`raise_mode` a `rpc-error` element in the reply may lead to an :exc:`RPCError` exception.
 
-        In asynchronous mode, returns immediately, returning `self`. The :attr:`event` attribute will be set when the reply has been received (see :attr:`reply`) or an error occured (see :attr:`error`).
+        In asynchronous mode, returns immediately, returning `self`. The :attr:`event` attribute will be set when the reply has been received (see :attr:`reply`) or an error occured (see :attr:`error`), which also completes `self` as a future (see :meth:`result`).
 
         *op* is the operation to be requested as an :class:`~xml.etree.ElementTree.Element`
         """
+        return self._send_request(self._wrap(op))
+
+    def _send_request(self, req):
+        """Send *req*, the complete *rpc* request as bytes, and process the reply like :meth:`_request`."""
         self.logger.info('Requesting %r', self.__class__.__name__)
-        req = self._wrap(op)
-        self._session.send(req)
+        try:
+            # may wait for the session to be below its limits, see Session.flow_policy
+            self._session._acquire_request(len(req), self._timeout, self._priority)
+        except Exception:
+            self._listener.unregister(self._id)
+            raise
+        self._listener.sent(self._id)
+        if self._timeout is not None:
+            # if nobody gets to give up on the reply, the listener will
+            self._listener.set_deadline(self._id, monotonic() + self._timeout)
+        try:
+            self._session.send(req, priority=self._priority)
+        except Exception:
+            self._listener.unregister(self._id)
+            raise
         if self._async:
             self.logger.debug('Async request, returning %r', self)
             return self
@@ -360,27 +544,60 @@ class RPC:
             self.logger.debug('Sync request, will wait for timeout=%r', self._timeout)
             self._event.wait(self._timeout)
             if self._event.is_set():
-                if self._error:
-                    # Error that prevented reply delivery
-                    raise self._error
-                self._reply.parse()
-                if self._reply.error is not None and not self._device_handler.is_rpc_error_exempt(self._reply.error.message):
-                    # <rpc-error>'s [ RPCError ]
-
-                    if self._raise_mode == RaiseMode.ALL or (self._raise_mode == RaiseMode.ERRORS and any(e.severity == "error" for e in self._reply.errors)):
-                        errlist = []
-                        errors = self._reply.errors
-                        if len(errors) > 1:
-                            raise RPCError(to_ele(self._reply._raw), errs=errors)
-                        else:
-                            raise self._reply.error
-                if self._device_handler.transform_reply():
-                    return NCElement(self._reply, self._device_handler.transform_reply(), huge_tree=self._huge_tree)
-                else:
-                    return self._reply
+                return self._process_reply()
             else:
+                self._listener.expire(self._id)
                 raise TimeoutExpiredError('ncclient timed out while waiting for an rpc reply.')
 
+    def _process_reply(self):
+        # internal use; the reply or error has been delivered
+        if self.cancelled():
+            raise CancelledError()
+        if self._error:
+            # Error that prevented reply delivery
+            raise self._error
+        if self._result_value is not None:
+            return self._result_value
+        self._reply.parse()
+        if self._reply.error is not None and not self._device_handler.is_rpc_error_exempt(self._reply.error.message):
+            # <rpc-error>'s [ RPCError ]
+
+            if self._raise_mode == RaiseMode.ALL or (self._raise_mode == RaiseMode.ERRORS and any(e.severity == "error" for e in self._reply.errors)):
+                errlist = []
+                errors = self._reply.errors
+                if len(errors) > 1:
+                    # the reply was parsed already, don't parse it again
+                    raise RPCError(self._reply._root, errs=errors)
+                else:
+                    raise self._reply.error
+        transform_reply = self._device_handler.transform_reply()
+        if transform_reply:
+            self._result_value = NCElement(self._reply, transform_reply, huge_tree=self._huge_tree)
+        else:
+            self._result_value = self._reply
+        return self._result_value
+
+    def result(self, timeout=None):
+        """Wait up to *timeout* seconds for the reply and return it like a synchronous request would.
+
+        The reply is only parsed on the first call, and `rpc-error`'s are raised as :exc:`RPCError`
+        depending on :attr:`raise_mode`. An error that prevented the reply from being received (see
+        :attr:`error`) is raised as is, and :exc:`concurrent.futures.TimeoutError` if the reply did
+        not arrive in time."""
+        Future.result(self, timeout)
+        return self._process_reply()
+
+    def cancel(self):
+        """Stop waiting for the reply: the RPC is removed from the session's reply listener and a reply
+        that still arrives is ignored. Returns `False` if the reply or an error was already
+        delivered."""
+        if self._listener.unregister(self._id) is None:
+            # delivered, being delivered or expired
+            return False
+        cancelled = Future.cancel(self)
+        self._event.set()
+        return cancelled
+
     def request(self):
         """Subclasses must implement this method. Typically only the request needs to be built as an
         :class:`~xml.etree.ElementTree.Element` and everything else can be handed off to
@@ -394,9 +611,11 @@ class RPC:
         if capability not in self._session.server_capabilities:
             raise MissingCapabilityError('Server does not support [%s]' % capability)
 
-    def deliver_reply(self, raw):
+    def deliver_reply(self, raw, ele=None):
         # internal use
         self._reply = self.REPLY_CLS(raw, huge_tree=self._huge_tree)
+        if ele is not None:
+            self._reply.set_root(ele)
 
         # Set the reply_parsing_error transform outside the constructor, to keep compatibility for
         # third party reply classes outside of ncclient
@@ -405,11 +624,13 @@ class RPC:
         )
 
         self._event.set()
+        self.set_result(self._reply)
 
     def deliver_error(self, err):
         # internal use
         self._error = err
         self._event.set()
+        self.set_exception(err)
 
     @property
     def reply(self):
@@ -455,6 +676,10 @@ class RPC:
     def __set_timeout(self, timeout):
         self._timeout = timeout
 
+    def __set_priority(self, priority):
+        assert(priority in (Priority.HIGH, Priority.NORMAL, Priority.LOW))
+        self._priority = priority
+
     raise_mode = property(fget=lambda self: self._raise_mode, fset=__set_raise_mode)
     """Depending on this exception raising mode, an `rpc-error` in the reply may be raised as an :exc:`RPCError` exception. Valid values are the constants defined in :class:`RaiseMode`. """
 
@@ -464,9 +689,12 @@ class RPC:
     timeout = property(fget=lambda self: self._timeout, fset=__set_timeout)
     """Timeout in seconds for synchronous waiting defining how long the RPC request will block on a reply before raising :exc:`TimeoutExpiredError`.
 
-    Irrelevant for asynchronous usage.
+    An asynchronous request fails with :exc:`TimeoutExpiredError` once its reply is this late, when the session next looks for expired requests. None waits for the reply for as long as the session lasts.
     """
 
+    priority = property(fget=lambda self: self._priority, fset=__set_priority)
+    """Priority of the request on its session, one of the constants defined in :class:`~ncclient.transport.Priority`. The request is sent before any of a lower priority that are still queued. By default :attr:`PRIORITY` of the operation."""
+
     @property
     def huge_tree(self):
         """Whether `huge_tree` support for XML parsing of RPC replies is enabled (default=False)"""
@@ -520,3 +748,100 @@ class GenericRPC(RPC):
             node.append(validated_element(config, ("config", qualify("config"))))
 
         return self._request(node)
+
+
+class _RequestBuilt(Exception):
+    # internal use, stops the request() of an operation once it has built
+    # the element to send
+    def __init__(self, op):
+        self.op = op
+
+
+class PreparedRequest:
+
+    """An operation request that is built and serialized once, and can then be sent any number of times.
+
+    Every :meth:`request` only splices a new *message-id* into the serialized request, so repeating the same request, e.g. a `get` with the same filter in a polling loop, costs no XML building or serialization. Use :meth:`~ncclient.manager.Manager.prepare` to create one.
+
+    *cls* is the :class:`RPC` subclass, *args* and *kwds* are passed to its `request` method once to build the operation. The other arguments are the same as for :class:`RPC`. Settings that the `request` method makes, e.g. :attr:`~RPC.huge_tree`, apply to every request.
+
+    Raises :exc:`OperationError` if the operation cannot be prepared, see :attr:`RPC.PREPARABLE`.
+    """
+
+    # state of an RPC that the request method of an operation may set
+    _BUILD_STATE = ('_async', '_timeout', '_raise_mode', '_huge_tree', '_priority')
+
+    def __init__(self, session, device_handler, cls, args=(), kwds=None, async_mode=False, timeout=30, raise_mode=RaiseMode.NONE, huge_tree=False):
+        self._session = session
+        self._device_handler = device_handler
+        self._cls = cls
+        self._async = async_mode
+        self._timeout = timeout
+        self._raise_mode = raise_mode
+        self._huge_tree = huge_tree
+        self._built = {}
+        if not cls.PREPARABLE:
+            raise OperationError("%s cannot be prepared" % cls.__name__)
+        rpc = self._rpc()
+        before = [getattr(rpc, name) for name in self._BUILD_STATE]
+        def built(op):
+            raise _RequestBuilt(op)
+        rpc._request = built
+        try:
+            rpc.request(*args, **(kwds or {}))
+        except _RequestBuilt as e:
+            op = e.op
+        else:
+            raise OperationError("%s did not build a request" % cls.__name__)
+        finally:
+            rpc._listener.unregister(rpc.id)
+        self._built = {name: getattr(rpc, name) for name, value in zip(self._BUILD_STATE, before)
+                       if getattr(rpc, name) != value}
+        data = rpc._wrap(op)
+        id = rpc.id.encode()
+        start = data.index(b'message-id="' + id + b'"') + len(b'message-id="')
+        self._head = data[:start]
+        self._tail = data[start + len(id):]
+
+    def _rpc(self):
+        rpc = self._cls(self._session, self._device_handler,
+                        async_mode=self._async,
+                        timeout=self._timeout,
+                        raise_mode=self._raise_mode,
+                        huge_tree=self._huge_tree)
+        # as the request method of the operation left it
+        for name, value in self._built.items():
+            setattr(rpc, name, value)
+        return rpc
+
+    def request(self):
+        """Send the prepared request with a new *message-id*.
+
+        Returns the same as the `request` method of the operation: the reply in synchronous mode, the :class:`RPC` object in asynchronous mode.
+        """
+        rpc = self._rpc()
+        return rpc._send_request(self._head + rpc.id.encode() + self._tail)
+
+    @property
+    def xml(self):
+        "The serialized request, without a *message-id*."
+        return self._head + self._tail
+
+    def __set_raise_mode(self, mode):
+        assert(mode in (RaiseMode.NONE, RaiseMode.ERRORS, RaiseMode.ALL))
+        self._raise_mode = mode
+
+    def __set_async(self, async_mode=True):
+        self._async = async_mode
+
+    def __set_timeout(self, timeout):
+        self._timeout = timeout
+
+    raise_mode = property(fget=lambda self: self._raise_mode, fset=__set_raise_mode)
+    "Exception raising mode of the requests, see :attr:`RPC.raise_mode`."
+
+    is_async = property(fget=lambda self: self._async, fset=__set_async)
+    "Whether the requests are asynchronous, see :attr:`RPC.is_async`."
+
+    timeout = property(fget=lambda self: self._timeout, fset=__set_timeout)
+    "Timeout of synchronous requests, see :attr:`RPC.timeout`."
@@ -15,6 +15,7 @@
 "Session-related NETCONF operations"
 
 from ncclient.xml_ import *
+from ncclient.transport import Priority
 
 from ncclient.operations.rpc import RPC
 
@@ -22,6 +23,11 @@ class CloseSession(RPC):
 
     "`close-session` RPC. The connection to NETCONF server is also closed."
 
+    PRIORITY = Priority.HIGH
+
+    # the transport is closed after the request
+    PREPARABLE = False
+
     def request(self):
         "Request graceful termination of the NETCONF session, and also close the transport."
         ret = self._request(new_ele("close-session"))
@@ -33,6 +39,8 @@ class KillSession(RPC):
 
     "`kill-session` RPC."
 
+    PRIORITY = Priority.HIGH
+
     def request(self, session_id):
         """Force the termination of a NETCONF session (not the current one!)
 
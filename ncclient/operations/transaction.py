@@ -0,0 +1,215 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Configuration changes of the candidate datastore in as few round trips as possible"
+
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from time import monotonic
+
+from ncclient.logging_ import SessionLoggerAdapter
+from ncclient.operations.edit import EditConfig, Validate, Commit, DiscardChanges
+from ncclient.operations.errors import OperationError, TimeoutExpiredError
+from ncclient.operations.lock import Lock, Unlock
+from ncclient.operations.rpc import RaiseMode
+
+logger = logging.getLogger("ncclient.operations.transaction")
+
+
+class TransactionStep:
+
+    "One request of a :class:`Transaction`, with its reply and how long it took."
+
+    def __init__(self, name, rpc):
+        self.name = name
+        "Name of the operation, e.g. `edit-config`."
+        self.rpc = rpc
+        "The :class:`~ncclient.operations.RPC` of the step."
+        self._sent = None
+        self._done = None
+
+    def __repr__(self):
+        return '<%s %s elapsed=%r>' % (self.__class__.__name__, self.name, self.elapsed)
+
+    def _on_done(self, _):
+        self._done = monotonic()
+
+    @property
+    def reply(self):
+        "The :class:`~ncclient.operations.RPCReply`, or None if none has been received."
+        return self.rpc.reply
+
+    @property
+    def ok(self):
+        "Whether a reply without errors has been received."
+        return self.reply is not None and self.reply.ok
+
+    @property
+    def elapsed(self):
+        "Seconds from sending the request to receiving its reply, or None if no reply has been received."
+        if self._sent is None or self._done is None:
+            return None
+        return self._done - self._sent
+
+
+class Transaction:
+
+    """Changes the candidate configuration and commits it, pipelining the
+    requests that can go to the server back to back::
+
+        txn = m.transaction()
+        txn.edit_config(config1)
+        txn.edit_config(config2, default_operation="replace")
+        txn.commit()
+
+    Once the candidate is locked, the `edit-config` and `validate` requests
+    are sent at once, and the `commit` only once they have all succeeded, so
+    that it never commits the candidate after a failed edit. At last the
+    candidate is unlocked. A change over a link with a round trip time of
+    *t* hence takes about 4*t* instead of 5*t*, or 2*t* without the lock.
+
+    If a step fails, the `commit` is not sent, the changes are discarded
+    with `discard-changes` and the lock is released. If the candidate could
+    not be locked, nothing else is sent, as the changes there are not ours.
+    Then the error is raised. All the requests that were sent are in
+    :attr:`steps`, in order, with their replies and timings.
+
+    Initialise with (:class:`Session <ncclient.transport.Session>`) instance.
+    *lock* is whether to lock the candidate for the duration, *validate*
+    whether to validate it before committing (requires `:validate`), and
+    *timeout* the number of seconds to wait for the replies to a round of
+    requests."""
+
+    def __init__(self, session, device_handler, lock=True, validate=True, timeout=30, huge_tree=False):
+        self._session = session
+        self._device_handler = device_handler
+        self._lock = lock
+        self._validate = validate
+        self._timeout = timeout
+        self._huge_tree = huge_tree
+        self._edits = []
+        self._steps = []
+        self._locked = False
+        self.logger = SessionLoggerAdapter(logger, {'session': session})
+
+    def edit_config(self, config, format='xml', default_operation=None, test_option=None, error_option=None):
+        """Add an `edit-config` of the candidate to the transaction. The
+        arguments are those of :meth:`EditConfig.request
+        <ncclient.operations.EditConfig.request>`. Nothing is sent until
+        :meth:`commit` is called. Returns the transaction."""
+        self._edits.append(dict(config=config, format=format, default_operation=default_operation,
+                                test_option=test_option, error_option=error_option))
+        return self
+
+    def commit(self, confirmed=False, timeout=None, persist=None, persist_id=None):
+        """Send the transaction and commit the changes, with the arguments of
+        :meth:`Commit.request <ncclient.operations.Commit.request>`.
+
+        Returns the list of :class:`TransactionStep`, see :attr:`steps`.
+        Raises the :exc:`~ncclient.operations.RPCError` of the first step
+        that failed, or :exc:`~ncclient.operations.TimeoutExpiredError`, once
+        the candidate is discarded and unlocked."""
+        if self._steps:
+            raise OperationError('The transaction has already been sent')
+        try:
+            if self._lock:
+                # on its own, so that no edit reaches a candidate that is not ours
+                self._round(lambda: self._send('lock', Lock, target='candidate'))
+            self._round(self._prepare)
+            self._round(lambda: self._send('commit', Commit, confirmed=confirmed, timeout=timeout,
+                                           persist=persist, persist_id=persist_id))
+        except Exception:
+            self._abort()
+            raise
+        self._round(self._release)
+        return self.steps
+
+    @property
+    def steps(self):
+        "The :class:`TransactionStep` of each request that was sent, in order."
+        return list(self._steps)
+
+    @property
+    def elapsed(self):
+        "Seconds from sending the first request to receiving the last reply, or None."
+        done = [step._done for step in self._steps if step._done is not None]
+        if not done:
+            return None
+        return max(done) - self._steps[0]._sent
+
+    def _prepare(self):
+        for edit in self._edits:
+            self._send('edit-config', EditConfig, target='candidate', **edit)
+        if self._validate:
+            self._send('validate', Validate, source='candidate')
+
+    def _release(self, discard=False):
+        if not self._locked:
+            if discard and not self._lock:
+                self._send('discard-changes', DiscardChanges)
+            return
+        if discard:
+            self._send('discard-changes', DiscardChanges)
+        self._send('unlock', Unlock, target='candidate')
+
+    def _abort(self):
+        "Leave the candidate as it was and unlock it, ignoring any errors."
+        try:
+            self._round(lambda: self._release(discard=True))
+        except Exception as e:
+            self.logger.warning('Error aborting transaction: %r', e)
+
+    def _send(self, name, cls, **kwds):
+        rpc = cls(self._session, self._device_handler, async_mode=True, timeout=self._timeout,
+                  raise_mode=RaiseMode.ERRORS, huge_tree=self._huge_tree)
+        step = TransactionStep(name, rpc)
+        step._sent = monotonic()
+        rpc.add_done_callback(step._on_done)
+        try:
+            rpc.request(**kwds)
+        except Exception:
+            # not sent, e.g. a missing capability
+            rpc.cancel()
+            raise
+        self._steps.append(step)
+        return step
+
+    def _round(self, send):
+        """Send requests with *send*, then wait for all of their replies.
+        Raises the error of the first request that failed."""
+        start = len(self._steps)
+        try:
+            send()
+        finally:
+            error = self._wait(self._steps[start:])
+        if error is not None:
+            raise error
+
+    def _wait(self, steps):
+        deadline = None if self._timeout is None else monotonic() + self._timeout
+        error = None
+        for step in steps:
+            try:
+                remaining = None if deadline is None else max(0, deadline - monotonic())
+                step.rpc.result(remaining)
+                if step.name == 'lock':
+                    self._locked = True
+                elif step.name == 'unlock':
+                    self._locked = False
+            except FutureTimeoutError:
+                step.rpc.cancel()
+                if error is None:
+                    error = TimeoutExpiredError('ncclient timed out while waiting for the reply to %s.' % step.name)
+            except Exception as e:
+                if error is None:
+                    error = e
+        return error
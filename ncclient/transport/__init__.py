@@ -17,7 +17,7 @@
 import sys
 from importlib.metadata import metadata, PackageNotFoundError
 
-from ncclient.transport.session import Session, SessionListener, NetconfBase
+from ncclient.transport.session import Session, SessionListener, NetconfBase, FlowPolicy, Priority
 from ncclient.transport.errors import *
 
 
@@ -47,7 +47,10 @@ __all__ = [
     'TransportError',
     'AuthenticationError',
     'SessionCloseError',
+    'SessionBusyError',
     'NetconfBase',
+    'FlowPolicy',
+    'Priority',
     'SSHError',
     'SSHUnknownHostError',
     'SSHSession',
@@ -0,0 +1,319 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""NETCONF sessions driven by an :mod:`asyncio` event loop.
+
+The sessions in this module do not run a thread of their own: the event loop
+hands them received data, which goes through the same framing parser and
+listeners as for the threaded transports, and requests are written straight to
+the loop's transport."""
+
+import asyncio
+import logging
+import threading
+
+from ncclient.capabilities import Capabilities
+from ncclient.logging_ import SessionLoggerAdapter
+from ncclient.transport.errors import (SessionBusyError, SessionCloseError, SessionError,
+                                       SSHError, TLSError, TransportError, UnixSocketError)
+from ncclient.transport.notify import Notification
+from ncclient.transport.parser import DefaultXMLParser, ReceiveBuffer
+from ncclient.transport.session import FlowPolicy, HelloHandler, NotificationHandler, Priority, Session
+from ncclient.transport.tls import DEFAULT_TLS_NETCONF_PORT, make_ssl_context
+from ncclient.xml_ import NETCONF_NOTIFICATION_NS, qualify
+
+logger = logging.getLogger("ncclient.transport.aio")
+
+DEFAULT_TIMEOUT = 120
+
+
+class AsyncNotificationHandler(NotificationHandler):
+
+    "Puts received notifications into an :class:`asyncio.Queue`."
+
+    def callback(self, root, raw):
+        tag, _ = root
+        if tag == qualify('notification', NETCONF_NOTIFICATION_NS):
+            self._notification_q.put_nowait(Notification(raw))
+
+
+class AsyncSession(Session, asyncio.Protocol):
+
+    """Base class for sessions run by an :mod:`asyncio` event loop.
+
+    The session is the protocol of the loop's transport. Subclasses implement
+    the coroutine :meth:`connect`, which has to set up the transport and then
+    await :meth:`_post_connect_async`. The session is not a running thread, so
+    :meth:`send` can be called from any thread but listeners are always called
+    in the thread of the event loop. Being a :class:`~ncclient.transport.Session`
+    it is still a :class:`threading.Thread` object, but one that is never
+    started: :meth:`start` raises :exc:`SessionError`.
+
+    Requests cannot wait for the session to be below its
+    :attr:`~ncclient.transport.Session.max_in_flight` or
+    :attr:`~ncclient.transport.Session.max_queued_bytes` without blocking the
+    loop, so they fail right away, see :attr:`FlowPolicy.FAIL
+    <ncclient.transport.session.FlowPolicy.FAIL>`."""
+
+    def __init__(self, device_handler):
+        capabilities = Capabilities(device_handler.get_capabilities())
+        Session.__init__(self, capabilities)
+        self._device_handler = device_handler
+        self._buffer = ReceiveBuffer()
+        self._message_list = []
+        self._transport = None
+        self._loop = None
+        self._loop_thread = None
+        self._closing = False
+        self._notification_q = None # created in the event loop
+        self._flow_policy = FlowPolicy.FAIL
+        self.parser = DefaultXMLParser(self)
+        self.logger = SessionLoggerAdapter(logger, {'session': self})
+
+    # asyncio.Protocol
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._connected = True
+
+    def data_received(self, data):
+        try:
+            self._parse_received(data)
+        except Exception as e:
+            self.logger.debug("Error handling received data, error=%r", e)
+            self._dispatch_error(e)
+            self.close()
+
+    def eof_received(self):
+        # let the transport close itself
+        return False
+
+    def connection_lost(self, exc):
+        self._connected = False
+        if not self._closing:
+            self._closing = True
+            self._dispatch_error(exc or SessionCloseError(self._buffer.getvalue()))
+
+    # Session
+
+    async def connect(self, *args, **kwds): # subclass implements
+        raise NotImplementedError
+
+    async def _post_connect_async(self, timeout=60):
+        "Greeting stuff, like :meth:`Session._post_connect` without blocking the event loop."
+        hello = asyncio.get_running_loop().create_future()
+        def ok_cb(id, capabilities):
+            self._id = id
+            self._server_capabilities = capabilities
+            if not hello.done():
+                hello.set_result(None)
+        def err_cb(err):
+            if not hello.done():
+                hello.set_exception(err)
+        self._notification_q = asyncio.Queue()
+        self.add_listener(AsyncNotificationHandler(self._notification_q))
+        listener = HelloHandler(ok_cb, err_cb)
+        self.add_listener(listener)
+        try:
+            self.send(HelloHandler.build(self._client_capabilities, self._device_handler))
+            # we expect server's hello message, if server doesn't respond in time raise exception
+            try:
+                await asyncio.wait_for(hello, timeout)
+            except asyncio.TimeoutError:
+                raise SessionError("Capability exchange timed out")
+        finally:
+            self.remove_listener(listener)
+        self._negotiate_base()
+
+    def _write(self, data):
+        self.logger.info("Sending:\n%s", data)
+        self._transport.writelines(self._frame(data))
+
+    def send(self, message, timeout=None, priority=Priority.NORMAL):
+        """Send the supplied *message* (xml string or encoded bytes) to NETCONF server.
+        Outside of the event loop's thread the message is handed to the loop.
+
+        Messages are written to the transport right away, so *priority*
+        only exempts those of :attr:`Priority.HIGH` from
+        :attr:`max_queued_bytes`."""
+        if not self.connected:
+            raise TransportError('Not connected to NETCONF server')
+        if isinstance(message, str):
+            message = message.encode()
+        if priority != Priority.HIGH and not self._has_room(len(message)):
+            raise SessionBusyError('%d bytes queued for sending, the maximum is %r'
+                                   % (self.queued_bytes, self._max_queued_bytes))
+        if threading.get_ident() == self._loop_thread:
+            self._write(message)
+        else:
+            self._loop.call_soon_threadsafe(self._write, message)
+
+    def close(self):
+        self._closing = True
+        self._connected = False
+        if self._transport is not None:
+            self._transport.close()
+
+    @property
+    def flow_policy(self):
+        "Always :attr:`FlowPolicy.FAIL <ncclient.transport.session.FlowPolicy.FAIL>`."
+        return self._flow_policy
+
+    @flow_policy.setter
+    def flow_policy(self, policy):
+        if policy != FlowPolicy.FAIL:
+            raise ValueError('Requests on an asyncio session cannot wait for its limits')
+
+    @property
+    def queued_bytes(self):
+        "Number of bytes in the write buffer of the transport."
+        return 0 if self._transport is None else self._transport.get_write_buffer_size()
+
+    def start(self):
+        raise SessionError("%s is run by an asyncio event loop, not a thread"
+                           % self.__class__.__name__)
+
+    async def take_notification_async(self, block=True, timeout=None):
+        "Like :meth:`Session.take_notification`, but waiting does not block the event loop."
+        if not block:
+            try:
+                return self._notification_q.get_nowait()
+            except asyncio.QueueEmpty:
+                return None
+        try:
+            return await asyncio.wait_for(self._notification_q.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class AsyncTLSSession(AsyncSession):
+
+    "Implements a NETCONF session over TLS, see :class:`~ncclient.transport.TLSSession`."
+
+    def __init__(self, device_handler):
+        AsyncSession.__init__(self, device_handler)
+        self._host = None
+
+    async def connect(self, host=None, port=DEFAULT_TLS_NETCONF_PORT, keyfile=None, certfile=None,
+                      ca_certs=None, protocol=None, check_hostname=True,
+                      server_hostname=None, timeout=DEFAULT_TIMEOUT):
+        """Establish NETCONF session via TLS. The parameters are those of
+        :meth:`ncclient.transport.TLSSession.connect`.
+
+        :raise TLSError if the connection can not be established.
+        """
+        if host is None:
+            raise TLSError('Missing host')
+        if certfile is None:
+            raise TLSError('Missing client certificate file')
+        if protocol is None:
+            raise TLSError('Missing TLS protocol')
+        ssl_context = make_ssl_context(certfile, keyfile, ca_certs, protocol,
+                                       check_hostname)
+        try:
+            await asyncio.wait_for(asyncio.get_running_loop().create_connection(
+                lambda: self, host, port, ssl=ssl_context,
+                server_hostname=server_hostname or host), timeout)
+        except Exception:
+            raise TLSError("Could not connect to %s:%s" % (host, port))
+        self._host = host
+        await self._post_connect_async()
+
+    @property
+    def host(self):
+        """Host this session is connected to, or None if not connected."""
+        return self._host
+
+
+class AsyncUnixSocketSession(AsyncSession):
+
+    "Implements a NETCONF session over a Unix socket, see :class:`~ncclient.transport.UnixSocketSession`."
+
+    async def connect(self, path=None, timeout=DEFAULT_TIMEOUT):
+        try:
+            await asyncio.wait_for(asyncio.get_running_loop().create_unix_connection(
+                lambda: self, path), timeout)
+        except Exception:
+            raise UnixSocketError("Could not connect to %s" % path)
+        await self._post_connect_async()
+
+
+class AsyncSSHSession(AsyncSession):
+
+    """Implements a NETCONF session over SSH with the optional `asyncssh`
+    package, which runs SSH connections on the event loop as well.
+
+    An `asyncssh` channel is the transport of the session."""
+
+    def __init__(self, device_handler):
+        AsyncSession.__init__(self, device_handler)
+        self._host = None
+        self._conn = None
+
+    # asyncssh.SSHClientSession
+
+    def data_received(self, data, datatype=None):
+        AsyncSession.data_received(self, data)
+
+    def session_started(self):
+        pass
+
+    async def connect(self, host, port=830, username=None, password=None,
+                      key_filename=None, hostkey_verify=True,
+                      timeout=DEFAULT_TIMEOUT, **kwds):
+        """Establish NETCONF session via SSH.
+
+        :param host: Hostname or IP address to connect to.
+        :param port: Port number, 830 by default.
+        :param username: User to authenticate as, by default the local user.
+        :param password: Password to authenticate with.
+        :param key_filename: Private key file, or list of them, to
+            authenticate with.
+        :param hostkey_verify: If False the host key of the server is not
+            checked against the known hosts.
+        :param timeout: Timeout for establishing the connection.
+
+        Any other keyword arguments are passed on to :func:`asyncssh.connect`.
+
+        :raise SSHError if the connection can not be established.
+        """
+        import asyncssh
+        if key_filename is not None:
+            kwds.setdefault('client_keys', [key_filename]
+                            if isinstance(key_filename, str) else key_filename)
+        if not hostkey_verify:
+            kwds['known_hosts'] = None
+        try:
+            self._conn = await asyncio.wait_for(asyncssh.connect(
+                host, port=port, username=username, password=password, **kwds),
+                timeout)
+            await self._conn.create_session(lambda: self, subsystem='netconf',
+                                            encoding=None)
+        except Exception as e:
+            if self._conn is not None:
+                self._conn.close()
+            raise SSHError("Could not open NETCONF session to %s:%s: %s"
+                           % (host, port, e))
+        self._host = host
+        await self._post_connect_async()
+
+    def close(self):
+        AsyncSession.close(self)
+        if self._conn is not None:
+            self._conn.close()
+
+    @property
+    def host(self):
+        """Host this session is connected to, or None if not connected."""
+        return self._host
@@ -0,0 +1,96 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"Dispatching received messages away from the thread that reads them."
+
+import logging
+from collections import deque
+from threading import Lock
+
+logger = logging.getLogger('ncclient.transport.dispatch')
+
+# how many messages of one session a worker handles before giving other
+# sessions a turn
+DISPATCH_BATCH = 16
+
+
+class OrderedDispatcher:
+
+    """Runs the dispatch of received messages on an
+    :class:`concurrent.futures.Executor`, in the order they were received
+    per session.
+
+    Messages of one session are never handled concurrently: a session has at
+    most one job on the executor, which works through its queued messages,
+    so that any number of sessions can share a few workers. Like in the
+    session thread, an exception while dispatching is reported to the
+    session's listeners and closes the session."""
+
+    def __init__(self, executor):
+        self._executor = executor
+        self._lock = Lock()
+        self._queues = {} # session -> deque of pending calls, while scheduled
+
+    @property
+    def executor(self):
+        "The :class:`concurrent.futures.Executor` running the dispatch."
+        return self._executor
+
+    def submit(self, session, fn, *args):
+        "Call *fn* with *args* for *session* once its earlier calls are done."
+        with self._lock:
+            queue = self._queues.get(session)
+            if queue is not None:
+                queue.append((fn, args))
+                return
+            self._queues[session] = deque([(fn, args)])
+        try:
+            self._executor.submit(self._run, session)
+        except RuntimeError:
+            # the executor has been shut down, dispatch here instead
+            self._run(session)
+        except BaseException:
+            with self._lock:
+                del self._queues[session]
+            raise
+
+    def pending(self, session):
+        "Number of calls for *session* that have not completed yet."
+        with self._lock:
+            queue = self._queues.get(session)
+            return 0 if queue is None else len(queue)
+
+    def _run(self, session):
+        while True:
+            for _ in range(DISPATCH_BATCH):
+                with self._lock:
+                    queue = self._queues[session]
+                    if not queue:
+                        del self._queues[session]
+                        return
+                    fn, args = queue[0]
+                try:
+                    fn(*args)
+                except Exception as e:
+                    session.logger.debug("Error dispatching message, error=%r", e)
+                    session._dispatch_error(e)
+                    session.close()
+                finally:
+                    with self._lock:
+                        queue.popleft()
+            try:
+                # more to do, let other sessions have a turn first
+                self._executor.submit(self._run, session)
+                return
+            except RuntimeError:
+                # the executor is shutting down, finish the queue here
+                pass
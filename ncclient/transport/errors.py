@@ -27,6 +27,9 @@ class AuthenticationError(TransportError):
 class PermissionError(TransportError):
     pass
 
+class SessionBusyError(TransportError):
+    pass
+
 class SessionCloseError(TransportError):
 
     def __init__(self, in_buf, out_buf=None):
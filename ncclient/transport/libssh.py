@@ -4,13 +4,12 @@ import logging
 import os
 import socket
 import threading
-from io import BytesIO as StringIO
 from typing import Any, Callable
 
 from ncclient.capabilities import Capabilities
 from ncclient.logging_ import SessionLoggerAdapter
 from ncclient.transport.errors import AuthenticationError, SSHError, SSHUnknownHostError
-from ncclient.transport.parser import DefaultXMLParser
+from ncclient.transport.parser import DefaultXMLParser, ReceiveBuffer
 from ncclient.transport.session import Session
 from ssh.channel import Channel
 from ssh.exceptions import AuthenticationDenied, ChannelOpenFailure, KeyImportError
@@ -22,7 +21,6 @@ from ssh.session import Session as LSession
 logger = logging.getLogger("ncclient.transport.libssh")
 
 PORT_NETCONF_DEFAULT = 830
-BUF_SIZE = 4096
 
 
 def default_unknown_host_cb(host: str, fingerprint: str) -> bool:
@@ -40,7 +38,7 @@ def default_unknown_host_cb(host: str, fingerprint: str) -> bool:
 
 class LibSSHSession(Session):
 
-    _buffer: StringIO
+    _buffer: ReceiveBuffer
     _channel: Channel | None
     _closing: threading.Event
     _connected: bool
@@ -63,7 +61,7 @@ class LibSSHSession(Session):
         self._socket = None
         self._channel = None
         self._session = None
-        self._buffer = StringIO()
+        self._buffer = ReceiveBuffer()
         self._device_handler = device_handler
         self._message_list = []
         self._closing = threading.Event()
@@ -363,20 +361,33 @@ class LibSSHSession(Session):
         ### Returns:
         - Data read from the transport layer.
         """
-        return self._socket_r.recv(BUF_SIZE)
+        return self._socket_r.recv(self._read_size)
+
+    def _transport_read_into(self, buf) -> int:
+        """
+        Read data from the transport layer straight into a buffer.
+
+        ### Parameters:
+        - buf: Writable memoryview to store the data in.
+
+        ### Returns:
+        - The number of bytes read, 0 if the stream is closed.
+        """
+        return self._socket_r.recv_into(buf)
 
     def _transport_write(self, data: bytes) -> int:
         """
         Write data to the transport layer.
 
         ### Parameters:
-        - data: The data to be sent over the transport layer.
+        - data: The data to be sent over the transport layer, bytes or any other buffer.
 
         ### Returns:
         - The number of bytes written to the transport layer.
         """
         assert self._channel is not None
-        res = self._channel.write(data)
+        # the channel only accepts bytes, not other buffers like memoryview
+        res = self._channel.write(bytes(data))
         return res[0]
 
     def _transport_register(self, selector, event):
@@ -396,6 +407,7 @@ class LibSSHSession(Session):
         assert self._channel is not None
         assert self._socket is not None
         self._closing.set()
+        self._wakeup()
         if not self._channel.is_closed():
             self._channel.close()
         # wait for the transport thread to close.
@@ -25,4 +25,7 @@ class Notification:
 
     @property
     def notification_xml(self):
+        if isinstance(self._raw, bytes):
+            # only decoded when asked for
+            self._raw = self._raw.decode('UTF-8')
         return self._raw
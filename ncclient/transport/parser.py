@@ -22,9 +22,10 @@ try:
 except ImportError:
     import selectors2 as selectors
 
-from io import BytesIO as StringIO
 from xml.sax.handler import ContentHandler
 
+from lxml import etree
+
 from ncclient.transport.errors import NetconfFramingError
 from ncclient.transport.session import NetconfBase
 from ncclient.logging_ import SessionLoggerAdapter
@@ -38,10 +39,11 @@ logger = logging.getLogger("ncclient.transport.parser")
 PORT_NETCONF_DEFAULT = 830
 PORT_SSH_DEFAULT = 22
 
-BUF_SIZE = 4096
 # v1.0: RFC 4742
 MSG_DELIM = "]]>]]>"
 MSG_DELIM_LEN = len(MSG_DELIM)
+MSG_DELIM_BYTES = MSG_DELIM.encode()
+RE_NC10_DELIM_BYTES = re.compile(re.escape(MSG_DELIM_BYTES))
 # v1.1: RFC 6242
 END_DELIM = '\n##\n'
 
@@ -56,13 +58,125 @@ TICK = 0.1
 # * result.group(2) will be defined if '##' found
 #
 RE_NC11_DELIM = re.compile(r'\n(?:#([0-9]+)|(##))\n')
+RE_NC11_DELIM_BYTES = re.compile(br'\n(?:#([0-9]+)|(##))\n')
+# chunk-size is at most 4294967295, i.e. ten digits (RFC 6242, section 4.2)
+NC11_MAX_DELIM_LEN = len('\n#4294967295\n')
+
+# an empty receive buffer holding on to more than this is given back
+RECEIVE_BUFFER_SHRINK_SIZE = 1024 * 1024
 
 def textify(buf):
     return buf.decode('UTF-8')
 
 
+class ReceiveBuffer:
+
+    """Reusable buffer for incoming data of a session.
+
+    Transports fill the buffer in place with :meth:`recv_into`, and the
+    framing parser looks at the unconsumed data through :meth:`getbuffer`
+    and drops whatever it has handled with :meth:`consume`. The backing
+    :class:`bytearray` is only grown when a read does not fit, and is
+    reused from the start once all data has been consumed.
+
+    The file-like methods are a subset of :class:`io.BytesIO`, with all
+    offsets relative to the first unconsumed byte. Data is always
+    appended to the end of the buffer by :meth:`write`.
+    """
+
+    def __init__(self, initial_bytes=b''):
+        self._buf = bytearray(initial_bytes)
+        self._start = 0
+        self._end = len(self._buf)
+        self._pos = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def _reserve(self, size):
+        if len(self._buf) - self._end >= size:
+            return
+        if self._start:
+            del self._buf[:self._start]
+            self._end -= self._start
+            self._start = 0
+        missing = size - (len(self._buf) - self._end)
+        if missing > 0:
+            self._buf.extend(bytes(max(missing, len(self._buf))))
+
+    def recv_into(self, read_into, size):
+        """Let *read_into* fill up to *size* bytes at the end of the buffer.
+
+        :param read_into: callable taking a writable :class:`memoryview`
+            and returning the number of bytes it stored there
+        :param size: maximum number of bytes to read
+        :return: number of bytes read, 0 if the stream is closed
+        """
+        self._reserve(size)
+        view = memoryview(self._buf)[self._end:self._end + size]
+        try:
+            n = read_into(view) or 0
+        finally:
+            view.release()
+        self._end += n
+        self._pos = self._end - self._start
+        return n
+
+    def consume(self, size):
+        """Drop *size* bytes from the start of the buffer."""
+        self._start = min(self._start + size, self._end)
+        if self._start == self._end:
+            self._start = self._end = 0
+            if len(self._buf) > RECEIVE_BUFFER_SHRINK_SIZE:
+                self._buf = bytearray()
+        self._pos = max(self._pos - size, 0)
+
+    def getbuffer(self):
+        """Return a :class:`memoryview` of the unconsumed data. It has to be
+        released before the buffer can be written to again."""
+        return memoryview(self._buf)[self._start:self._end]
+
+    def getvalue(self):
+        with self.getbuffer() as view:
+            return bytes(view)
+
+    def write(self, data):
+        size = len(data)
+        self._reserve(size)
+        self._buf[self._end:self._end + size] = data
+        self._end += size
+        self._pos = self._end - self._start
+        return size
+
+    def read(self, size=-1):
+        start = self._start + self._pos
+        end = self._end if size is None or size < 0 else min(start + size, self._end)
+        self._pos = max(end - self._start, self._pos)
+        with memoryview(self._buf)[start:end] as view:
+            return bytes(view)
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            pos += self._pos
+        elif whence == os.SEEK_END:
+            pos += len(self)
+        self._pos = max(pos, 0)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def truncate(self, size=None):
+        if size is None:
+            size = self._pos
+        self._end = min(self._start + size, self._end)
+        return size
+
+
 class SAXParserHandler(SessionListener):
 
+    raw_bytes = True
+
     def __init__(self, session):
         self._session = session
 
@@ -92,8 +206,81 @@ class DefaultXMLParser:
         """
         self._session = session
         self._parsing_pos10 = 0
+        self._parsing_pos11 = 0
+        self._chunk_start = None
+        self._chunk_size = None
+        # streaming parse state of the message being received
+        self._fed10 = 0
+        self._tree_parser = None
+        self._root_parser = None
+        self._stream_fed = False
+        self._message_root = None
         self.logger = SessionLoggerAdapter(logger, {'session': self._session})
 
+    @property
+    def message_root(self):
+        """Tuple of the qualified name and attribute dictionary of the root
+        element of the message being received, as soon as its start tag has
+        been parsed. Only available if the session parses messages while
+        they are received, see
+        :attr:`~ncclient.transport.Session.streaming_parse`."""
+        return self._message_root
+
+    def _dispatch(self, raw, ele):
+        if ele is None:
+            self._session._dispatch_message(raw)
+        else:
+            self._session._dispatch_message(raw, ele=ele)
+
+    def _stream_feed(self, data, message_start):
+        """Feed part of a message to the incremental parser of the message.
+
+        :param data: bytes of the message received so far
+        :param message_start: True if *data* is the beginning of the message
+        """
+        if self._tree_parser is None:
+            if not (message_start and self._session.streaming_parse):
+                return
+            self._tree_parser = etree.XMLPullParser(events=(), recover=False)
+            self._root_parser = etree.XMLPullParser(events=('start',), recover=False)
+            self._stream_fed = False
+        data = bytes(data)
+        if not self._stream_fed:
+            # an XML declaration is only allowed at the very start
+            data = data.lstrip()
+            if not data:
+                return
+            self._stream_fed = True
+        try:
+            if self._root_parser is not None:
+                self._root_parser.feed(data)
+                for _, ele in self._root_parser.read_events():
+                    self._message_root = (ele.tag, ele.attrib)
+                    self._root_parser = None
+                    break
+            self._tree_parser.feed(data)
+        except etree.XMLSyntaxError as e:
+            # leave the message to the regular dispatch
+            self.logger.debug('streaming parse failed: %s', e)
+            self._tree_parser = self._root_parser = None
+
+    def _stream_end(self):
+        """Finish the incremental parse of the message that has just been
+        received.
+
+        :return: root element of the message, or None if it has not been
+            parsed while it was received
+        """
+        tree_parser = self._tree_parser
+        self._tree_parser = self._root_parser = self._message_root = None
+        if tree_parser is None:
+            return None
+        try:
+            return tree_parser.close()
+        except etree.XMLSyntaxError as e:
+            self.logger.debug('streaming parse failed: %s', e)
+            return None
+
     def parse(self, data):
         """
         parse incoming RPC response from networking device.
@@ -104,43 +291,86 @@ class DefaultXMLParser:
         if data:
             self._session._buffer.seek(0, os.SEEK_END)
             self._session._buffer.write(data)
-            if self._session._base == NetconfBase.BASE_11:
-                self._parse11()
-            else:
-                self._parse10()
+            self._parse_buffer()
+
+    def receive(self, read_into, size):
+        """
+        read incoming RPC response straight into the session buffer and
+        parse it.
+
+        :param read_into: callable filling a writable memoryview, such as
+            the session's `_transport_read_into`
+        :param size: maximum number of bytes to read
+        :return: number of bytes read, 0 if the stream is closed
+        """
+        n = self._session._buffer.recv_into(read_into, size)
+        if n:
+            self._parse_buffer()
+        return n
+
+    def _parse_buffer(self):
+        if self._session._base == NetconfBase.BASE_11:
+            self._parse11()
+        else:
+            self._parse10()
 
     def _parse10(self):
 
         """Messages are delimited by MSG_DELIM. The buffer could have grown by
-        a maximum of BUF_SIZE bytes everytime this method is called. Retains
+        a maximum of the session's read size everytime this method is called. Retains
         state across method calls and if a chunk has been read it will not be
-        considered again."""
+        considered again.
+
+        The delimiter is searched for in the raw bytes of the buffer, starting
+        just before the end of the data that was already scanned, so that a
+        delimiter split over two reads is still found. All complete messages
+        in the buffer are handed out in order and the buffer is compacted once
+        to the data following the last delimiter."""
 
         self.logger.debug("parsing netconf v1.0")
         buf = self._session._buffer
-        buf.seek(self._parsing_pos10)
-        if MSG_DELIM in buf.read().decode('UTF-8'):
-            buf.seek(0)
-            msg, _, remaining = buf.read().decode('UTF-8').partition(MSG_DELIM)
-            msg = msg.strip()
-            self._session._dispatch_message(msg)
-            self._session._buffer = StringIO()
-            self._parsing_pos10 = 0
-            if len(remaining.strip()) > 0:
-                # There could be another entire message in the
-                # buffer, so we should try to parse again.
-                if type(self._session.parser) != DefaultXMLParser:
+        elements = []
+        with buf.getbuffer() as view:
+            data_len = len(view)
+            spans = [m.span() for m in
+                     RE_NC10_DELIM_BYTES.finditer(view, min(self._parsing_pos10, data_len))]
+            if spans:
+                messages = []
+                start = 0
+                for msg_end, delim_end in spans:
+                    message = view[start:msg_end]
+                    self._stream_feed(message[self._fed10:], not self._fed10)
+                    self._fed10 = 0
+                    elements.append(self._stream_end())
+                    messages.append(bytes(message))
+                    message.release()
+                    start = delim_end
+            else:
+                # handle case that MSG_DELIM is split over two chunks
+                self._parsing_pos10 = max(data_len - MSG_DELIM_LEN + 1, 0)
+                if self._parsing_pos10 > self._fed10:
+                    self._stream_feed(view[self._fed10:self._parsing_pos10],
+                                      not self._fed10)
+                    self._fed10 = self._parsing_pos10
+        if not spans:
+            buf.seek(0, os.SEEK_END)
+            return
+
+        buf.consume(start)
+        buf.seek(0, os.SEEK_END)
+        self._parsing_pos10 = 0
+        for i, msg in enumerate(messages):
+            self._dispatch(msg.strip(), elements[i])
+            if type(self._session.parser) != DefaultXMLParser:
+                # Whatever follows this message has to go through the
+                # parser that is now in charge of the session
+                pending = b''.join(m + MSG_DELIM_BYTES for m in messages[i + 1:])
+                remaining = pending + buf.getvalue()
+                self._session._buffer = ReceiveBuffer()
+                if len(remaining.strip()) > 0:
                     self.logger.debug('send remaining data to SAX parser')
-                    self._session.parser.parse(remaining.encode())
-                else:
-                    self.logger.debug('Trying another round of parsing since there is still data')
-                    self._session._buffer.write(remaining.encode())
-                    self._parse10()
-        else:
-            # handle case that MSG_DELIM is split over two chunks
-            self._parsing_pos10 = buf.tell() - MSG_DELIM_LEN
-            if self._parsing_pos10 < 0:
-                self._parsing_pos10 = 0
+                    self._session.parser.parse(remaining)
+                return
 
     def _parse11(self):
 
@@ -150,80 +380,99 @@ class DefaultXMLParser:
         end-of-message delimiter should be found iff there is enough
         data. If there is not enough data, we will wait for more. If a
         delimiter is found in the wrong place, a #NetconfFramingError
-        will be raised."""
+        will be raised.
+
+        Framing works on the raw bytes of the buffer and retains state
+        across method calls: a chunk header is only matched once, and a
+        partially received chunk is not looked at again until enough
+        data for the whole chunk is available. Chunk payloads are kept
+        as bytes and joined once the end of message delimiter is seen,
+        the message is dispatched as bytes."""
 
         self.logger.debug("_parse11: starting")
 
-        # suck in whole string that we have (this is what we will work on in
-        # this function) and initialize a couple of useful values
-        self._session._buffer.seek(0, os.SEEK_SET)
-        data = self._session._buffer.getvalue()
-        data_len = len(data)
-        start = 0
-        self.logger.debug('_parse11: working with buffer of %d bytes', data_len)
-        while True and start < data_len:
-            # match to see if we found at least some kind of delimiter
-            self.logger.debug('_parse11: matching from %d bytes from start of buffer', start)
-            re_result = RE_NC11_DELIM.match(data[start:].decode('utf-8', errors='ignore'))
-            if not re_result:
-
-                # not found any kind of delimiter just break; this should only
-                # ever happen if we just have the first few characters of a
-                # message such that we don't yet have a full delimiter
-                self.logger.debug('_parse11: no delimiter found, buffer="%s"', data[start:].decode())
+        while True:
+            buf = self._session._buffer
+            message = None
+            with buf.getbuffer() as view:
+                data_len = len(view)
+                start = self._parsing_pos11
+                self.logger.debug('_parse11: working with buffer of %d bytes from %d',
+                                  data_len, start)
+                while start < data_len:
+                    if self._chunk_size is not None:
+                        # we have already seen the header for this chunk,
+                        # just check if all of its bytes have arrived
+                        if data_len - start < self._chunk_size:
+                            self.logger.debug('_parse11: not enough data for chunk yet')
+                            break
+                        end = start + self._chunk_size
+                        chunk = bytes(view[start:end])
+                        self._stream_feed(chunk, not self._session._message_list)
+                        self._session._message_list.append(chunk)
+                        self.logger.debug('_parse11: appending %d bytes', self._chunk_size)
+                        self._chunk_start = None
+                        self._chunk_size = None
+                        start = end
+                        continue
+
+                    # match to see if we found at least some kind of delimiter
+                    re_result = RE_NC11_DELIM_BYTES.match(view, start)
+                    if not re_result:
+                        if data_len - start >= NC11_MAX_DELIM_LEN:
+                            # enough data for any delimiter, but no match
+                            raise NetconfFramingError(
+                                '_parse11: delimiter not at start of match buffer',
+                                bytes(view[start:start + NC11_MAX_DELIM_LEN]))
+                        # not found any kind of delimiter just break; this
+                        # should only ever happen if we just have the first
+                        # few characters of a message such that we don't yet
+                        # have a full delimiter
+                        self.logger.debug('_parse11: no delimiter found')
+                        break
+
+                    chunk_size, end_of_message = re_result.group(1), re_result.group(2)
+                    re_end = re_result.end()
+                    del re_result
+                    if end_of_message:
+                        # we've found the end of the message, need to form up
+                        # whole message and dispatch it once the buffer view
+                        # has been released
+                        self.logger.debug('_parse11: found end of message delimiter')
+                        start = re_end
+                        message = b''.join(self._session._message_list)
+                        self._session._message_list = []
+                        element = self._stream_end()
+                        break
+
+                    # we've found a chunk delimiter, and group(1) is the digit
+                    # string that will tell us how many bytes past the end of
+                    # where it was found that we need to have available to
+                    # save the next chunk off
+                    self._chunk_start = start
+                    self._chunk_size = int(chunk_size)
+                    self.logger.debug('_parse11: found chunk delimiter, chunk size %d bytes',
+                                      self._chunk_size)
+                    start = re_end
+
+            # Keep the header of a partially received chunk in the buffer
+            # and drop everything before it
+            keep = self._chunk_start if self._chunk_start is not None else start
+            if keep > 0:
+                self.logger.debug(
+                    '_parse11: saving back rest of message after %d bytes, original size %d',
+                    keep, data_len)
+                buf.consume(keep)
+                start -= keep
+                if self._chunk_start is not None:
+                    self._chunk_start = 0
+            buf.seek(0, os.SEEK_END)
+            self._parsing_pos11 = start
+
+            if message is None:
                 break
-
-            # save useful variables for reuse
-            re_start = re_result.start()
-            re_end = re_result.end()
-            self.logger.debug('_parse11: regular expression start=%d, end=%d', re_start, re_end)
-
-            # If the regex doesn't start at the beginning of the buffer,
-            # we're in trouble, so throw an error
-            if re_start != 0:
-                raise NetconfFramingError('_parse11: delimiter not at start of match buffer', data[start:])
-
-            if re_result.group(2):
-                # we've found the end of the message, need to form up
-                # whole message, save back remainder (if any) to buffer
-                # and dispatch the message
-                start += re_end
-                message = ''.join(self._session._message_list)
-                self._session._message_list = []
-                self.logger.debug('_parse11: found end of message delimiter')
-                self._session._dispatch_message(message)
+            self._dispatch(message, element)
+            if not len(buf):
                 break
-
-            elif re_result.group(1):
-                # we've found a chunk delimiter, and group(1) is the digit
-                # string that will tell us how many bytes past the end of
-                # where it was found that we need to have available to
-                # save the next chunk off
-                self.logger.debug('_parse11: found chunk delimiter')
-                digits = int(re_result.group(1))
-                self.logger.debug('_parse11: chunk size %d bytes', digits)
-                if (data_len-start) >= (re_end + digits):
-                    # we have enough data for the chunk
-                    fragment = textify(data[start+re_end:start+re_end+digits])
-                    self._session._message_list.append(fragment)
-                    start += re_end + digits
-                    self.logger.debug('_parse11: appending %d bytes', digits)
-                    self.logger.debug('_parse11: fragment = "%s"', fragment)
-                else:
-                    # we don't have enough bytes, just break out for now
-                    # after updating start pointer to start of new chunk
-                    start += re_start
-                    self.logger.debug('_parse11: not enough data for chunk yet')
-                    self.logger.debug('_parse11: setting start to %d', start)
-                    break
-
-        # Now out of the loop, need to see if we need to save back any content
-        if start > 0:
-            self.logger.debug(
-                '_parse11: saving back rest of message after %d bytes, original size %d',
-                start, data_len)
-            self._session._buffer = StringIO(data[start:])
-            if start < data_len:
-                self.logger.debug('_parse11: still have data, may have another full message!')
-                self._parse11()
+            self.logger.debug('_parse11: still have data, may have another full message!')
         self.logger.debug('_parse11: ending')
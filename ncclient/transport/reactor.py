@@ -0,0 +1,248 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A single I/O thread running many sessions.
+
+Every :class:`~ncclient.transport.Session` normally runs a thread with a
+selector of its own. Sessions that have a :class:`Reactor` set before
+connecting register their channel or socket with the reactor's selector
+instead, which reads, frames and writes for all of them, and leaves parsing
+and dispatching the received messages to a small pool of workers::
+
+    reactor = Reactor()
+    m = manager.connect(host=host, ..., reactor=reactor)
+"""
+
+import logging
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import selectors
+except ImportError:
+    import selectors2 as selectors
+
+from ncclient.transport.dispatch import OrderedDispatcher
+from ncclient.transport.session import TICK
+
+logger = logging.getLogger('ncclient.transport.reactor')
+
+# default number of threads parsing and dispatching received messages
+DISPATCH_WORKERS = 2
+
+_default_reactor = None
+_default_reactor_lock = threading.Lock()
+
+
+def get_reactor():
+    "Return the reactor shared by all sessions connected with `reactor=True`, starting it if need be."
+    global _default_reactor
+    with _default_reactor_lock:
+        if _default_reactor is None or _default_reactor.stopped:
+            _default_reactor = Reactor()
+        return _default_reactor
+
+
+class Reactor(threading.Thread):
+
+    """Runs the I/O of any number of sessions in one thread.
+
+    *dispatch_workers* is the number of threads that parse the received
+    messages and call the session listeners, in order per session. With 0,
+    messages are dispatched in the reactor thread itself, and a slow
+    listener holds up all sessions. Sessions with a
+    :attr:`~ncclient.transport.Session.dispatch_executor` of their own use
+    that instead.
+
+    The reactor thread starts with the first session registered and keeps
+    running until :meth:`stop` is called."""
+
+    def __init__(self, dispatch_workers=DISPATCH_WORKERS):
+        threading.Thread.__init__(self, daemon=True, name='reactor')
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._woken = set() # sessions to look at in the next round
+        self._sessions = {} # session -> registered channel/socket
+        self._writing = set() # sessions selected for write readiness
+        self._output = set() # sessions with output waiting for the transport
+        self._stopping = False
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        if dispatch_workers:
+            self._dispatcher = OrderedDispatcher(ThreadPoolExecutor(
+                max_workers=dispatch_workers, thread_name_prefix='dispatch'))
+        else:
+            self._dispatcher = None
+
+    def __repr__(self):
+        return '<%s sessions=%d>' % (self.__class__.__name__, len(self._sessions))
+
+    def register(self, session):
+        """Run the I/O of the connected *session* from now on. Called by the
+        session itself instead of starting its own thread."""
+        if session._dispatcher is None:
+            session._dispatcher = self._dispatcher
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError('%r has been stopped' % self)
+            if not self.is_alive():
+                self.start()
+        self.wakeup(session)
+
+    def wakeup(self, session):
+        "Have the reactor look at *session*, e.g. because output has been queued or it is closing."
+        with self._lock:
+            self._woken.add(session)
+        try:
+            self._wakeup_w.send(b'\0')
+        except OSError:
+            # a wakeup is already pending
+            pass
+
+    def stop(self):
+        "Stop the reactor thread. Sessions that are still registered are not closed."
+        with self._lock:
+            self._stopping = True
+        try:
+            self._wakeup_w.send(b'\0')
+        except OSError:
+            pass
+        if self.is_alive() and self is not threading.current_thread():
+            self.join()
+        if self._dispatcher is not None:
+            self._dispatcher.executor.shutdown(wait=False)
+
+    @property
+    def stopped(self):
+        "Whether :meth:`stop` has been called."
+        return self._stopping
+
+    @property
+    def sessions(self):
+        "Number of sessions registered."
+        return len(self._sessions)
+
+    def run(self):
+        selector = self._selector
+        try:
+            while True:
+                # only poll while output waits for a transport that cannot
+                # be selected for writing
+                poll = any(not s._select_writable for s in self._output)
+                events = selector.select(timeout=TICK if poll else None)
+                self._drain_wakeup()
+                with self._lock:
+                    if self._stopping:
+                        break
+                    woken, self._woken = self._woken, set()
+                for session in woken:
+                    self._service(session)
+                for key, mask in events:
+                    session = key.data
+                    if session is None or session not in self._sessions:
+                        continue
+                    try:
+                        if mask & selectors.EVENT_READ and not session._receive():
+                            # End of session, expected
+                            self._unregister(session)
+                            continue
+                        if mask & selectors.EVENT_WRITE:
+                            self._write(session, writable=True)
+                    except Exception as e:
+                        self._fail(session, e)
+                for session in [s for s in self._output if not s._select_writable]:
+                    try:
+                        self._write(session)
+                    except Exception as e:
+                        self._fail(session, e)
+        finally:
+            for session in list(self._sessions):
+                self._unregister(session)
+            selector.close()
+            self._wakeup_r.close()
+            self._wakeup_w.close()
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    def _service(self, session):
+        "Register a new session, send what it has queued, or let it go once it is closing."
+        try:
+            if session._closing.is_set():
+                self._unregister(session)
+                return
+            if session not in self._sessions:
+                self._register(session)
+            if not session._q.empty():
+                session._queue_output()
+            self._write(session)
+        except Exception as e:
+            self._fail(session, e)
+
+    def _register(self, session):
+        fileobj = session._transport_fileobj()
+        try:
+            stale = self._selector.get_key(fileobj).data
+        except KeyError:
+            pass
+        else:
+            # the descriptor of a closed session has been reused
+            self._unregister(stale)
+        self._selector.register(fileobj, selectors.EVENT_READ, session)
+        self._sessions[session] = fileobj
+        session.logger.debug('registered with %r', self)
+
+    def _unregister(self, session):
+        fileobj = self._sessions.pop(session, None)
+        self._output.discard(session)
+        self._writing.discard(session)
+        if fileobj is not None:
+            try:
+                self._selector.unregister(fileobj)
+            except (KeyError, ValueError, OSError):
+                pass
+            session.logger.debug('unregistered from %r', self)
+
+    def _write(self, session, writable=False):
+        "Write output of *session* as far as the transport takes it, and select for writing while some is left."
+        if session not in self._sessions:
+            return
+        if session._out and (writable or not session._select_writable):
+            session._write_output()
+        if session._out:
+            self._output.add(session)
+        else:
+            self._output.discard(session)
+        writing = session._select_writable and bool(session._out)
+        if writing != (session in self._writing):
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self._selector.modify(self._sessions[session], events, session)
+            if writing:
+                self._writing.add(session)
+            else:
+                self._writing.discard(session)
+
+    def _fail(self, session, err):
+        session.logger.debug("Broke out of reactor, error=%r", err)
+        self._unregister(session)
+        session._dispatch_error(err)
+        try:
+            session.close()
+        except Exception as e:
+            session.logger.debug("Error closing session, error=%r", e)
@@ -15,7 +15,11 @@
 
 
 import logging
-from threading import Thread, Lock, Event
+import socket
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from threading import Thread, Condition, Lock, Event
+from time import monotonic
 from queue import Queue, Empty
 
 try:
@@ -27,7 +31,8 @@ import ncclient.transport
 from ncclient.xml_ import *
 from ncclient.capabilities import Capabilities
 from ncclient.logging_ import SessionLoggerAdapter
-from ncclient.transport.errors import TransportError, SessionError, SessionCloseError
+from ncclient.transport.dispatch import OrderedDispatcher
+from ncclient.transport.errors import TransportError, SessionError, SessionCloseError, SessionBusyError
 from ncclient.transport.notify import Notification
 
 logger = logging.getLogger('ncclient.transport.session')
@@ -37,8 +42,26 @@ MSG_DELIM = b"]]>]]>"
 # v1.1: RFC 6242
 END_DELIM = b'\n##\n'
 
+# how often a session polls the transport while it has messages queued but
+# the transport is not ready to send
 TICK = 0.1
 
+# default number of bytes to read from the transport at once
+BUF_SIZE = 65536
+
+# outgoing buffers smaller than this are copied together into one write,
+# larger ones are written as they are
+WRITE_COALESCE_SIZE = 65536
+
+# maximum number of bytes handed to the transport in one write, so that
+# a large message never keeps the session from reading for long
+WRITE_CHUNK_SIZE = 65536
+
+# messages are framed for the transport only while less than this many
+# bytes are waiting to be written, the rest stay in the send queue where
+# messages of a higher priority can still overtake them
+OUTPUT_BUFFER_SIZE = 2 * WRITE_CHUNK_SIZE
+
 
 class NetconfBase:
     '''Netconf Base protocol version'''
@@ -46,46 +69,211 @@ class NetconfBase:
     BASE_11 = 2
 
 
+class FlowPolicy:
+    """
+    What a request does when its session is at one of its limits, see
+    :attr:`Session.max_in_flight` and :attr:`Session.max_queued_bytes`.
+    """
+
+    BLOCK = 0
+    "Wait until the session is below its limits again, for at most the timeout of the request."
+
+    FAIL = 1
+    "Raise :exc:`~ncclient.transport.errors.SessionBusyError` right away."
+
+
+class Priority:
+    """
+    Priority class of an outgoing message, see :meth:`Session.send`.
+    Messages of a higher priority are sent before any of a lower one that
+    are still queued, messages of the same priority in the order they were
+    sent.
+    """
+
+    HIGH = 0
+    "For requests that must not wait behind others, e.g. `close-session`, `cancel-commit` or `lock`."
+
+    NORMAL = 1
+    "The default."
+
+    LOW = 2
+    "For bulk requests that may wait, e.g. a large `get-config`."
+
+
+class SendQueue:
+
+    """The messages sent on a session that are waiting for its I/O thread,
+    in a FIFO per :class:`Priority`. Any thread may :meth:`put`, only the
+    I/O thread takes messages out."""
+
+    def __init__(self):
+        self._queues = tuple(deque() for _ in (Priority.HIGH, Priority.NORMAL, Priority.LOW))
+        self._ready = Condition() # only notified while a get() waits
+        self._waiting = 0
+
+    def put(self, message, priority=Priority.NORMAL):
+        self._queues[priority].append(message)
+        if self._waiting:
+            with self._ready:
+                self._ready.notify()
+
+    def get(self, timeout=None):
+        """Remove and return the oldest message of the highest priority,
+        waiting for at most *timeout* seconds for one to be put. Raises
+        :exc:`queue.Empty` if there is none by then."""
+        try:
+            return self.get_nowait()
+        except Empty:
+            pass
+        deadline = None if timeout is None else monotonic() + timeout
+        with self._ready:
+            # counted before looking again, so that a put() in between notifies
+            self._waiting += 1
+            try:
+                while self.empty():
+                    wait = None if deadline is None else deadline - monotonic()
+                    if wait is not None and wait <= 0:
+                        raise Empty
+                    self._ready.wait(wait)
+            finally:
+                self._waiting -= 1
+        return self.get_nowait()
+
+    def get_nowait(self):
+        "Remove and return the oldest message of the highest priority, raise :exc:`queue.Empty` if there is none."
+        for q in self._queues:
+            if q:
+                return q.popleft()
+        raise Empty
+
+    def empty(self):
+        return not any(self._queues)
+
+    def qsize(self):
+        return sum(len(q) for q in self._queues)
+
+
 class Session(Thread):
 
     "Base class for use by transport protocol implementations."
 
+    # Set by subclasses whose Transport can be registered with a selector
+    # for write readiness. Others are polled with _send_ready().
+    _select_writable = False
+
     def __init__(self, capabilities):
         Thread.__init__(self, daemon=True, name='session')
         self._listeners = set()
+        self._routes = None # listeners by root tag, rebuilt when they change
         self._lock = Lock()
-        self._q = Queue()
+        self._q = SendQueue()
+        self._out = deque() # framed messages not yet written to the Transport
+        self._out_size = 0 # bytes in _out
         self._notification_q = Queue()
         self._client_capabilities = capabilities
         self._server_capabilities = None # yet
         self._base = NetconfBase.BASE_10
         self._id = None # session-id
         self._connected = False # to be set/cleared by subclass implementation
+        self._read_size = BUF_SIZE
+        self._streaming_parse = False
+        self._wakeup_r = None # socket pair used to wake up the main loop,
+        self._wakeup_w = None # created when it starts running
+        self._reactor = None # shared I/O thread running the session instead
+        self._dispatcher = None # dispatches received messages off the I/O thread
+        self._flow_lock = Lock() # guards the flow control state below
+        self._flow = Condition(self._flow_lock) # notified when it changes
+        self._max_in_flight = None
+        self._max_queued_bytes = None
+        self._flow_policy = FlowPolicy.BLOCK
+        self._in_flight = 0 # requests sent and not replied to or given up on
+        self._queued_bytes = 0 # sent but not yet written to the Transport
+        self._expired_requests = 0 # counted by the reply listener
+        self._late_replies = 0
         self.logger = SessionLoggerAdapter(logger, {'session': self})
         self.logger.debug('%r created: client_capabilities=%r',
                           self, self._client_capabilities)
         self._device_handler = None # Should be set by child class
 
-    def _dispatch_message(self, raw):
-        try:
-            root = parse_root(raw)
-        except Exception as e:
-            device_handled_raw=self._device_handler.handle_raw_dispatch(raw)
-            if isinstance(device_handled_raw, str):
-                root = parse_root(device_handled_raw)
-            elif isinstance(device_handled_raw, Exception):
-                self._dispatch_error(device_handled_raw)
-                return
+    def _dispatch_message(self, raw, ele=None):
+        dispatcher = self._dispatcher
+        if dispatcher is not None and self._can_dispatch_later():
+            dispatcher.submit(self, self._route_message, raw, ele)
+        else:
+            self._route_message(raw, ele)
+
+    def _can_dispatch_later(self):
+        """Whether received messages may be dispatched after the I/O thread
+        has moved on. Not while a listener can switch the parser of the
+        session, which has to happen before the next message is framed."""
+        return not any(isinstance(l, ncclient.transport.parser.SAXParserHandler)
+                       for l in self._get_routes()[None])
+
+    def _get_routes(self):
+        """Return the listeners by the root tag of the messages they want,
+        with the listeners of all messages under the key None. Not to be
+        modified: the table is replaced when listeners are added or removed,
+        so that dispatching needs no lock."""
+        routes = self._routes
+        if routes is None:
+            with self._lock:
+                routes = self._routes
+                if routes is None:
+                    routes = self._routes = self._build_routes()
+        return routes
+
+    def _build_routes(self):
+        by_tag = {}
+        any_tag = []
+        for l in self._listeners:
+            if l.root_tags is None:
+                any_tag.append(l)
             else:
-                self.logger.error('error parsing dispatch message: %s', e)
-                return
+                for tag in l.root_tags:
+                    by_tag.setdefault(tag, []).append(l)
+        routes = {tag: tuple(listeners) + tuple(any_tag) for tag, listeners in by_tag.items()}
+        routes[None] = tuple(any_tag)
+        return routes
+
+    def _route_message(self, raw, ele=None):
+        """Hand a received message to the listeners, parsing its root element
+        unless *ele* is the already parsed document."""
+        if ele is not None:
+            # already parsed while it was received
+            root = (ele.tag, ele.attrib)
+        else:
+            try:
+                root = parse_root(raw)
+            except Exception as e:
+                device_handled_raw=self._device_handler.handle_raw_dispatch(
+                    raw.decode('UTF-8') if isinstance(raw, bytes) else raw)
+                if isinstance(device_handled_raw, str):
+                    root = parse_root(device_handled_raw)
+                elif isinstance(device_handled_raw, Exception):
+                    self._dispatch_error(device_handled_raw)
+                    return
+                else:
+                    self.logger.error('error parsing dispatch message: %s', e)
+                    return
         self.logger.debug('dispatching message to different listeners: %s',
                           raw)
-        with self._lock:
-            listeners = list(self._listeners)
+        routes = self._get_routes()
+        listeners = routes.get(root[0], routes[None])
+        text = raw if isinstance(raw, str) else None
         for l in listeners:
             self.logger.debug('dispatching message to listener: %r', l)
-            l.callback(root, raw) # no try-except; fail loudly if you must!
+            if l.raw_bytes:
+                data = raw
+            else:
+                # decode once, and only for listeners that want a string
+                if text is None:
+                    text = raw.decode('UTF-8')
+                data = text
+            # no try-except; fail loudly if you must!
+            if ele is None:
+                l.callback(root, data)
+            else:
+                l.callback_ele(root, data, ele)
 
     def _dispatch_error(self, err):
         with self._lock:
@@ -113,8 +301,12 @@ class Session(Thread):
         listener = HelloHandler(ok_cb, err_cb)
         self.add_listener(listener)
         self.send(HelloHandler.build(self._client_capabilities, self._device_handler))
-        self.logger.debug('starting main loop')
-        self.start()
+        if self._reactor is not None:
+            self.logger.debug('registering with %r', self._reactor)
+            self._reactor.register(self)
+        else:
+            self.logger.debug('starting main loop')
+            self.start()
         # we expect server's hello message, if server doesn't responds in 60 seconds raise exception
         init_event.wait(timeout)
         if not init_event.is_set():
@@ -123,6 +315,10 @@ class Session(Thread):
         self.remove_listener(listener)
         if error[0]:
             raise error[0]
+        self._negotiate_base()
+
+    def _negotiate_base(self):
+        "Select the protocol version for the rest of the session, once the hello messages have been exchanged."
         #if ':base:1.0' not in self.server_capabilities:
         #    raise MissingCapabilityError(':base:1.0')
         if 'urn:ietf:params:netconf:base:1.1' in self._server_capabilities and 'urn:ietf:params:netconf:base:1.1' in self._client_capabilities:
@@ -142,6 +338,7 @@ class Session(Thread):
             raise SessionError("Listener must be a SessionListener type")
         with self._lock:
             self._listeners.add(listener)
+            self._routes = None
 
     def remove_listener(self, listener):
         """Unregister some listener; ignore if the listener was never
@@ -152,6 +349,7 @@ class Session(Thread):
         self.logger.debug('discarding listener %r', listener)
         with self._lock:
             self._listeners.discard(listener)
+            self._routes = None
 
     def get_listener_instance(self, cls):
         """If a listener of the specified type is registered, returns the
@@ -176,12 +374,31 @@ class Session(Thread):
         """
         raise NotImplementedError
 
+    def _transport_read_into(self, buf):
+        """
+        Read data from underlying Transport layer straight into *buf*.
+        Subclasses should override this with a `recv_into` style read
+        where the Transport supports it.
+
+        :param buf: Writable memoryview to store the data in.
+        :return: Number of bytes read, or 0 if the stream is closed.
+        """
+        data = self._transport_read()
+        if not data:
+            return 0
+        buf[:len(data)] = data
+        return len(data)
+
     def _transport_write(self, data):
         """
         Write data into underlying Transport layer, either SSH or TLS, as
         implemented in subclass.
 
-        :param data: Byte string to write.
+        The write should not block for long: writing only part of *data*
+        is fine, and subclasses that set `_select_writable` may raise
+        :exc:`BlockingIOError` if nothing can be written yet.
+
+        :param data: Bytes-like object to write, e.g. a memoryview.
         :return: Number of bytes sent, or 0 if the stream is closed.
         """
         raise NotImplementedError
@@ -196,6 +413,16 @@ class Session(Thread):
         """
         raise NotImplementedError
 
+    def _transport_fileobj(self):
+        """The channel or socket of the Transport that
+        :meth:`_transport_register` registers for selection."""
+        s = selectors.SelectSelector()
+        try:
+            self._transport_register(s, selectors.EVENT_READ)
+            return next(iter(s.get_map().values())).fileobj
+        finally:
+            s.close()
+
     def _send_ready(self):
         """
         Check if Transport layer is ready to send the data. Implemented
@@ -205,59 +432,314 @@ class Session(Thread):
         """
         raise NotImplementedError
 
+    def _wakeup(self):
+        """Wake up the main loop, e.g. because a message has been queued or
+        the session is being closed. Does nothing if the loop is not
+        running."""
+        if self._reactor is not None:
+            self._reactor.wakeup(self)
+            return
+        wakeup_w = self._wakeup_w
+        if wakeup_w is None:
+            return
+        try:
+            wakeup_w.send(b'\0')
+        except OSError:
+            # either a wakeup is already pending or the loop has finished
+            pass
+
+    def _drain_wakeup(self):
+        """Read all pending wakeups.
+
+        :return: True if the main loop has been woken up, False otherwise.
+        """
+        woken = False
+        try:
+            while self._wakeup_r.recv(4096):
+                woken = True
+        except OSError:
+            pass
+        return woken
+
+    def _frame(self, data):
+        """Frame an encoded message for the negotiated protocol version.
+
+        :param data: Byte string of the message.
+        :return: Tuple of buffers to write, the message itself is not copied.
+        """
+        if self._base == NetconfBase.BASE_11:
+            return (b'\n#%i\n' % len(data), data, END_DELIM)
+        return (data, MSG_DELIM)
+
+    def _queue_output(self):
+        """Frame queued messages, highest priority first, and add them to
+        the output that is waiting for the Transport, until that reaches
+        :data:`OUTPUT_BUFFER_SIZE`.
+
+        Small buffers are coalesced, so that a burst of small messages goes
+        out in as few writes as possible, while large messages are written
+        straight from their encoded form."""
+        pending = bytearray()
+        taken = framed = 0
+        while self._out_size + framed < OUTPUT_BUFFER_SIZE:
+            try:
+                data = self._q.get_nowait()
+            except Empty:
+                break
+            taken += len(data)
+            if isinstance(data, str):
+                data = data.encode()
+            self.logger.info("Sending:\n%s", data)
+            for buf in self._frame(data):
+                framed += len(buf)
+                if len(buf) < WRITE_COALESCE_SIZE:
+                    pending += buf
+                    continue
+                if pending:
+                    self._out.append(pending)
+                    pending = bytearray()
+                self._out.append(buf)
+        if pending:
+            self._out.append(pending)
+        self._out_size += framed
+        if taken:
+            with self._flow_lock:
+                self._queued_bytes += framed - taken
+
+    def _write_output(self):
+        """Write pending output to the Transport until it is all written or
+        the Transport would block, framing more queued messages as it goes.
+
+        Partial writes are retried on a :class:`memoryview`, so that the
+        remaining data is never copied. Transports that are selected for
+        write readiness get a single write, the next one waits for the
+        selector again."""
+        out = self._out
+        written = 0
+        try:
+            while True:
+                if self._out_size < OUTPUT_BUFFER_SIZE and not self._q.empty():
+                    self._queue_output()
+                if not out or not (self._select_writable or self._send_ready()):
+                    break
+                view = memoryview(out[0])
+                chunk = view[:WRITE_CHUNK_SIZE]
+                try:
+                    n = self._transport_write(chunk)
+                except BlockingIOError:
+                    break
+                if n <= 0:
+                    raise SessionCloseError(self._buffer.getvalue(), bytes(view))
+                written += n
+                self._out_size -= n
+                if n < len(view):
+                    out[0] = view[n:]
+                else:
+                    out.popleft()
+                if self._select_writable or n < len(chunk):
+                    # the Transport did not take all it was offered, wait until
+                    # it is ready again with the next output framed
+                    if self._out_size < OUTPUT_BUFFER_SIZE and not self._q.empty():
+                        self._queue_output()
+                    break
+        finally:
+            if written:
+                self._written(written)
+
+    def _written(self, n):
+        "Count *n* bytes of queued output as written to the Transport."
+        with self._flow_lock:
+            self._queued_bytes -= n
+            if self._max_queued_bytes is not None:
+                self._flow.notify_all()
+
+    def _select_events(self, events, woken, writing):
+        """Tell from the result of a select() if the Transport is readable
+        or writable.
+
+        :param events: events returned by the selector.
+        :param woken: True if the main loop has been woken up.
+        :param writing: True if the Transport is selected for writing.
+        :return: tuple (readable, writable)
+        """
+        if not writing:
+            # only selected for reading, so anything but a wakeup means
+            # the Transport has data
+            return bool(events) and not (woken and len(events) == 1), False
+        readable = writable = False
+        for key, mask in events:
+            if key.fileobj is not self._wakeup_r:
+                readable = bool(mask & selectors.EVENT_READ)
+                writable = bool(mask & selectors.EVENT_WRITE)
+        return readable, writable
+
     def run(self):
         q = self._q
 
-        def start_delim(data_len):
-            return b'\n#%i\n' % data_len
-
         try:
             s = selectors.DefaultSelector()
             self._transport_register(s, selectors.EVENT_READ)
+            transport = next(iter(s.get_map().values())).fileobj
+            writing = writable = False
+            self._wakeup_r, wakeup_w = socket.socketpair()
+            self._wakeup_r.setblocking(False)
+            wakeup_w.setblocking(False)
+            s.register(self._wakeup_r, selectors.EVENT_READ)
+            # messages queued from now on wake up the selector
+            self._wakeup_w = wakeup_w
             self.logger.debug('selector type = %s', s.__class__.__name__)
             while True:
-                
-                if not q.empty() and self._send_ready():
-                    self.logger.debug("Sending message")
-                    data = q.get().encode()
-                    if self._base == NetconfBase.BASE_11:
-                        data = b"%s%s%s" % (start_delim(len(data)), data, END_DELIM)
-                    else:
-                        data = b"%s%s" % (data, MSG_DELIM)
-                    self.logger.info("Sending:\n%s", data)
-                    while data:
-                        n = self._transport_write(data)
-                        if n <= 0:
-                            raise SessionCloseError(self._buffer.getvalue(), data)
-                        data = data[n:]
-                        
-                events = s.select(timeout=TICK)
-                if events:
-                    data = self._transport_read()
-                    if data:
-                        try:
-                            self.parser.parse(data)
-                        except ncclient.transport.parser.SAXFilterXMLNotFoundError:
-                            self.logger.debug('switching from sax to dom parsing')
-                            self.parser = ncclient.transport.parser.DefaultXMLParser(self)
-                            self.parser.parse(data)
-                    elif self._closing.is_set():
-                        # End of session, expected
-                        break
-                    else:
-                        # End of session, unexpected
-                        raise SessionCloseError(self._buffer.getvalue())
+
+                if not q.empty():
+                    self._queue_output()
+                if self._out and (writable or not self._select_writable):
+                    self.logger.debug("Sending queued messages")
+                    self._write_output()
+
+                if self._select_writable and writing != bool(self._out):
+                    # only ask for write readiness while there is output
+                    writing = bool(self._out)
+                    s.modify(transport, selectors.EVENT_READ |
+                             (selectors.EVENT_WRITE if writing else 0))
+
+                # block until there is something to read or send, only poll
+                # while output waits for a transport that cannot be selected
+                # for writing
+                poll = self._out and not self._select_writable
+                events = s.select(timeout=TICK if poll else None)
+                woken = self._drain_wakeup()
+                if woken and self._closing.is_set():
+                    # End of session, expected
+                    break
+                readable, writable = self._select_events(events, woken, writing)
+                if readable and not self._receive():
+                    # End of session, expected
+                    break
         except Exception as e:
             self.logger.debug("Broke out of main loop, error=%r", e)
             self._dispatch_error(e)
             self.close()
+        finally:
+            self._close_wakeup()
+
+    def _receive(self):
+        """Read what the Transport has received and parse it.
 
-    def send(self, message):
-        """Send the supplied *message* (xml string) to NETCONF server."""
+        :return: False at the expected end of the session
+        :raise SessionCloseError: if the session ended unexpectedly
+        """
+        try:
+            if type(self.parser) == ncclient.transport.parser.DefaultXMLParser:
+                # read straight into the receive buffer
+                data = self.parser.receive(self._transport_read_into, self._read_size)
+            else:
+                data = self._transport_read()
+                if data:
+                    self._parse_received(data)
+        except BlockingIOError:
+            # nothing to read after all, e.g. a TLS record is incomplete
+            return True
+        if not data:
+            if self._closing.is_set():
+                return False
+            raise SessionCloseError(self._buffer.getvalue())
+        return True
+
+    def _parse_received(self, data):
+        "Hand *data* received from the Transport to the parser in charge of the session."
+        try:
+            self.parser.parse(data)
+        except ncclient.transport.parser.SAXFilterXMLNotFoundError:
+            self.logger.debug('switching from sax to dom parsing')
+            self.parser = ncclient.transport.parser.DefaultXMLParser(self)
+            self.parser.parse(data)
+
+    def _close_wakeup(self):
+        wakeup_r, wakeup_w = self._wakeup_r, self._wakeup_w
+        self._wakeup_r = self._wakeup_w = None
+        for sock in (wakeup_r, wakeup_w):
+            if sock is not None:
+                sock.close()
+
+    def send(self, message, timeout=None, priority=Priority.NORMAL):
+        """Send the supplied *message* (xml string or encoded bytes) to NETCONF server.
+
+        *priority* is one of the constants defined in :class:`Priority`, the
+        message goes out before any of a lower priority that are still
+        queued. Output that the session has already handed to the transport
+        is not overtaken.
+
+        If :attr:`max_queued_bytes` would be exceeded, waits for at most
+        *timeout* seconds or fails according to the :attr:`flow_policy`.
+        Messages of :attr:`Priority.HIGH` never wait, they are only counted."""
+        if priority not in (Priority.HIGH, Priority.NORMAL, Priority.LOW):
+            raise ValueError('Unknown priority %r' % priority)
         if not self.connected:
             raise TransportError('Not connected to NETCONF server')
+        size = len(message)
+        with self._flow_lock:
+            if (self._max_queued_bytes is not None and priority != Priority.HIGH
+                    and not self._wait_flow(lambda: self._has_room(size), timeout)):
+                raise SessionBusyError('%d bytes queued for sending, the maximum is %r'
+                                       % (self._queued_bytes, self._max_queued_bytes))
+            self._queued_bytes += size
         self.logger.debug('queueing %s', message)
-        self._q.put(message)
+        self._q.put(message, priority)
+        self._wakeup()
+
+    def _has_room(self, size):
+        # a message larger than the limit still goes out on its own
+        limit = self._max_queued_bytes
+        if limit is None:
+            return True
+        queued = self.queued_bytes
+        return not queued or queued + size <= limit
+
+    def _acquire_request(self, size, timeout=None, priority=Priority.NORMAL):
+        """Count a request of *size* bytes as in flight before it is sent.
+        While :attr:`max_in_flight` requests are, or there is no room for it
+        in :attr:`max_queued_bytes`, waits for at most *timeout* seconds or
+        fails according to the :attr:`flow_policy`, unless the request is of
+        :attr:`Priority.HIGH`."""
+        with self._flow_lock:
+            if priority != Priority.HIGH:
+                if self._max_in_flight is not None and not self._wait_flow(
+                        lambda: self._max_in_flight is None or self._in_flight < self._max_in_flight,
+                        timeout):
+                    raise SessionBusyError('%d requests in flight, the maximum is %r'
+                                           % (self._in_flight, self._max_in_flight))
+                if self._max_queued_bytes is not None and not self._wait_flow(
+                        lambda: self._has_room(size), timeout):
+                    raise SessionBusyError('%d bytes queued for sending, the maximum is %r'
+                                           % (self._queued_bytes, self._max_queued_bytes))
+            self._in_flight += 1
+
+    def _release_request(self, n=1):
+        "Count *n* requests as no longer in flight, as their replies arrived or they were given up on."
+        with self._flow_lock:
+            self._in_flight -= n
+            if self._max_in_flight is not None:
+                self._flow.notify_all()
+
+    def _wait_flow(self, ready, timeout):
+        """Wait until *ready()* holds, with :attr:`_flow_lock` held. Returns False
+        if it does not according to the :attr:`flow_policy`. Returns True
+        right away once the session is disconnected, so that the request
+        fails with that instead."""
+        if ready():
+            return True
+        if self._flow_policy == FlowPolicy.FAIL:
+            return False
+        deadline = None if timeout is None else monotonic() + timeout
+        while not ready():
+            if not self.connected:
+                return True
+            # check for the session closing every TICK
+            wait = TICK if deadline is None else min(TICK, deadline - monotonic())
+            if wait <= 0:
+                return False
+            self._flow.wait(wait)
+        return True
 
     def scp(self):
         raise NotImplementedError
@@ -284,6 +766,142 @@ class Session(Thread):
         "Server's :class:`Capabilities`"
         return self._server_capabilities
 
+    @property
+    def read_size(self):
+        """Maximum number of bytes read from the transport at once, by
+        default 64 KiB. Larger reads mean fewer system calls for bulk
+        replies."""
+        return self._read_size
+
+    @read_size.setter
+    def read_size(self, size):
+        if size <= 0:
+            raise ValueError('read_size must be a positive number of bytes')
+        self._read_size = size
+
+    @property
+    def streaming_parse(self):
+        """Whether incoming messages are parsed into an element tree while
+        they are received, instead of once they are complete (default
+        False). Listeners are then handed the parsed tree, see
+        :meth:`SessionListener.callback_ele`. Messages that cannot be parsed
+        this way are dispatched as before. Changes take effect from the
+        next message."""
+        return self._streaming_parse
+
+    @streaming_parse.setter
+    def streaming_parse(self, enabled):
+        self._streaming_parse = bool(enabled)
+
+    @property
+    def reactor(self):
+        """The :class:`~ncclient.transport.reactor.Reactor` running this
+        session in its shared I/O thread, or None if the session runs a
+        thread of its own (the default). Has to be set before connecting."""
+        return self._reactor
+
+    @reactor.setter
+    def reactor(self, reactor):
+        if self._connected:
+            raise SessionError('The reactor of a connected session cannot be changed')
+        self._reactor = reactor
+
+    @property
+    def dispatch_executor(self):
+        """The :class:`concurrent.futures.Executor` that parses received
+        messages and calls the listeners, e.g. to build replies and
+        notifications, or None if the I/O thread does so itself (the default,
+        unless the session runs in a :attr:`reactor`). The I/O thread then
+        only frames messages, and a slow listener does not hold up reading.
+        Messages are still dispatched in the order they were received. Has to
+        be set before connecting.
+
+        Listeners act on objects of this process, so the executor cannot be a
+        :class:`~concurrent.futures.ProcessPoolExecutor`. With
+        :attr:`streaming_parse`, messages are parsed while they are received,
+        in the I/O thread."""
+        return None if self._dispatcher is None else self._dispatcher.executor
+
+    @dispatch_executor.setter
+    def dispatch_executor(self, executor):
+        if self._connected:
+            raise SessionError('The dispatch executor of a connected session cannot be changed')
+        if isinstance(executor, ProcessPoolExecutor):
+            raise ValueError('Listeners cannot be called in another process')
+        self._dispatcher = None if executor is None else OrderedDispatcher(executor)
+
+    @property
+    def max_in_flight(self):
+        """Maximum number of requests sent on the session that are waiting
+        for a reply, or None for no limit (the default). Further requests
+        wait or fail according to the :attr:`flow_policy`, except those of
+        :attr:`Priority.HIGH`."""
+        return self._max_in_flight
+
+    @max_in_flight.setter
+    def max_in_flight(self, n):
+        if n is not None and n < 1:
+            raise ValueError('max_in_flight must be at least 1')
+        with self._flow_lock:
+            self._max_in_flight = n
+            self._flow.notify_all()
+
+    @property
+    def max_queued_bytes(self):
+        """Maximum number of bytes sent on the session that have not been
+        written to the transport yet, or None for no limit (the default).
+        Further messages wait or fail according to the :attr:`flow_policy`,
+        but a larger message is always sent once nothing else is queued."""
+        return self._max_queued_bytes
+
+    @max_queued_bytes.setter
+    def max_queued_bytes(self, size):
+        if size is not None and size < 1:
+            raise ValueError('max_queued_bytes must be a positive number of bytes')
+        with self._flow_lock:
+            self._max_queued_bytes = size
+            self._flow.notify_all()
+
+    @property
+    def flow_policy(self):
+        """What a request does when the session is at its :attr:`max_in_flight`
+        or :attr:`max_queued_bytes`, one of the constants defined in
+        :class:`FlowPolicy`. The default is :attr:`FlowPolicy.BLOCK`."""
+        return self._flow_policy
+
+    @flow_policy.setter
+    def flow_policy(self, policy):
+        if policy not in (FlowPolicy.BLOCK, FlowPolicy.FAIL):
+            raise ValueError('Unknown flow policy %r' % policy)
+        with self._flow_lock:
+            self._flow_policy = policy
+            self._flow.notify_all()
+
+    @property
+    def in_flight(self):
+        "Number of requests sent that are waiting for a reply."
+        return self._in_flight
+
+    @property
+    def queued_bytes(self):
+        "Number of bytes sent that have not been written to the transport yet."
+        return self._queued_bytes
+
+    @property
+    def expired_requests(self):
+        "Number of requests that were given up on before their reply arrived."
+        return self._expired_requests
+
+    @property
+    def late_replies(self):
+        "Number of replies that arrived after their request had been given up on, and were dropped."
+        return self._late_replies
+
+    @property
+    def queue_depth(self):
+        "Number of messages sent that the I/O thread has not taken up yet."
+        return self._q.qsize()
+
     @property
     def id(self):
         """A string representing the `session-id`. If the session has not been initialized it will be `None`"""
@@ -299,6 +917,14 @@ class SessionListener:
         Avoid time-intensive tasks in a callback's context.
     """
 
+    raw_bytes = False
+    "If True, the *raw* document passed to the callbacks is the bytes received instead of a string."
+
+    root_tags = None
+    """Qualified names of the root elements of the documents the listener is
+    called for, or None for all documents. Read when the listener is added
+    to a session."""
+
     def callback(self, root, raw):
         """Called when a new XML document is received. The *root* argument allows the callback to determine whether it wants to further process the document.
 
@@ -308,6 +934,16 @@ class SessionListener:
         """
         raise NotImplementedError
 
+    def callback_ele(self, root, raw, ele):
+        """Called instead of :meth:`callback` for an XML document that the
+        session has already parsed, see :attr:`Session.streaming_parse`.
+
+        *root* and *raw* are the same as for :meth:`callback`, *ele* is the
+        root :class:`~lxml.etree._Element` of the document. By default this
+        calls :meth:`callback`.
+        """
+        self.callback(root, raw)
+
     def errback(self, ex):
         """Called when an error occurs.
 
@@ -318,6 +954,9 @@ class SessionListener:
 
 class HelloHandler(SessionListener):
 
+    raw_bytes = True
+    root_tags = (qualify("hello"), "hello")
+
     def __init__(self, init_cb, error_cb):
         self._init_cb = init_cb
         self._error_cb = error_cb
@@ -366,6 +1005,10 @@ class HelloHandler(SessionListener):
 
 
 class NotificationHandler(SessionListener):
+
+    raw_bytes = True
+    root_tags = (qualify('notification', NETCONF_NOTIFICATION_NS),)
+
     def __init__(self, notification_q):
         self._notification_q = notification_q
 
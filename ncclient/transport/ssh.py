@@ -21,7 +21,6 @@ import sys
 import socket
 import threading
 from binascii import hexlify
-from io import BytesIO as StringIO
 
 try:
     import selectors
@@ -35,7 +34,7 @@ import paramiko
 
 from ncclient.transport.errors import AuthenticationError, SSHError, SSHUnknownHostError
 from ncclient.transport.session import Session
-from ncclient.transport.parser import DefaultXMLParser
+from ncclient.transport.parser import DefaultXMLParser, ReceiveBuffer
 
 import logging
 logger = logging.getLogger("ncclient.transport.ssh")
@@ -43,8 +42,6 @@ logger = logging.getLogger("ncclient.transport.ssh")
 PORT_NETCONF_DEFAULT = 830
 RSA_SHA2_HOST_KEY_ALGORITHMS = ("rsa-sha2-512", "rsa-sha2-256")
 
-BUF_SIZE = 4096
-
 #
 # Define delimiters for chunks and messages for netconf 1.1 chunk enoding.
 # When matched:
@@ -105,7 +102,7 @@ class SSHSession(Session):
         self._channel = None
         self._channel_id = None
         self._channel_name = None
-        self._buffer = StringIO()
+        self._buffer = ReceiveBuffer()
         self._device_handler = device_handler
         self._message_list = []
         self._closing = threading.Event()
@@ -113,15 +110,15 @@ class SSHSession(Session):
 
         self.logger = SessionLoggerAdapter(logger, {'session': self})
 
-    def _dispatch_message(self, raw):
+    def _dispatch_message(self, raw, **kwargs):
         # Provide basic response message
         self.logger.info("Received message from host")
         # Provide complete response from host at debug log level
         self.logger.debug("Received:\n%s", raw)
-        return super(SSHSession, self)._dispatch_message(raw)
+        return super(SSHSession, self)._dispatch_message(raw, **kwargs)
 
     def _parse(self):
-        "Messages ae delimited by MSG_DELIM. The buffer could have grown by a maximum of BUF_SIZE bytes everytime this method is called. Retains state across method calls and if a byte has been read it will not be considered again."
+        "Messages ae delimited by MSG_DELIM. The buffer could have grown by a maximum of read_size bytes everytime this method is called. Retains state across method calls and if a byte has been read it will not be considered again."
         return self.parser._parse10()
 
     def load_known_hosts(self, filename=None):
@@ -148,6 +145,7 @@ class SSHSession(Session):
 
     def close(self):
         self._closing.set()
+        self._wakeup()
         if self._transport.is_active():
             self._transport.close()
 
@@ -525,7 +523,15 @@ class SSHSession(Session):
         raise AuthenticationError("No authentication methods available")
 
     def _transport_read(self):
-        return self._channel.recv(BUF_SIZE)
+        return self._channel.recv(self._read_size)
+
+    def _transport_read_into(self, buf):
+        # paramiko channels have no recv_into, so copy from what is buffered
+        data = self._channel.recv(len(buf))
+        if not data:
+            return 0
+        buf[:len(data)] = data
+        return len(data)
 
     def _transport_write(self, data):
         return self._channel.send(data)
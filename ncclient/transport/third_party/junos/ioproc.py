@@ -1,10 +1,10 @@
 import sys
 import re
-from io import BytesIO as StringIO
 from subprocess import Popen, check_output, PIPE, STDOUT
 
 from ncclient.transport.errors import SessionCloseError, TransportError, PermissionError
 from ncclient.transport.ssh import SSHSession
+from ncclient.transport.parser import ReceiveBuffer
 
 MSG_DELIM = b"]]>]]>"
 NETCONF_SHELL = 'netconf'
@@ -20,7 +20,7 @@ class IOProc(SSHSession):
         self._channel = None
         self._channel_id = None
         self._channel_name = None
-        self._buffer = StringIO()  # for incoming data
+        self._buffer = ReceiveBuffer()  # for incoming data
         # parsing-related, see _parse()
         self._parsing_state = 0
         self._parsing_pos = 0
@@ -56,9 +56,11 @@ class IOProc(SSHSession):
         try:
             while True:
                 # write
-                data = q.get().encode() + MSG_DELIM
+                message = q.get()
+                data = (message if isinstance(message, bytes) else message.encode()) + MSG_DELIM
                 chan.stdin.write(data)
                 chan.stdin.flush()
+                self._written(len(message))
                 # read
                 data = []
                 while True:
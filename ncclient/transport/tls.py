@@ -17,46 +17,76 @@ import socket
 import sys
 import threading
 
-from io import BytesIO as StringIO
 from socket import AF_INET, SOCK_STREAM
-from ssl import CERT_REQUIRED, SSLContext, SSLError
+from ssl import CERT_REQUIRED, SSLContext, SSLError, SSLWantReadError, SSLWantWriteError
 
 from ncclient.capabilities import Capabilities
 from ncclient.logging_ import SessionLoggerAdapter
 from ncclient.transport.errors import TLSError
 from ncclient.transport.session import Session
-from ncclient.transport.parser import DefaultXMLParser
+from ncclient.transport.parser import DefaultXMLParser, ReceiveBuffer
 
 logger = logging.getLogger("ncclient.transport.tls")
 
 DEFAULT_TLS_NETCONF_PORT = 6513
 DEFAULT_TLS_TIMEOUT = 120
 
-BUF_SIZE = 4096
+# maximum payload of a TLS record
+TLS_RECORD_SIZE = 16384
+
+
+def make_ssl_context(certfile, keyfile=None, ca_certs=None, protocol=None,
+                     check_hostname=True):
+    """Create the :class:`ssl.SSLContext` of a NETCONF over TLS client, see
+    :meth:`TLSSession.connect` for the parameters.
+
+    :raise TLSError if the certificates can not be loaded.
+    """
+    ssl_context = SSLContext(protocol)
+    ssl_context.verify_mode = CERT_REQUIRED
+    ssl_context.check_hostname = check_hostname
+    try:
+        ssl_context.load_cert_chain(certfile=certfile, keyfile=keyfile)
+    except SSLError:
+        raise TLSError('Bad client private key / certificate pair')
+    except IOError:
+        raise TLSError('Private key / certificate pair not found')
+
+    if ca_certs:
+        try:
+            ssl_context.load_verify_locations(cafile=ca_certs)
+        except SSLError:
+            raise TLSError('Bad Certification Authority file')
+        except IOError:
+            raise TLSError('CA certificate file not found')
+    return ssl_context
 
 
 class TLSSession(Session):
 
+    _select_writable = True
+
     def __init__(self, device_handler):
         capabilities = Capabilities(device_handler.get_capabilities())
         Session.__init__(self, capabilities)
         self._host = None
         self._connected = False
         self._socket = None
-        self._buffer = StringIO()
+        self._buffer = ReceiveBuffer()
         self._device_handler = device_handler
         self._message_list = []
         self._closing = threading.Event()
         self.parser = DefaultXMLParser(self)
         self.logger = SessionLoggerAdapter(logger, {'session': self})
 
-    def _dispatch_message(self, raw):
+    def _dispatch_message(self, raw, **kwargs):
         self.logger.info("Received message from host")
         self.logger.debug("Received:\n%s", raw)
-        return super(TLSSession, self)._dispatch_message(raw)
+        return super(TLSSession, self)._dispatch_message(raw, **kwargs)
 
     def close(self):
         self._closing.set()
+        self._wakeup()
         self._socket.close()
         self._connected = False
 
@@ -94,23 +124,8 @@ class TLSSession(Session):
         if protocol is None:
             raise TLSError('Missing TLS protocol')
 
-        ssl_context = SSLContext(protocol)
-        ssl_context.verify_mode = CERT_REQUIRED
-        ssl_context.check_hostname = check_hostname
-        try:
-            ssl_context.load_cert_chain(certfile=certfile, keyfile=keyfile)
-        except SSLError:
-            raise TLSError('Bad client private key / certificate pair')
-        except IOError:
-            raise TLSError('Private key / certificate pair not found')
-
-        if ca_certs:
-            try:
-                ssl_context.load_verify_locations(cafile=ca_certs)
-            except SSLError:
-                raise TLSError('Bad Certification Authority file')
-            except IOError:
-                raise TLSError('CA certificate file not found')
+        ssl_context = make_ssl_context(certfile, keyfile, ca_certs, protocol,
+                                       check_hostname)
 
         sock = socket.socket(AF_INET, SOCK_STREAM)
         ssl_sock = ssl_context.wrap_socket(
@@ -128,16 +143,34 @@ class TLSSession(Session):
         except Exception:
             raise TLSError("Unsuccessful TLS handshake with %s:%s" % (host, port))
 
+        # from now on a read or write never waits, the session selects the
+        # socket for readiness
+        ssl_sock.setblocking(False)
         self._host = host
         self._socket = ssl_sock
         self._connected = True
         self._post_connect()
 
     def _transport_read(self):
-        return self._socket.recv(BUF_SIZE)
+        try:
+            return self._socket.recv(self._read_size)
+        except (SSLWantReadError, SSLWantWriteError):
+            # only part of a record has arrived
+            raise BlockingIOError()
+
+    def _transport_read_into(self, buf):
+        try:
+            return self._socket.recv_into(buf)
+        except (SSLWantReadError, SSLWantWriteError):
+            raise BlockingIOError()
 
     def _transport_write(self, data):
-        return self._socket.send(data)
+        # a record at a time, a write that would block is retried with the
+        # same data once the socket is writable again
+        try:
+            return self._socket.send(data[:TLS_RECORD_SIZE])
+        except (SSLWantReadError, SSLWantWriteError):
+            raise BlockingIOError()
 
     def _transport_register(self, selector, event):
         selector.register(self._socket, event)
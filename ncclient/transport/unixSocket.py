@@ -13,7 +13,6 @@
 import logging
 import socket
 import threading
-from io import BytesIO as StringIO
 
 from socket import AF_UNIX, SOCK_STREAM
 
@@ -21,37 +20,38 @@ from ncclient.capabilities import Capabilities
 from ncclient.logging_ import SessionLoggerAdapter
 from ncclient.transport.errors import UnixSocketError
 from ncclient.transport.session import Session
-from ncclient.transport.parser import DefaultXMLParser
+from ncclient.transport.parser import DefaultXMLParser, ReceiveBuffer
 
 logger = logging.getLogger("ncclient.transport.unix")
 
 DEFAULT_TIMEOUT = 120
 
-BUF_SIZE = 4096
-
 class UnixSocketSession(Session):
 
     "Implements a NETCONF Session over Unix Socket on local machine."
 
+    _select_writable = True
+
     def __init__(self, device_handler):
         capabilities = Capabilities(device_handler.get_capabilities())
         Session.__init__(self, capabilities)
         self._connected = False
         self._socket = None
-        self._buffer = StringIO()
+        self._buffer = ReceiveBuffer()
         self._device_handler = device_handler
         self._message_list = []
         self._closing = threading.Event()
         self.parser = DefaultXMLParser(self)
         self.logger = SessionLoggerAdapter(logger, {'session': self})
 
-    def _dispatch_message(self, raw):
+    def _dispatch_message(self, raw, **kwargs):
         self.logger.info("Received message from host")
         self.logger.debug("Received:\n%s", raw)
-        return super(UnixSocketSession, self)._dispatch_message(raw)
+        return super(UnixSocketSession, self)._dispatch_message(raw, **kwargs)
 
     def close(self):
         self._closing.set()
+        self._wakeup()
         self._socket.close()
         self._connected = False
 
@@ -69,10 +69,14 @@ class UnixSocketSession(Session):
         self._post_connect()
 
     def _transport_read(self):
-        return self._socket.recv(BUF_SIZE)
+        return self._socket.recv(self._read_size)
+
+    def _transport_read_into(self, buf):
+        return self._socket.recv_into(buf)
 
     def _transport_write(self, data):
-        return self._socket.send(data)
+        # only write what fits into the socket buffer right now
+        return self._socket.send(data, socket.MSG_DONTWAIT)
 
     def _transport_register(self, selector, event):
         selector.register(self._socket, event)
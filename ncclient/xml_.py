@@ -17,7 +17,9 @@
 
 
 import io
+import threading
 import types
+from collections import OrderedDict
 from io import BytesIO, StringIO
 
 from lxml import etree
@@ -28,12 +30,33 @@ from lxml import etree
 
 from ncclient import NCClientError
 
+# kept for backwards compatibility, use get_parser() instead: a parser shared
+# by all threads makes lxml serialize their parsing
 parser = etree.XMLParser(recover=False)
 huge_parser = etree.XMLParser(recover=False, huge_tree=True)
 
+_thread_parsers = threading.local()
+
+
+def get_parser(huge_tree=False, remove_blank_text=False):
+    """Return the :class:`~lxml.etree.XMLParser` of the calling thread for the given options.
+
+    Each thread gets its own parser per option set, created on first use and reused afterwards, so parsers are neither shared between threads nor built for every document.
+    """
+    try:
+        parsers = _thread_parsers.parsers
+    except AttributeError:
+        parsers = _thread_parsers.parsers = {}
+    key = (huge_tree, remove_blank_text)
+    thread_parser = parsers.get(key)
+    if thread_parser is None:
+        thread_parser = parsers[key] = etree.XMLParser(
+            recover=False, huge_tree=huge_tree, remove_blank_text=remove_blank_text)
+    return thread_parser
+
 
 def _get_parser(huge_tree=False):
-    return huge_parser if huge_tree else parser
+    return get_parser(huge_tree)
 
 
 class XMLError(NCClientError):
@@ -108,24 +131,71 @@ qualify = lambda tag, ns=BASE_NS_1_0: tag if ns is None else "{%s}%s" % (ns, tag
 
 def to_xml(ele, encoding="UTF-8", pretty_print=False):
     "Convert and return the XML for an *ele* (:class:`~xml.etree.ElementTree.Element`) with specified *encoding*."
+    return to_xml_bytes(ele, encoding, pretty_print).decode('UTF-8')
+
+
+def to_xml_bytes(ele, encoding="UTF-8", pretty_print=False):
+    "Same as :func:`to_xml`, but returns the XML document encoded as bytes, ready to be sent."
     xml = etree.tostring(ele, encoding=encoding, pretty_print=pretty_print)
-    return xml.decode('UTF-8') if xml.startswith(b'<?xml') \
-        else '<?xml version="1.0" encoding="%s"?>%s' % (encoding, xml.decode('UTF-8'))
+    return xml if xml.startswith(b'<?xml') \
+        else b'<?xml version="1.0" encoding="%s"?>%s' % (encoding.encode('ascii'), xml)
 
 
 def to_ele(x, huge_tree=False):
-    """Convert and return the :class:`~xml.etree.ElementTree.Element` for the XML document *x*. If *x* is already an :class:`~xml.etree.ElementTree.Element` simply returns that.
+    """Convert and return the :class:`~xml.etree.ElementTree.Element` for the XML document *x*, which may be a string or bytes. If *x* is already an :class:`~xml.etree.ElementTree.Element` simply returns that.
 
     *huge_tree*: parse XML with very deep trees and very long text content
     """
-    return x if etree.iselement(x) else etree.fromstring(x.encode('UTF-8'), parser=_get_parser(huge_tree))
+    if etree.iselement(x):
+        return x
+    if not isinstance(x, bytes):
+        x = x.encode('UTF-8')
+    return etree.fromstring(x, parser=get_parser(huge_tree))
+
+
+#: Amount of a raw document fed at a time while looking for its root element
+ROOT_CHUNK_SIZE = 4096
 
 
 def parse_root(raw):
     "Efficiently parses the root element of a *raw* XML document, returning a tuple of its qualified name and attribute dictionary."
-    fp = BytesIO(raw.encode('UTF-8'))
-    for event, element in etree.iterparse(fp, events=('start',)):
-        return (element.tag, element.attrib)
+    # only the first bytes of the document are needed for the root element,
+    # so avoid encoding and scanning a possibly large reply as a whole
+    pull = etree.XMLPullParser(events=('start',))
+    for start in range(0, len(raw), ROOT_CHUNK_SIZE):
+        chunk = raw[start:start + ROOT_CHUNK_SIZE]
+        try:
+            pull.feed(chunk.encode('UTF-8') if isinstance(chunk, str) else chunk)
+        except etree.XMLSyntaxError:
+            # the body may be broken, as long as the root start tag is not
+            for event, element in pull.read_events():
+                return (element.tag, element.attrib)
+            raise
+        for event, element in pull.read_events():
+            return (element.tag, element.attrib)
+    pull.close()
+
+# compiled stylesheets by their source, shared by all sessions
+_xslt_cache = {}
+_xslt_cache_lock = threading.Lock()
+
+
+def to_xslt(stylesheet):
+    """Return the compiled :class:`~lxml.etree.XSLT` for the XSLT document *stylesheet* (bytes or str).
+
+    A stylesheet is only compiled the first time it is seen, later calls with the same content return the same transform. It is safe to call this, and to apply the returned transform, from several threads.
+    """
+    if isinstance(stylesheet, str):
+        stylesheet = stylesheet.encode('UTF-8')
+    transform = _xslt_cache.get(stylesheet)
+    if transform is None:
+        with _xslt_cache_lock:
+            transform = _xslt_cache.get(stylesheet)
+            if transform is None:
+                transform = etree.XSLT(etree.parse(BytesIO(stylesheet), get_parser(remove_blank_text=True)))
+                _xslt_cache[stylesheet] = transform
+    return transform
+
 
 def validated_element(x, tags=None, attrs=None):
     """Checks if the root element of an XML document or Element meets the supplied criteria.
@@ -152,10 +222,129 @@ def validated_element(x, tags=None, attrs=None):
                 raise XMLError("Element [%s] does not have required attributes" % ele.tag)
     return ele
 
+#: The standard stylesheet for removing the namespaces from all elements and
+#: attributes of a reply. :class:`NCElement` applies it natively with
+#: :func:`strip_namespaces` instead of running the XSLT.
+STRIP_NAMESPACES_XSLT = b'''<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+        <xsl:output method="xml" indent="no"/>
+
+        <xsl:template match="/|comment()|processing-instruction()">
+            <xsl:copy>
+                <xsl:apply-templates/>
+            </xsl:copy>
+        </xsl:template>
+
+        <xsl:template match="*">
+            <xsl:element name="{local-name()}">
+                <xsl:apply-templates select="@*|node()"/>
+            </xsl:element>
+        </xsl:template>
+
+        <xsl:template match="@*">
+            <xsl:attribute name="{local-name()}">
+                <xsl:value-of select="."/>
+            </xsl:attribute>
+        </xsl:template>
+        </xsl:stylesheet>
+        '''
+
+
+def strip_namespaces(root):
+    """Remove the namespaces from all elements and attributes below and including *root*, in place, and return *root*.
+
+    This gives the same tree as :data:`STRIP_NAMESPACES_XSLT` without building a new document.
+    """
+    local = {}
+    for ele in root.iter(etree.Element):
+        tag = ele.tag
+        if tag[0] == '{':
+            name = local.get(tag)
+            if name is None:
+                name = local[tag] = tag[tag.index('}') + 1:]
+            ele.tag = name
+        for key in ele.keys():
+            if key[0] == '{':
+                # re-add all attributes in document order, a later one
+                # wins if two only differ in namespace
+                items = ele.items()
+                ele.attrib.clear()
+                for key, value in items:
+                    ele.set(key[key.find('}') + 1:], value)
+                break
+    etree.cleanup_namespaces(root)
+    return root
+
+
 XPATH_NAMESPACES = {
     're':'http://exslt.org/regular-expressions'
 }
 
+#: Default number of compiled XPath expressions kept by :class:`XPathCache`
+XPATH_CACHE_SIZE = 256
+
+
+class XPathCache:
+    """Bounded LRU cache of compiled :class:`~lxml.etree.XPath` expressions, keyed by expression and namespace map.
+
+    lxml evaluates a compiled expression in one thread at a time, so each thread gets its own compiled expressions, and up to *maxsize* of them. :attr:`hits` and :attr:`misses` count the lookups of all threads. The cache is safe to share between threads, the compiled expressions it returns are not meant to be.
+    """
+
+    def __init__(self, maxsize=XPATH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock() # guards the counters
+        self._generation = 0 # bumped by clear()
+
+    def __len__(self):
+        "Number of expressions cached for the calling thread."
+        return len(self._thread_cache())
+
+    def _thread_cache(self):
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation:
+            local.cache = OrderedDict()
+            local.generation = self._generation
+        return local.cache
+
+    def get(self, expression, namespaces=None):
+        "Return the compiled :class:`~lxml.etree.XPath` of the calling thread for *expression* using the prefixes in *namespaces*."
+        key = (expression, frozenset(namespaces.items()) if namespaces else None)
+        cache = self._thread_cache()
+        compiled = cache.get(key)
+        if compiled is not None:
+            cache.move_to_end(key)
+            with self._lock:
+                self.hits += 1
+            return compiled
+        with self._lock:
+            self.misses += 1
+        compiled = cache[key] = etree.XPath(expression, namespaces=namespaces)
+        while len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        "Drop the compiled expressions of all threads and reset the counters."
+        with self._lock:
+            self._generation += 1
+            self.hits = 0
+            self.misses = 0
+
+
+#: Process wide cache used by :meth:`NCElement.xpath` and :meth:`~ncclient.operations.retrieve.GetReply.xpath`
+xpath_cache = XPathCache()
+
+
+def xpath_namespaces(namespaces=None):
+    "Return :data:`XPATH_NAMESPACES` extended by the caller supplied *namespaces*, without changing it."
+    if not namespaces:
+        return XPATH_NAMESPACES
+    merged = dict(XPATH_NAMESPACES)
+    merged.update(namespaces)
+    return merged
+
 
 class NCElement:
     def __init__(self, result, transform_reply, huge_tree=False):
@@ -167,12 +356,13 @@ class NCElement:
         else:
             self.__doc = self.remove_namespaces(self.__result)
 
-    def xpath(self, expression, namespaces={}):
+    def xpath(self, expression, namespaces=None):
         """Perform XPath navigation on an object
 
         Args:
             expression: A string representing a compliant XPath
-                expression.
+                expression. It is compiled once and then taken from
+                :data:`xpath_cache`.
             namespaces: A dict of caller supplied prefix/xmlns to
                 append to the static dict of XPath namespaces.
         Returns:
@@ -181,9 +371,8 @@ class NCElement:
             be returned to the caller.
         """
         self.__expression = expression
-        self.__namespaces = XPATH_NAMESPACES
-        self.__namespaces.update(namespaces)
-        return self.__doc.xpath(self.__expression, namespaces=self.__namespaces)
+        self.__namespaces = xpath_namespaces(namespaces)
+        return xpath_cache.get(self.__expression, self.__namespaces)(self.__doc)
 
     def find(self, expression):
         """return result for a call to lxml ElementPath find()"""
@@ -207,7 +396,7 @@ class NCElement:
     @property
     def tostring(self):
         """return a pretty-printed string output for rpc reply"""
-        parser = etree.XMLParser(remove_blank_text=True, huge_tree=self.__huge_tree)
+        parser = get_parser(self.__huge_tree, remove_blank_text=True)
         outputtree = etree.XML(etree.tostring(self.__doc), parser)
         return etree.tostring(outputtree, pretty_print=True)
 
@@ -219,12 +408,23 @@ class NCElement:
     def remove_namespaces(self, rpc_reply):
         """remove xmlns attributes from rpc reply"""
         self.__xslt=self.__transform_reply
-        self.__parser = etree.XMLParser(remove_blank_text=True, huge_tree=self.__huge_tree)
-        self.__xslt_doc = etree.parse(io.BytesIO(self.__xslt), self.__parser)
-        self.__transform = etree.XSLT(self.__xslt_doc)
-        self.__root = etree.fromstring(str(self.__transform(etree.parse(StringIO(str(rpc_reply)),
-                                                                        parser=self.__parser))),
-                                       parser=self.__parser)
+        self.__parser = get_parser(self.__huge_tree, remove_blank_text=True)
+        # replies are kept as received, only strings need encoding
+        raw = getattr(rpc_reply, '_raw', rpc_reply)
+        if not isinstance(raw, bytes):
+            raw = str(rpc_reply).encode('UTF-8')
+        doc = etree.fromstring(raw, parser=self.__parser)
+        if self.__xslt == STRIP_NAMESPACES_XSLT:
+            # nothing else refers to this tree, it can be rewritten in place
+            self.__root = strip_namespaces(doc)
+            return self.__root
+        self.__transform = to_xslt(self.__xslt)
+        result = self.__transform(doc)
+        # the input has no blank text left, so the result tree can be used
+        # as is instead of serializing and parsing it once more
+        self.__root = result.getroot()
+        if self.__root is None:
+            self.__root = etree.fromstring(str(result), parser=self.__parser)
         return self.__root
 
 def parent_ns(node):
@@ -22,7 +22,7 @@ class TestEricssonDevice(unittest.TestCase):
         sub_ele(child, "running")
 
         rpc_node = obj._wrap(node)
-        self.assertEqual(rpc_node, expected)
+        self.assertEqual(rpc_node, expected.encode('UTF-8'))
 
     def test_rpc_disable_nc_prefix(self):
         # It is a switch for user to turn on/off "nc" prefix
@@ -38,7 +38,7 @@ class TestEricssonDevice(unittest.TestCase):
 
         # It is a switch for user to turn on/off "nc" prefix
         rpc_node = obj._wrap(node)
-        self.assertEqual(rpc_node, expected)
+        self.assertEqual(rpc_node, expected.encode('UTF-8'))
 
     def test_rpc_enable_nc_prefix(self):
         # It is a switch for user to turn on/off "nc" prefix
@@ -53,7 +53,7 @@ class TestEricssonDevice(unittest.TestCase):
         sub_ele(child, "running")
 
         rpc_node = obj._wrap(node)
-        self.assertEqual(rpc_node, expected)
+        self.assertEqual(rpc_node, expected.encode('UTF-8'))
 
     def test_rpc_enable_nc_prefix_exception(self):
         # invalid value in "with_ns"
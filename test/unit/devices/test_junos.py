@@ -93,6 +93,8 @@ class TestJunosDevice(unittest.TestCase):
     def test_transform_reply(self):
         reply = xml.encode('utf-8')
         self.assertEqual(self.obj.transform_reply(), reply)
+        # the same stylesheet is handed out every time so it is compiled once
+        self.assertIs(self.obj.transform_reply(), JunosDeviceHandler({'name': 'junos'}).transform_reply())
 
     def test_perform_quality_check(self):
         self.assertFalse(self.obj.perform_qualify_check())
@@ -0,0 +1,60 @@
+import random
+import threading
+
+from lxml import etree
+
+from ncclient.operations.rpc import RPCReplyListener
+from ncclient.xml_ import *
+
+ERROR = ("<rpc-error><error-type>protocol</error-type><error-tag>operation-failed</error-tag>"
+         "<error-severity>error</error-severity><error-message>failed</error-message></rpc-error>")
+
+
+class FakeDevice:
+
+    """Stands in for the `send` of a session, and replies to each request a
+    little later from another thread, like a server would.
+
+    Replies are `<ok/>` unless the operation is in *fail*, which get an
+    rpc-error, in *silent*, which get no reply at all, or in *bodies*,
+    which maps it to the body of its reply, formatted with the message-id
+    as `id`. The delay of each reply is random up to *delay* seconds if
+    *jitter*, else exactly *delay*."""
+
+    def __init__(self, session, device_handler, fail=(), silent=(), bodies=None, delay=0.01, jitter=False):
+        self.listener = RPCReplyListener(session, device_handler)
+        self.fail = fail
+        self.silent = silent
+        self.bodies = bodies or {}
+        self.delay = delay
+        self.jitter = jitter
+        self.requests = [] # (operation, number of replies received when it was sent)
+        self.outstanding = [] # requests not replied to, when each was sent
+        self.replied = 0
+        self._lock = threading.Lock()
+
+    def send(self, req, priority=None):
+        rpc = to_ele(req)
+        op = etree.QName(rpc[0]).localname
+        msg_id = rpc.get("message-id")
+        with self._lock:
+            self.requests.append((op, self.replied))
+            self.outstanding.append(len(self.requests) - self.replied)
+        if op in self.silent:
+            return
+        if op in self.fail:
+            body = ERROR
+        else:
+            body = self.bodies.get(op, "<ok/>").format(id=msg_id)
+        reply = '<rpc-reply xmlns="%s" message-id="%s">%s</rpc-reply>' % (BASE_NS_1_0, msg_id, body)
+        delay = random.uniform(0, self.delay) if self.jitter else self.delay
+        threading.Timer(delay, self._reply, (msg_id, reply)).start()
+
+    def _reply(self, msg_id, reply):
+        with self._lock:
+            self.replied += 1
+        self.listener.callback((qualify("rpc-reply"), {"message-id": msg_id}), reply)
+
+    @property
+    def operations(self):
+        return [op for op, _ in self.requests]
@@ -0,0 +1,72 @@
+import unittest
+
+from ncclient import manager
+from ncclient.capabilities import Capabilities
+from ncclient.operations import MissingCapabilityError, RPCError, TimeoutExpiredError, RaiseMode
+from ncclient.transport import Session
+from ncclient.xml_ import *
+
+from .fake_device import FakeDevice
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.device_handler = manager.make_device_handler({'name': 'default'})
+        self.session = Session(Capabilities(self.device_handler.get_capabilities()))
+        self.session._server_capabilities = Capabilities([
+            "urn:ietf:params:netconf:base:1.0",
+            "urn:ietf:params:netconf:capability:candidate:1.0"])
+        # <get> is answered with data naming the message-id, <lock> with an
+        # error, <commit> not at all
+        self.device = FakeDevice(self.session, self.device_handler, fail=('lock',), silent=('commit',),
+                                 bodies={'get': '<data><id xmlns="urn:test">{id}</id></data>'},
+                                 jitter=True)
+        self.session.send = self.device.send
+        self.m = manager.Manager(self.session, self.device_handler, timeout=5)
+
+    def test_batch(self):
+        with self.m.batch(window=4) as batch:
+            rpcs = [batch.get() for _ in range(40)]
+            rpcs.append(batch.rpc(new_ele("get")))
+        self.assertEqual(0, batch.in_flight)
+        self.assertEqual(41, len(self.device.outstanding))
+        self.assertLessEqual(max(self.device.outstanding), 4)
+        # in the order of the requests, whatever the order of the replies
+        results = batch.results
+        self.assertEqual([rpc.id for rpc in rpcs],
+                         [to_ele(r.xml).findtext(".//{urn:test}id") for r in results])
+        self.assertEqual(0, self.device.listener.in_flight)
+
+    def test_batch_errors(self):
+        self.m.timeout = 0.1
+        with self.m.batch() as batch:
+            batch.get()
+            batch.lock()
+            batch.validate() # no :validate capability
+            batch.commit()
+            batch.get()
+        results = batch.results
+        self.assertTrue(results[0].ok)
+        self.assertIsInstance(results[1], RPCError)
+        self.assertIsInstance(results[2], MissingCapabilityError)
+        self.assertIsInstance(results[3], TimeoutExpiredError)
+        self.assertTrue(results[4].ok)
+        self.assertEqual(0, self.device.listener.in_flight)
+        self.m.raise_mode = RaiseMode.NONE
+        batch = self.m.batch()
+        batch.lock()
+        self.assertFalse(batch.wait()[0].ok)
+
+    def test_batch_invalid(self):
+        self.assertRaises(ValueError, self.m.batch, window=0)
+        batch = self.m.batch()
+        self.assertRaises(AttributeError, getattr, batch, "no_such_operation")
+
+    def test_batch_exception_cancels(self):
+        with self.assertRaises(KeyError):
+            with self.m.batch() as batch:
+                rpc = batch.commit()
+                raise KeyError
+        self.assertTrue(rpc.cancelled())
+        self.assertEqual(0, self.device.listener.in_flight)
@@ -262,3 +262,21 @@ class TestRetrieve(unittest.TestCase):
         self.assertEqual(call, xml)
         self.assertEqual(ret, result)
 
+    def test_get_reply_xpath(self):
+        reply = GetReply(
+            '<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" message-id="1">'
+            '<data><system xmlns="urn:s"><host-name>R1</host-name></system></data>'
+            '</rpc-reply>')
+        hits = xpath_cache.hits
+        for _ in range(2):
+            names = reply.xpath("s:system/s:host-name", namespaces={'s': 'urn:s'})
+            self.assertEqual(["R1"], [n.text for n in names])
+        self.assertEqual(hits + 1, xpath_cache.hits)
+        self.assertNotIn('s', XPATH_NAMESPACES)
+
+    def test_get_reply_xpath_error(self):
+        reply = GetReply(
+            '<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" message-id="1">'
+            '<rpc-error><error-severity>error</error-severity></rpc-error>'
+            '</rpc-reply>')
+        self.assertEqual([], reply.xpath("//*"))
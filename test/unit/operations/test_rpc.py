@@ -1,13 +1,19 @@
+import threading
 import unittest
+from concurrent.futures import CancelledError, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from unittest.mock import patch
+from time import monotonic
 
 from ncclient.operations.rpc import *
 from ncclient import manager
 import ncclient.manager
 import ncclient.transport
 from ncclient.xml_ import *
-from ncclient.operations import RaiseMode
+from ncclient.operations import RaiseMode, Lock, CloseSession, KillSession
 from ncclient.capabilities import Capabilities
+from ncclient.transport import FlowPolicy, Priority
+from ncclient.transport.errors import SessionBusyError, SessionCloseError
 from xml.sax.saxutils import escape
 
 patch_str = 'ncclient.operations.rpc.Event.is_set'
@@ -198,6 +204,25 @@ class TestRPC(unittest.TestCase):
         self.assertEqual(xml5_huge, obj.xml)
         self.assertTrue(obj._parsed)
 
+    @patch('ncclient.operations.rpc.to_ele')
+    def test_rpc_reply_set_root(self, mock_to_ele):
+        obj = RPCReply(xml4)
+        obj.set_root(etree.fromstring(xml4.encode()))
+        self.assertTrue(obj.ok)
+        self.assertEqual(xml4, obj.xml)
+        self.assertFalse(mock_to_ele.called)
+
+    @patch(patch_str)
+    def test_rpc_reply_listener_callback_ele(self, mock_thread):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler, raise_mode=RaiseMode.ALL, timeout=0)
+        raw = xml4.replace("urn:uuid:b19400d6-fa2a-11e4-8f7b-0800278ff596", obj.id)
+        ele = etree.fromstring(raw.encode())
+        obj._listener.callback_ele((ele.tag, ele.attrib), raw, ele)
+        self.assertTrue(obj.event.is_set())
+        self.assertEqual(obj.reply.xml, raw)
+        self.assertIs(obj.reply._root, ele)
+
     @patch('ncclient.transport.Session.send')
     @patch(patch_str)
     def test_rpc_send(self, mock_thread, mock_send):
@@ -214,8 +239,8 @@ class TestRPC(unittest.TestCase):
                       {"message-id": obj._id},
                       **device_handler.get_xml_extra_prefix_kwargs())
         ele.append(node)
-        node = to_xml(ele)
-        mock_send.assert_called_once_with(node)
+        node = to_xml_bytes(ele)
+        mock_send.assert_called_once_with(node, priority=Priority.NORMAL)
         self.assertEqual(
             result.data_xml,
             (NCElement(
@@ -244,8 +269,8 @@ class TestRPC(unittest.TestCase):
         child.append(util.build_filter(filters))
 
         ele.append(child)
-        node = to_xml(ele)
-        mock_send.assert_called_once_with(node)
+        node = to_xml_bytes(ele)
+        mock_send.assert_called_once_with(node, priority=Priority.NORMAL)
         self.assertEqual(
             result.data_xml,
             (NCElement(
@@ -296,6 +321,30 @@ class TestRPC(unittest.TestCase):
         obj.deliver_error(err)
         self.assertRaises(RPCError, obj._request, node)
 
+    @patch('ncclient.transport.Session.send')
+    @patch(patch_str)
+    def test_rpc_rpcerror_multiple_errors_no_reparse(self, mock_thread, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler, raise_mode=RaiseMode.ALL, timeout=0)
+        reply = RPCReply(
+            '<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">' +
+            xml6 + xml7 + "</rpc-reply>")
+        reply.parse()
+        obj._reply = reply
+        node = new_ele("commit")
+        with patch('ncclient.operations.rpc.to_ele') as mock_to_ele:
+            with self.assertRaises(RPCError) as cm:
+                obj._request(node)
+        mock_to_ele.assert_not_called()
+        self.assertEqual(2, len(cm.exception.errlist))
+        self.assertIs(reply._root, cm.exception.xml)
+
+    def test_rpc_reply_bytes(self):
+        reply = RPCReply(xml1.encode('UTF-8'))
+        self.assertTrue(reply.ok)
+        self.assertEqual(xml1, reply.xml)
+        self.assertEqual(xml1, repr(reply))
+
     def test_rpc_rpcerror_tag_to_attr(self):
         '''All elements in <rpc-error> extracted.'''
         err = RPCError(to_ele(xml6))
@@ -422,6 +471,246 @@ class TestRPC(unittest.TestCase):
         result = obj._request(node)
         self.assertIsNotNone(result)
 
+    @patch('ncclient.transport.Session.send')
+    def test_prepared_request_async(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        prepared = PreparedRequest(session, device_handler, GenericRPC,
+                                   ("get-software-information",),
+                                   async_mode=True)
+        listener = RPCReplyListener(session, device_handler)
+        # building the request does not leave an RPC waiting for a reply
+        self.assertEqual({}, listener._id2rpc)
+        mock_send.assert_not_called()
+        ids = set()
+        for _ in range(2):
+            obj = prepared.request()
+            self.assertIsInstance(obj, GenericRPC)
+            self.assertIs(listener._id2rpc[obj.id], obj)
+            expected = obj._wrap(new_ele("get-software-information"))
+            self.assertEqual(mock_send.call_args[0][0], expected)
+            ids.add(obj.id)
+        self.assertEqual(2, len(ids))
+        self.assertIn(b'message-id=""', prepared.xml)
+
+    @patch('ncclient.transport.Session.send')
+    def test_prepared_request_build_state(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        m = manager.Manager(session, device_handler, timeout=5)
+        m.async_mode = True
+        prepared = m.prepare("get_schema", "ietf-inet-types")
+        # GetSchema.request parses replies with huge_tree
+        self.assertTrue(prepared.request().huge_tree)
+        self.assertTrue(prepared.request().huge_tree)
+        self.assertRaises(OperationError, m.prepare, "close_session")
+
+    @patch('ncclient.transport.Session.send')
+    def test_prepared_request_sync(self, mock_send):
+        device_handler = manager.make_device_handler({'name': 'default'})
+        session = ncclient.transport.Session(Capabilities(device_handler.get_capabilities()))
+        listener = RPCReplyListener(session, device_handler)
+        def reply(data, priority):
+            tag, attrs = parse_root(data)
+            listener.callback((qualify("rpc-reply"), attrs),
+                              b'<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                              b'message-id="%s"><ok/></rpc-reply>' % attrs["message-id"].encode())
+        mock_send.side_effect = reply
+        prepared = PreparedRequest(session, device_handler, GenericRPC,
+                                   kwds={"rpc_command": "commit"},
+                                   raise_mode=RaiseMode.ALL, timeout=1)
+        for _ in range(2):
+            result = prepared.request()
+            self.assertIsInstance(result, RPCReply)
+            self.assertTrue(result.ok)
+        self.assertEqual(2, mock_send.call_count)
+        self.assertEqual({}, listener._id2rpc)
+
+    def test_message_ids_are_consecutive_per_session(self):
+        device_handler, session = self._mock_device_handler_and_session()
+        ids = [RPC(session, device_handler).id for _ in range(3)]
+        self.assertEqual(["1", "2", "3"], ids)
+        # a new session starts counting afresh
+        device_handler, session = self._mock_device_handler_and_session()
+        self.assertEqual("1", RPC(session, device_handler).id)
+
+    def test_deliver_outside_listener_lock(self):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler)
+        listener = RPCReplyListener(session, device_handler)
+        def deliver_reply(raw):
+            # would deadlock if the reply was delivered with the lock held
+            listener.register("other", obj)
+        obj.deliver_reply = deliver_reply
+        listener.callback((qualify("rpc-reply"), {"message-id": obj.id}), xml1)
+        self.assertEqual({"other": obj}, listener._id2rpc)
+        self.assertRaises(OperationError, listener.callback,
+                          (qualify("rpc-reply"), {"message-id": obj.id}), xml1)
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_timeout_expires_and_counts_late_reply(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler, timeout=0)
+        listener = RPCReplyListener(session, device_handler)
+        self.assertRaises(TimeoutExpiredError, obj._request, new_ele("commit"))
+        self.assertEqual(0, listener.in_flight)
+        self.assertEqual(1, listener.expired)
+        # the late reply is dropped quietly
+        listener.callback((qualify("rpc-reply"), {"message-id": obj.id}), xml1)
+        self.assertEqual(1, listener.late_replies)
+        self.assertIsNone(obj._reply)
+        self.assertRaises(OperationError, listener.callback,
+                          (qualify("rpc-reply"), {"message-id": obj.id}), xml1)
+
+    def test_sweep_expires_past_deadlines(self):
+        device_handler, session = self._mock_device_handler_and_session()
+        listener = RPCReplyListener(session, device_handler)
+        first, second, third = [RPC(session, device_handler) for _ in range(3)]
+        listener.set_deadline(first.id, 10)
+        listener.set_deadline(second.id, 20)
+        self.assertEqual(1, listener.sweep(now=15))
+        self.assertNotIn(first.id, listener._id2rpc)
+        self.assertIs(listener._id2rpc[second.id], second)
+        # RPCs without a deadline are never swept
+        self.assertEqual(1, listener.sweep(now=1e9))
+        self.assertEqual({third.id: third}, listener._id2rpc)
+        self.assertEqual(2, listener.expired)
+
+    @patch('ncclient.transport.Session.send')
+    def test_async_rpc_expires(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        listener = RPCReplyListener(session, device_handler)
+        obj = RPC(session, device_handler, async_mode=True, timeout=5)
+        forever = RPC(session, device_handler, async_mode=True, timeout=None)
+        obj._request(new_ele("commit"))
+        forever._request(new_ele("commit"))
+        self.assertEqual(0, listener.sweep())
+        self.assertEqual(1, listener.sweep(now=monotonic() + 10))
+        self.assertRaises(TimeoutExpiredError, obj.result, 0)
+        self.assertEqual({forever.id: forever}, listener._id2rpc)
+        self.assertEqual(1, session.in_flight)
+        self.assertEqual(1, session.expired_requests)
+        listener.callback((qualify("rpc-reply"), {"message-id": obj.id}), xml1)
+        self.assertEqual(1, session.late_replies)
+
+    def test_late_ids_are_bounded(self):
+        device_handler, session = self._mock_device_handler_and_session()
+        listener = RPCReplyListener(session, device_handler)
+        with patch.object(RPCReplyListener, 'LATE_IDS_MAX', 2):
+            ids = [RPC(session, device_handler).id for _ in range(3)]
+            for id in ids:
+                listener.expire(id)
+        self.assertEqual(ids[1:], list(listener._late_ids))
+
+    @patch('ncclient.transport.Session.send')
+    def test_async_rpc_future(self, mock_send):
+        device_handler = manager.make_device_handler({'name': 'default'})
+        session = ncclient.transport.Session(Capabilities(device_handler.get_capabilities()))
+        listener = RPCReplyListener(session, device_handler)
+        rpcs = [RPC(session, device_handler, async_mode=True, raise_mode=RaiseMode.ERRORS)
+                for _ in range(2)]
+        for obj in rpcs:
+            self.assertIs(obj._request(new_ele("commit")), obj)
+        done = []
+        rpcs[0].add_done_callback(done.append)
+        self.assertRaises(FutureTimeoutError, rpcs[0].result, 0)
+        listener.callback((qualify("rpc-reply"), {"message-id": rpcs[1].id}), xml_error_only)
+        listener.callback((qualify("rpc-reply"), {"message-id": rpcs[0].id}), xml1)
+        self.assertEqual([rpcs[0]], done)
+        self.assertEqual(set(rpcs), set(as_completed(rpcs, timeout=0)))
+        # the reply is parsed by the first result()
+        self.assertFalse(rpcs[0].reply._parsed)
+        result = rpcs[0].result()
+        self.assertIsInstance(result, RPCReply)
+        self.assertTrue(result.ok)
+        self.assertIs(result, rpcs[0].result())
+        self.assertRaises(RPCError, rpcs[1].result)
+        self.assertIsNone(rpcs[1].exception())
+
+    @patch('ncclient.transport.Session.send')
+    def test_max_in_flight(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        session._connected = True
+        session.max_in_flight = 2
+        session.flow_policy = FlowPolicy.FAIL
+        listener = RPCReplyListener(session, device_handler)
+        rpcs = [RPC(session, device_handler, async_mode=True) for _ in range(4)]
+        rpcs[0]._request(new_ele("commit"))
+        rpcs[1]._request(new_ele("commit"))
+        self.assertEqual(2, session.in_flight)
+        # not sent yet
+        self.assertEqual(4, listener.in_flight)
+        self.assertRaises(SessionBusyError, rpcs[2]._request, new_ele("commit"))
+        self.assertEqual(2, mock_send.call_count)
+        # a rejected request is forgotten
+        self.assertEqual(3, listener.in_flight)
+        self.assertEqual(2, session.in_flight)
+        listener.callback((qualify("rpc-reply"), {"message-id": rpcs[0].id}), xml1)
+        self.assertEqual(1, session.in_flight)
+        rpcs[3]._request(new_ele("commit"))
+        session.flow_policy = FlowPolicy.BLOCK
+        sync = RPC(session, device_handler, timeout=5)
+        threading.Timer(0.05, rpcs[1].cancel).start()
+        threading.Timer(0.1, lambda: listener.callback(
+            (qualify("rpc-reply"), {"message-id": sync.id}), xml1)).start()
+        # waits for the cancelled request to make room, then for its reply
+        sync._request(new_ele("commit"))
+        self.assertTrue(sync.reply.ok)
+        self.assertEqual(1, session.in_flight)
+        RPC(session, device_handler, async_mode=True)._request(new_ele("commit"))
+        sync = RPC(session, device_handler, timeout=0.05)
+        self.assertRaises(SessionBusyError, sync._request, new_ele("commit"))
+        self.assertNotIn(sync.id, listener._id2rpc)
+        # given up on, or failed
+        session.max_in_flight = None
+        self.assertRaises(TimeoutExpiredError, RPC(session, device_handler, timeout=0.01)._request,
+                          new_ele("commit"))
+        self.assertEqual(2, session.in_flight)
+        listener.errback(SessionCloseError("out"))
+        self.assertEqual(0, session.in_flight)
+
+    @patch('ncclient.transport.Session.send')
+    def test_priority(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        session._connected = True
+        self.assertEqual(Priority.NORMAL, RPC(session, device_handler).priority)
+        self.assertEqual(Priority.HIGH, Lock(session, device_handler).priority)
+        self.assertEqual(Priority.HIGH, CloseSession(session, device_handler).priority)
+        rpc = RPC(session, device_handler, async_mode=True)
+        rpc.priority = Priority.LOW
+        rpc._request(new_ele("get-config"))
+        mock_send.assert_called_with(mock_send.call_args[0][0], priority=Priority.LOW)
+        # urgent requests are not held back by the limits of the session
+        session.max_in_flight = 1
+        session.flow_policy = FlowPolicy.FAIL
+        self.assertRaises(SessionBusyError, RPC(session, device_handler, async_mode=True)._request,
+                          new_ele("get"))
+        rpc = KillSession(session, device_handler, async_mode=True)
+        rpc.request("5")
+        mock_send.assert_called_with(mock_send.call_args[0][0], priority=Priority.HIGH)
+        self.assertEqual(2, session.in_flight)
+
+    def test_async_rpc_future_error(self):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler, async_mode=True)
+        RPCReplyListener(session, device_handler).errback(SessionCloseError("out"))
+        self.assertIsInstance(obj.exception(), SessionCloseError)
+        self.assertRaises(SessionCloseError, obj.result)
+
+    def test_async_rpc_future_cancel(self):
+        device_handler, session = self._mock_device_handler_and_session()
+        listener = RPCReplyListener(session, device_handler)
+        obj = RPC(session, device_handler, async_mode=True)
+        self.assertTrue(obj.cancel())
+        self.assertTrue(obj.cancelled())
+        self.assertTrue(obj.event.is_set())
+        self.assertNotIn(obj.id, listener._id2rpc)
+        self.assertRaises(CancelledError, obj.result)
+        # a reply that was delivered can no longer be cancelled
+        obj = RPC(session, device_handler, async_mode=True)
+        listener.callback((qualify("rpc-reply"), {"message-id": obj.id}), xml1)
+        self.assertFalse(obj.cancel())
+        obj.result()
+        self.assertTrue(obj.reply.ok)
+
     def _mock_device_handler_and_session(self):
         device_handler = manager.make_device_handler({'name': 'junos'})
         capabilities = Capabilities(device_handler.get_capabilities())
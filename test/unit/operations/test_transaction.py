@@ -0,0 +1,103 @@
+import unittest
+
+from lxml import etree
+
+from ncclient import manager
+from ncclient.capabilities import Capabilities
+from ncclient.operations import OperationError, RPCError, Transaction
+from ncclient.transport import Session
+from ncclient.transport.session import MSG_DELIM
+from ncclient.xml_ import *
+
+from .fake_device import FakeDevice
+
+config = """<config><system xmlns="urn:test"><hostname>r1</hostname></system></config>"""
+
+
+class TestTransaction(unittest.TestCase):
+
+    def setUp(self):
+        self.device_handler = manager.make_device_handler({'name': 'default'})
+        self.session = Session(Capabilities(self.device_handler.get_capabilities()))
+        self.session._server_capabilities = Capabilities([
+            "urn:ietf:params:netconf:base:1.0",
+            "urn:ietf:params:netconf:capability:candidate:1.0",
+            "urn:ietf:params:netconf:capability:validate:1.0"])
+
+    def _transaction(self, fail=(), **kwds):
+        device = FakeDevice(self.session, self.device_handler, fail)
+        self.session.send = device.send
+        txn = Transaction(self.session, self.device_handler, timeout=5, **kwds)
+        txn.edit_config(config).edit_config(config, default_operation="replace")
+        return txn, device
+
+    def test_transaction(self):
+        txn, device = self._transaction()
+        steps = txn.commit()
+        self.assertEqual(['lock', 'edit-config', 'edit-config', 'validate', 'commit', 'unlock'],
+                         [step.name for step in steps])
+        self.assertEqual(device.operations, [step.name for step in steps])
+        # the edits and validate went out back to back once the candidate was
+        # locked, the commit once they were replied to
+        self.assertEqual([0, 1, 1, 1, 4, 5], [n for _, n in device.requests])
+        for step in steps:
+            self.assertTrue(step.ok)
+            self.assertGreater(step.elapsed, 0)
+        self.assertGreaterEqual(txn.elapsed, steps[0].elapsed + sum(step.elapsed for step in steps[3:]))
+        self.assertEqual(0, device.listener.in_flight)
+        self.assertRaises(OperationError, txn.commit)
+
+    def test_transaction_edit_failed(self):
+        txn, device = self._transaction(fail=('edit-config',))
+        with self.assertRaises(RPCError):
+            txn.commit()
+        self.assertEqual(['lock', 'edit-config', 'edit-config', 'validate', 'discard-changes', 'unlock'],
+                         device.operations)
+        self.assertEqual([True, False, False, True, True, True], [step.ok for step in txn.steps])
+
+    def test_transaction_commit_failed(self):
+        txn, device = self._transaction(fail=('commit',))
+        self.assertRaises(RPCError, txn.commit)
+        self.assertEqual(['lock', 'edit-config', 'edit-config', 'validate', 'commit',
+                          'discard-changes', 'unlock'], device.operations)
+
+    def test_transaction_lock_denied(self):
+        txn, device = self._transaction(fail=('lock',))
+        self.assertRaises(RPCError, txn.commit)
+        # the candidate is not ours to edit, discard or unlock
+        self.assertEqual(['lock'], device.operations)
+
+    def test_transaction_without_lock(self):
+        txn, device = self._transaction(fail=('validate',), lock=False, validate=True)
+        self.assertRaises(RPCError, txn.commit)
+        self.assertEqual(['edit-config', 'edit-config', 'validate', 'discard-changes'],
+                         device.operations)
+
+    def test_manager_transaction(self):
+        m = manager.Manager(self.session, self.device_handler, timeout=5)
+        txn = m.transaction(validate=False)
+        txn.edit_config(config)
+        device = FakeDevice(self.session, self.device_handler)
+        self.session.send = device.send
+        self.assertEqual(['lock', 'edit-config', 'commit', 'unlock'],
+                         [step.name for step in txn.commit()])
+
+    def test_abort_with_congested_queue(self):
+        # the requests of the abort go out in order, whatever else is queued
+        self.session._connected = True
+        writes = []
+        def write(data):
+            writes.append(bytes(data))
+            return len(data)
+        self.session._transport_write = write
+        self.session._send_ready = lambda: True
+        for _ in range(100):
+            self.session.send("<get-config>%s</get-config>" % ("x" * 10000))
+        self.session._queue_output()
+        txn = Transaction(self.session, self.device_handler, timeout=0)
+        txn._locked = True
+        txn._abort()
+        while self.session._out:
+            self.session._write_output()
+        sent = [to_ele(msg)[0] for msg in b"".join(writes).split(MSG_DELIM) if b"<nc:rpc" in msg]
+        self.assertEqual(["discard-changes", "unlock"], [etree.QName(op).localname for op in sent])
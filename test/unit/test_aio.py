@@ -0,0 +1,247 @@
+import asyncio
+import importlib.machinery
+import os
+import re
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+from ncclient import aio
+from ncclient.operations import RaiseMode, RPCError, TimeoutExpiredError
+from ncclient.operations.rpc import RPCReply, RPCReplyListener
+from ncclient.transport.errors import SessionCloseError, SSHError, TransportError
+
+HELLO = b"""<?xml version="1.0" encoding="UTF-8"?>
+<hello xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+  <capabilities>
+    <capability>urn:ietf:params:netconf:base:1.0</capability>
+    <capability>urn:ietf:params:netconf:base:1.1</capability>
+    <capability>urn:ietf:params:netconf:capability:candidate:1.0</capability>
+    <capability>urn:ietf:params:netconf:capability:notification:1.0</capability>
+  </capabilities>
+  <session-id>4</session-id>
+</hello>]]>]]>"""
+
+REPLY = b'<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" message-id="%s">%s</rpc-reply>'
+
+NOTIFICATION = b"""<notification xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0">
+<eventTime>2026-10-18T10:00:00Z</eventTime><event xmlns="urn:test">up</event></notification>"""
+
+RE_MESSAGE_ID = re.compile(rb'message-id="([^"]+)"')
+
+
+def frame11(data):
+    return b'\n#%d\n%s\n##\n' % (len(data), data)
+
+
+class FakeServer:
+
+    "A NETCONF server on a Unix socket, speaking base:1.1 after the hello exchange."
+
+    def __init__(self):
+        self.requests = []
+
+    async def handle(self, reader, writer):
+        writer.write(HELLO)
+        await reader.readuntil(b']]>]]>')
+        while True:
+            try:
+                message = await reader.readuntil(b'\n##\n')
+            except asyncio.IncompleteReadError:
+                break
+            rpc = b''.join(re.split(rb'\n#\d+\n', message[:-4]))
+            self.requests.append(rpc)
+            msg_id = RE_MESSAGE_ID.search(rpc).group(1)
+            if b'<nc:commit' in rpc:
+                continue # never replied to
+            if b'<nc:discard-changes' in rpc:
+                writer.close()
+                break
+            if b'<nc:get-config' in rpc:
+                body = b'<data><system xmlns="urn:test"><hostname>r1</hostname></system></data>'
+            elif b'<nc:lock' in rpc:
+                body = (b'<rpc-error><error-type>protocol</error-type><error-tag>lock-denied</error-tag>'
+                        b'<error-severity>error</error-severity><error-message>locked</error-message></rpc-error>')
+            else:
+                body = b'<ok/>'
+            if b'create-subscription' in rpc:
+                writer.write(frame11(REPLY % (msg_id, body)) + frame11(NOTIFICATION))
+            else:
+                writer.write(frame11(REPLY % (msg_id, body)))
+            if b'<nc:close-session' in rpc:
+                await writer.drain()
+                writer.close()
+                break
+
+
+class FakeSSHChannel:
+
+    """Stands in for an `asyncssh` channel, handing what the session writes to
+    a :class:`FakeServer` and its replies back to the session."""
+
+    def __init__(self, session, server):
+        self.session = session
+        self.reader = asyncio.StreamReader()
+        self.closed = False
+        self.task = asyncio.ensure_future(server.handle(self.reader, self))
+
+    # the channel, as seen by the session
+
+    def writelines(self, chunks):
+        self.reader.feed_data(b''.join(chunks))
+
+    def get_write_buffer_size(self):
+        return 0
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.reader.feed_eof()
+            asyncio.get_running_loop().call_soon(self.session.connection_lost, None)
+
+    # the stream writer, as seen by the server
+
+    def write(self, data):
+        asyncio.get_running_loop().call_soon(self.session.data_received, data, None)
+
+    async def drain(self):
+        pass
+
+
+class FakeSSHConnection:
+
+    def __init__(self, server):
+        self.server = server
+        self.channel = None
+        self.sessions = []
+        self.closed = False
+
+    async def create_session(self, session_factory, subsystem=None, encoding='utf-8'):
+        self.sessions.append((subsystem, encoding))
+        session = session_factory()
+        self.channel = FakeSSHChannel(session, self.server)
+        session.connection_made(self.channel)
+        session.session_started()
+        return self.channel, session
+
+    def close(self):
+        self.closed = True
+
+
+def fake_asyncssh(server):
+    "A module standing in for `asyncssh`, whose connections are served by *server*."
+    module = types.ModuleType('asyncssh')
+    module.__spec__ = importlib.machinery.ModuleSpec('asyncssh', None)
+    module.connections = []
+    async def connect(host, **kwds):
+        module.connections.append((host, kwds))
+        conn = FakeSSHConnection(server)
+        module.conn = conn
+        return conn
+    module.connect = connect
+    return module
+
+
+class TestAsyncSSH(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.fake = FakeServer()
+        self.asyncssh = fake_asyncssh(self.fake)
+        patcher = patch.dict(sys.modules, {'asyncssh': self.asyncssh})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_connect_and_requests(self):
+        m = await aio.connect_ssh('r1', port=2022, username='admin', password='secret',
+                                  hostkey_verify=False)
+        self.assertEqual([('r1', {'port': 2022, 'username': 'admin', 'password': 'secret',
+                                  'known_hosts': None})], self.asyncssh.connections)
+        self.assertEqual([('netconf', None)], self.asyncssh.conn.sessions)
+        self.assertTrue(m.connected)
+        self.assertEqual('r1', m._session.host)
+        self.assertEqual('4', m.session_id)
+        # the hello is framed with the end of message marker, the requests in chunks
+        reply = await m.get_config("running")
+        self.assertEqual(['r1'], [e.text for e in reply.data_ele.iter('{urn:test}hostname')])
+        self.assertEqual(1, len(self.fake.requests))
+        self.assertIn(b'<nc:get-config', self.fake.requests[0])
+        await m.close_session()
+        self.assertFalse(m.connected)
+        self.assertTrue(self.asyncssh.conn.closed)
+
+    async def test_connect_fails(self):
+        async def refuse(host, **kwds):
+            raise OSError('connection refused')
+        self.asyncssh.connect = refuse
+        with self.assertRaises(SSHError):
+            await aio.connect_ssh('r1', username='admin', password='secret')
+
+    async def test_not_installed(self):
+        with patch.dict(sys.modules, {'asyncssh': None}):
+            with self.assertRaises(ValueError):
+                await aio.connect_ssh('r1')
+
+
+@unittest.skipIf(sys.platform.startswith('win'), "Skipping on Windows")
+class TestAsyncManager(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'netconf.sock')
+        self.fake = FakeServer()
+        self.server = await asyncio.start_unix_server(self.fake.handle, self.path)
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.tmpdir.cleanup()
+
+    async def test_connect_and_requests(self):
+        m = await aio.connect_uds(path=self.path)
+        self.assertTrue(m.connected)
+        self.assertEqual('4', m.session_id)
+        self.assertIn('urn:ietf:params:netconf:base:1.1', m.server_capabilities)
+        replies = await asyncio.gather(*[m.get_config("running") for _ in range(5)])
+        for reply in replies:
+            self.assertIsInstance(reply, RPCReply)
+            self.assertEqual(['r1'], [e.text for e in reply.data_ele.iter('{urn:test}hostname')])
+        ids = [RE_MESSAGE_ID.search(r).group(1) for r in self.fake.requests]
+        self.assertEqual(5, len(set(ids)))
+        await m.close_session()
+        self.assertFalse(m.connected)
+        self.assertTrue(self.fake.requests[-1].endswith(b'</nc:rpc>'))
+        with self.assertRaises(TransportError):
+            await m.get_config("running")
+
+    async def test_context_manager_and_errors(self):
+        async with await aio.connect_uds(path=self.path) as m:
+            with self.assertRaises(RPCError):
+                await m.lock("running")
+            m.raise_mode = RaiseMode.NONE
+            reply = await m.lock("running")
+            self.assertFalse(reply.ok)
+            m.timeout = 0.1
+            with self.assertRaises(TimeoutExpiredError):
+                await m.commit()
+            # the timed out request no longer waits for a reply
+            listener = m._session.get_listener_instance(RPCReplyListener)
+            self.assertEqual(0, listener.in_flight)
+        self.assertFalse(m.connected)
+        self.assertIn(b'close-session', self.fake.requests[-1])
+
+    async def test_notification(self):
+        m = await aio.connect_uds(path=self.path)
+        self.assertIsNone(await m.take_notification(block=False))
+        await m.create_subscription()
+        notification = await m.take_notification(timeout=1)
+        self.assertIn('<event xmlns="urn:test">up</event>', notification.notification_xml)
+        await m.close_session()
+
+    async def test_connection_lost(self):
+        m = await aio.connect_uds(path=self.path)
+        m.timeout = None
+        with self.assertRaises(SessionCloseError):
+            await m.discard_changes()
+        self.assertFalse(m.connected)
@@ -4,7 +4,8 @@ try:
     getattr(MagicMock, 'assert_called_once')  # Python 3.6 and later
 except (ImportError, AttributeError):
     from mock import patch, MagicMock
-from ncclient import manager
+from ncclient import manager, operations
+from ncclient.xml_ import to_ele
 from ncclient.devices.junos import JunosDeviceHandler
 import logging
 import socket
@@ -100,6 +101,22 @@ class TestManager(unittest.TestCase):
                                          hostkey_verify=False,
                                          allow_agent=False)
 
+    @patch('ncclient.transport.SSHSession.connect')
+    @patch('ncclient.transport.Session.send')
+    def test_manager_prepare(self, mock_send, mock_ssh):
+        conn = self._mock_manager()
+        conn.async_mode = True
+        prepared = conn.prepare("get", filter=("subtree", "<interfaces/>"))
+        self.assertIsInstance(prepared, operations.PreparedRequest)
+        self.assertTrue(prepared.is_async)
+        self.assertEqual(10, prepared.timeout)
+        rpc = prepared.request()
+        self.assertIsInstance(rpc, operations.Get)
+        sent = to_ele(mock_send.call_args[0][0])
+        self.assertEqual(rpc.id, sent.get("message-id"))
+        self.assertIsNotNone(sent.find(".//interfaces"))
+        self.assertRaises(ValueError, conn.prepare, "no_such_operation")
+
     @patch('ncclient.manager.connect_ssh')
     def test_connect_ssh_with_hostkey_ed25519(self, mock_ssh):
         hostkey = 'AAAAC3NzaC1lZDI1NTE5AAAAIIiHpGSf8fla6tCwLpwshvMGmUK+B/0v5CsRu+5v4uT7'
@@ -273,6 +290,18 @@ class TestManager(unittest.TestCase):
         conn = self._mock_manager()
         self.assertEqual(conn.connected, True)
 
+    @patch('socket.socket')
+    @patch('paramiko.Transport')
+    @patch('ncclient.transport.ssh.hexlify')
+    @patch('ncclient.transport.ssh.Session._post_connect')
+    def test_manager_expiry_counters(
+            self, mock_session, mock_hex, mock_trans, mock_socket):
+        conn = self._mock_manager()
+        conn._session._expired_requests = 2
+        conn._session._late_replies = 1
+        self.assertEqual(2, conn.expired_requests)
+        self.assertEqual(1, conn.late_replies)
+
     @patch('ncclient.manager.Manager.HUGE_TREE_DEFAULT')
     @patch('ncclient.transport.SSHSession')
     @patch('ncclient.operations.rpc.RPC')
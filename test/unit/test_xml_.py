@@ -1,4 +1,6 @@
+import threading
 import unittest
+from unittest.mock import patch
 import os
 import sys
 
@@ -123,6 +125,20 @@ class TestXML(unittest.TestCase):
         ele = to_ele(self.reply)
         self.assertEqual(ele.tag, "rpc-reply")
 
+    def test_to_xml_bytes(self):
+        ele = etree.Element("rpc", {"message-id": "101"})
+        etree.SubElement(ele, "get").text = "naïve"
+        xml = to_xml_bytes(ele)
+        self.assertIsInstance(xml, bytes)
+        self.assertEqual(
+            '<?xml version="1.0" encoding="UTF-8"?><rpc message-id="101"><get>naïve</get></rpc>'.encode('UTF-8'),
+            xml)
+        self.assertEqual(xml.decode('UTF-8'), to_xml(ele))
+
+    def test_to_ele_bytes(self):
+        ele = to_ele(self.reply.encode('UTF-8'))
+        self.assertEqual(ele.tag, "rpc-reply")
+
     def test_parse_root(self):
         device_params = {'name': 'junos'}
         device_handler = manager.make_device_handler(device_params)
@@ -132,6 +148,157 @@ class TestXML(unittest.TestCase):
         self.assertEqual(tag, "rpc-reply")
         self.assertEqual(attrib, {'attrib1': 'test'})
 
+    def test_parse_root_bytes(self):
+        tag, attrib = parse_root(self.reply.encode('UTF-8'))
+        self.assertEqual(tag, "rpc-reply")
+        self.assertEqual(attrib, {'attrib1': 'test'})
+
+    def test_parse_root_reads_only_start(self):
+        # the rest of the document is never looked at
+        raw = '<rpc-reply message-id="101">' + ' ' * ROOT_CHUNK_SIZE + '<broken'
+        tag, attrib = parse_root(raw)
+        self.assertEqual(tag, "rpc-reply")
+        self.assertEqual(attrib, {'message-id': '101'})
+
+    def test_parse_root_malformed_body(self):
+        # broken within the first chunk, but after the root start tag
+        raw = '<rpc-reply message-id="101"><ok/><a b=></rpc-reply>'
+        self.assertEqual(("rpc-reply", {'message-id': '101'}), parse_root(raw))
+        self.assertEqual(("rpc-reply", {'message-id': '101'}), parse_root(raw.encode()))
+        self.assertRaises(etree.XMLSyntaxError, parse_root, '<rpc-reply message-id=101>')
+        self.assertRaises(etree.XMLSyntaxError, parse_root, '')
+
+    def test_ncelement_transform_result_not_reparsed(self):
+        device_params = {'name': 'junos'}
+        device_handler = manager.make_device_handler(device_params)
+        transform_reply = device_handler.transform_reply()
+        result = NCElement(self.reply, transform_reply)
+        # same tree as serializing the transform result and parsing it again
+        parser = etree.XMLParser(remove_blank_text=True)
+        transform = etree.XSLT(etree.fromstring(transform_reply))
+        expected = etree.fromstring(
+            str(transform(etree.fromstring(self.reply.encode('UTF-8'), parser))),
+            parser)
+        self.assertEqual(to_xml(expected), result.data_xml)
+
+    def test_to_xslt_cached(self):
+        device_handler = manager.make_device_handler({'name': 'junos'})
+        stylesheet = device_handler.transform_reply()
+        transform = to_xslt(stylesheet)
+        self.assertIsInstance(transform, etree.XSLT)
+        self.assertIs(transform, to_xslt(stylesheet))
+        self.assertIs(transform, to_xslt(bytes(stylesheet)))
+        self.assertIs(transform, to_xslt(stylesheet.decode('UTF-8')))
+
+    def test_to_xslt_threads(self):
+        import threading
+        stylesheet = (b'<xsl:stylesheet version="1.0" '
+                      b'xmlns:xsl="http://www.w3.org/1999/XSL/Transform">'
+                      b'<xsl:template match="/"><threads/></xsl:template>'
+                      b'</xsl:stylesheet>')
+        transforms = []
+        threads = [threading.Thread(target=lambda: transforms.append(to_xslt(stylesheet)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(8, len(transforms))
+        self.assertTrue(all(t is transforms[0] for t in transforms))
+        self.assertEqual("threads", transforms[0](to_ele("<a/>")).getroot().tag)
+
+    def test_strip_namespaces(self):
+        raw = ('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+               'xmlns:junos="http://xml.juniper.net/junos/*/junos" message-id="1">'
+               '<data><a xmlns="urn:x" junos:style="brief" b="1">'
+               '<p:c xmlns:p="urn:p" p:b="1" b="2">t</p:c><!-- c --><?pi x?>'
+               '</a></data></rpc-reply>')
+        root = to_ele(raw)
+        self.assertIs(root, strip_namespaces(root))
+        self.assertEqual(
+            '<rpc-reply message-id="1"><data><a style="brief" b="1">'
+            '<c b="2">t</c><!-- c --><?pi x?></a></data></rpc-reply>',
+            etree.tostring(root).decode('UTF-8'))
+
+    def test_strip_namespaces_same_as_xslt(self):
+        parser = etree.XMLParser(remove_blank_text=True)
+        expected = to_xslt(STRIP_NAMESPACES_XSLT)(
+            etree.fromstring(self.reply.encode('UTF-8'), parser)).getroot()
+        root = strip_namespaces(etree.fromstring(self.reply.encode('UTF-8'), parser))
+        self.assertEqual(etree.tostring(expected), etree.tostring(root))
+
+    @patch('ncclient.xml_.to_xslt')
+    def test_ncelement_strip_namespaces_without_xslt(self, mock_to_xslt):
+        result = NCElement(self.reply, STRIP_NAMESPACES_XSLT)
+        mock_to_xslt.assert_not_called()
+        self.assertEqual(result.find(".//host-name").text, "R1")
+
+    def test_xpath_cache(self):
+        cache = XPathCache(maxsize=2)
+        compiled = cache.get("//a")
+        self.assertIsInstance(compiled, etree.XPath)
+        self.assertIs(compiled, cache.get("//a"))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        # the namespace map is part of the key
+        self.assertIsNot(compiled, cache.get("//a", {'x': 'urn:x'}))
+        self.assertIs(cache.get("//a", {'x': 'urn:x'}), cache.get("//a", {'x': 'urn:x'}))
+        self.assertEqual(2, len(cache))
+        # least recently used one goes first
+        cache.get("//a")
+        cache.get("//b")
+        self.assertEqual(2, len(cache))
+        misses = cache.misses
+        cache.get("//a")
+        self.assertEqual(misses, cache.misses)
+        cache.get("//a", {'x': 'urn:x'})
+        self.assertEqual(misses + 1, cache.misses)
+        cache.clear()
+        self.assertEqual((0, 0, 0), (len(cache), cache.hits, cache.misses))
+        # each thread evaluates its own compiled expressions
+        compiled = cache.get("//a")
+        other = []
+        thread = threading.Thread(target=lambda: other.append(cache.get("//a")))
+        thread.start()
+        thread.join()
+        self.assertIsNot(compiled, other[0])
+        self.assertIs(compiled, cache.get("//a"))
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+    def test_ncelement_xpath_namespaces_not_shared(self):
+        device_handler = manager.make_device_handler({'name': 'junos'})
+        result = NCElement(self.reply, device_handler.transform_reply())
+        before = dict(XPATH_NAMESPACES)
+        self.assertEqual(result.xpath("//x:name", {'x': 'urn:x'}), [])
+        self.assertEqual(before, XPATH_NAMESPACES)
+        self.assertEqual(result.xpath("//name[re:test(., '^jun')]")[0].text, "junos")
+        hits = xpath_cache.hits
+        result.xpath("//name[re:test(., '^jun')]")
+        self.assertEqual(hits + 1, xpath_cache.hits)
+
+    def test_get_parser(self):
+        p = get_parser()
+        self.assertIsInstance(p, etree.XMLParser)
+        self.assertIs(p, get_parser())
+        self.assertIs(p, get_parser(huge_tree=False, remove_blank_text=False))
+        self.assertIsNot(p, get_parser(huge_tree=True))
+        self.assertIsNot(p, get_parser(remove_blank_text=True))
+        self.assertIsNot(get_parser(huge_tree=True),
+                         get_parser(huge_tree=True, remove_blank_text=True))
+        self.assertIsNot(p, parser)
+
+    def test_get_parser_per_thread(self):
+        import threading
+        parsers = []
+        t = threading.Thread(target=lambda: parsers.append(get_parser()))
+        t.start()
+        t.join()
+        self.assertIsNot(get_parser(), parsers[0])
+
+    def test_to_ele_thread_parser(self):
+        with patch('ncclient.xml_.etree.fromstring') as mock_fromstring:
+            to_ele("<a/>", huge_tree=True)
+        mock_fromstring.assert_called_once_with(b"<a/>", parser=get_parser(huge_tree=True))
+
     def test_validated_element_pass(self):
         device_params = {'name': 'junos'}
         device_handler = manager.make_device_handler(device_params)
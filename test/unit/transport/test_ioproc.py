@@ -0,0 +1,56 @@
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from ncclient import manager
+from ncclient.operations.rpc import RPC
+from ncclient.transport.third_party.junos.ioproc import IOProc
+from ncclient.xml_ import new_ele
+
+# stands in for the Junos netconf shell: answers the hello with its own,
+# then each request with an <ok/> reply
+NETCONF_SHELL = r'''
+import os, re, sys
+HELLO = (b'<hello xmlns="urn:ietf:params:xml:ns:netconf:base:1.0"><capabilities>'
+         b'<capability>urn:ietf:params:netconf:base:1.0</capability></capabilities>'
+         b'<session-id>7</session-id></hello>]]>]]>\n')
+buf = b''
+while True:
+    while b']]>]]>' not in buf:
+        data = os.read(0, 65536)
+        if not data:
+            sys.exit()
+        buf += data
+    msg, buf = buf.split(b']]>]]>', 1)
+    if b'<nc:hello' in msg:
+        reply = HELLO
+    else:
+        msg_id = re.search(rb'message-id="([^"]*)"', msg).group(1)
+        reply = (b'<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" message-id="%s">'
+                 b'<ok/></rpc-reply>]]>]]>\n' % msg_id)
+    os.write(1, reply)
+'''
+
+
+def netconf_shell(args, **kwds):
+    return subprocess.Popen([sys.executable, '-c', NETCONF_SHELL], **kwds)
+
+
+@unittest.skipIf(sys.platform.startswith('win'), "Skipping on Windows")
+class TestIOProc(unittest.TestCase):
+
+    @patch('ncclient.transport.third_party.junos.ioproc.Popen', side_effect=netconf_shell)
+    @patch('ncclient.transport.third_party.junos.ioproc.check_output', return_value=b'')
+    def test_request(self, mock_check_output, mock_popen):
+        device_handler = manager.make_device_handler({'name': 'junos', 'local': True})
+        session = IOProc(device_handler)
+        session.connect()
+        self.assertEqual('7', session.id)
+        try:
+            rpc = RPC(session, device_handler, timeout=5)
+            rpc._request(new_ele("commit"))
+            self.assertTrue(rpc.reply.ok)
+            self.assertEqual(0, session.queued_bytes)
+        finally:
+            session.close()
@@ -8,7 +8,7 @@ from ncclient import manager
 from ncclient.transport.ssh import SSHSession
 from ncclient.operations.third_party.juniper.rpc import *
 from ncclient.operations import RaiseMode
-from ncclient.transport.parser import DefaultXMLParser
+from ncclient.transport.parser import DefaultXMLParser, ReceiveBuffer
 
 try:
     import selectors
@@ -25,12 +25,12 @@ class TestSession(unittest.TestCase):
     @patch('paramiko.channel.Channel.recv')
     @patch('ncclient.transport.SSHSession')
     @patch('selectors.DefaultSelector.select')
-    @patch('ncclient.operations.rpc.uuid4')
-    def test_filter_xml_sax_on(self, mock_uuid4, mock_select, mock_session, mock_recv,
+    @patch('ncclient.operations.rpc.RPCReplyListener.next_id')
+    def test_filter_xml_sax_on(self, mock_next_id, mock_select, mock_session, mock_recv,
                               mock_close, mock_send, mock_send_ready, mock_connected):
         mock_send.return_value = True
         mock_send_ready.return_value = -1
-        mock_uuid4.return_value = type('dummy', (), {'urn': "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"})
+        mock_next_id.return_value = "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"
         device_handler = manager.make_device_handler({'name': 'junos', 'use_filter': True})
         rpc = '<get-software-information/>'
         mock_recv.side_effect = self._read_file('get-software-information.xml')
@@ -53,12 +53,12 @@ class TestSession(unittest.TestCase):
     @patch('paramiko.channel.Channel.recv')
     @patch('ncclient.transport.SSHSession')
     @patch('selectors.DefaultSelector.select')
-    @patch('ncclient.operations.rpc.uuid4')
-    def test_filter_xml_sax_on_junos_rfc_compliant(self, mock_uuid4, mock_select, mock_session, mock_recv,
+    @patch('ncclient.operations.rpc.RPCReplyListener.next_id')
+    def test_filter_xml_sax_on_junos_rfc_compliant(self, mock_next_id, mock_select, mock_session, mock_recv,
                               mock_close, mock_send, mock_send_ready, mock_connected):
         mock_send.return_value = True
         mock_send_ready.return_value = -1
-        mock_uuid4.return_value = type('dummy', (), {'urn': "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"})
+        mock_next_id.return_value = "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"
         device_handler = manager.make_device_handler({'name': 'junos', 'use_filter': True})
         rpc = '<get-software-information/>'
         mock_recv.side_effect = self._read_file('get-software-information.xml')
@@ -83,14 +83,14 @@ class TestSession(unittest.TestCase):
     @patch('paramiko.channel.Channel.recv')
     @patch('ncclient.transport.SSHSession')
     @patch('selectors.DefaultSelector.select')
-    @patch('ncclient.operations.rpc.uuid4')
-    def test_filter_xml_delimiter_rpc_reply(self, mock_uuid4, mock_select,
+    @patch('ncclient.operations.rpc.RPCReplyListener.next_id')
+    def test_filter_xml_delimiter_rpc_reply(self, mock_next_id, mock_select,
                                             mock_session, mock_recv, mock_close,
                                             mock_send, mock_send_ready,
                                             mock_connected):
         mock_send.return_value = True
         mock_send_ready.return_value = -1
-        mock_uuid4.return_value = type('dummy', (), {'urn': "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"})
+        mock_next_id.return_value = "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"
         device_handler = manager.make_device_handler({'name': 'junos', 'use_filter': True})
         rpc = '<get-software-information/>'
         mock_recv.side_effect = self._read_file('get-software-information.xml')[:-1] + [b"</rpc-reply>]]>", b"]]>"]
@@ -112,14 +112,14 @@ class TestSession(unittest.TestCase):
     @patch('paramiko.channel.Channel.recv')
     @patch('ncclient.transport.SSHSession')
     @patch('selectors.DefaultSelector.select')
-    @patch('ncclient.operations.rpc.uuid4')
-    def test_filter_xml_delimiter_multiple_rpc_reply(self, mock_uuid4, mock_select,
+    @patch('ncclient.operations.rpc.RPCReplyListener.next_id')
+    def test_filter_xml_delimiter_multiple_rpc_reply(self, mock_next_id, mock_select,
                                             mock_session, mock_recv, mock_close,
                                             mock_send, mock_send_ready,
                                             mock_connected):
         mock_send.return_value = True
         mock_send_ready.return_value = -1
-        mock_uuid4.return_value = type('dummy', (), {'urn': "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"})
+        mock_next_id.return_value = "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"
         device_handler = manager.make_device_handler({'name': 'junos', 'use_filter': True})
         rpc = '<get-software-information/>'
         mock_recv.side_effect = self._read_file('get-software-information.xml')[:-1] + [b"</rpc-reply>]]>",
@@ -143,15 +143,15 @@ class TestSession(unittest.TestCase):
         @patch('paramiko.channel.Channel.recv')
         @patch('ncclient.transport.SSHSession')
         @patch('selectors.DefaultSelector.select')
-        @patch('ncclient.operations.rpc.uuid4')
-        def test_filter_xml_delimiter_multiple_rpc_in_parallel(self, mock_uuid4, mock_select,
+        @patch('ncclient.operations.rpc.RPCReplyListener.next_id')
+        def test_filter_xml_delimiter_multiple_rpc_in_parallel(self, mock_next_id, mock_select,
                                                                mock_session, mock_recv, mock_close,
                                                                mock_send, mock_send_ready,
                                                                mock_connected):
             mock_send.return_value = True
             mock_send_ready.return_value = -1
-            mock_uuid4.side_effect = [type('xyz', (), {'urn': "urn:uuid:ddef40cb-5745-481d-974d-7188f9f2bb33"}),
-                                      type('pqr', (), {'urn': "urn:uuid:549ef9d1-024a-4fd0-88bf-047d25f0870d"})]
+            mock_next_id.side_effect = ["urn:uuid:ddef40cb-5745-481d-974d-7188f9f2bb33",
+                                      "urn:uuid:549ef9d1-024a-4fd0-88bf-047d25f0870d"]
             device_handler = manager.make_device_handler({'name': 'junos', 'use_filter': True})
             rpc = '<get-software-information/>'
             mock_recv.side_effect = [b"""
@@ -228,14 +228,14 @@ class TestSession(unittest.TestCase):
     @patch('paramiko.channel.Channel.recv')
     @patch('ncclient.transport.SSHSession')
     @patch('selectors.DefaultSelector.select')
-    @patch('ncclient.operations.rpc.uuid4')
-    def test_filter_xml_delimiter_splited_rpc_reply(self, mock_uuid4, mock_select,
+    @patch('ncclient.operations.rpc.RPCReplyListener.next_id')
+    def test_filter_xml_delimiter_splited_rpc_reply(self, mock_next_id, mock_select,
                                             mock_session, mock_recv, mock_close,
                                             mock_send, mock_send_ready,
                                             mock_connected):
         mock_send.return_value = True
         mock_send_ready.return_value = -1
-        mock_uuid4.return_value = type('dummy', (), {'urn': "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"})
+        mock_next_id.return_value = "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"
         device_handler = manager.make_device_handler({'name': 'junos', 'use_filter': True})
         rpc = '<get-software-information/>'
         mock_recv.side_effect = self._read_file('get-software-information.xml')[:-1] + [b"</rpc", b"-reply>]]>",
@@ -259,15 +259,15 @@ class TestSession(unittest.TestCase):
     @patch('paramiko.channel.Channel.recv')
     @patch('ncclient.transport.SSHSession')
     @patch('selectors.DefaultSelector.select')
-    @patch('ncclient.operations.rpc.uuid4')
-    def test_use_filter_xml_without_sax_input(self, mock_uuid4, mock_select,
+    @patch('ncclient.operations.rpc.RPCReplyListener.next_id')
+    def test_use_filter_xml_without_sax_input(self, mock_next_id, mock_select,
                                               mock_session, mock_recv,
                                               mock_close, mock_send,
                                               mock_send_ready,
                                               mock_connected):
         mock_send.return_value = True
         mock_send_ready.return_value = -1
-        mock_uuid4.return_value = type('dummy', (), {'urn': "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"})
+        mock_next_id.return_value = "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"
         device_handler = manager.make_device_handler({'name': 'junos', 'use_filter': True})
         rpc = '<get-software-information/>'
         mock_recv.side_effect = self._read_file('get-software-information.xml')
@@ -289,15 +289,15 @@ class TestSession(unittest.TestCase):
     @patch('paramiko.channel.Channel.recv')
     @patch('ncclient.transport.SSHSession')
     @patch('selectors.DefaultSelector.select')
-    @patch('ncclient.operations.rpc.uuid4')
-    def test_use_filter_False(self, mock_uuid4, mock_select,
+    @patch('ncclient.operations.rpc.RPCReplyListener.next_id')
+    def test_use_filter_False(self, mock_next_id, mock_select,
                                               mock_session, mock_recv,
                                               mock_close, mock_send,
                                               mock_send_ready,
                                               mock_connected):
         mock_send.return_value = True
         mock_send_ready.return_value = -1
-        mock_uuid4.return_value = type('dummy', (), {'urn': "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"})
+        mock_next_id.return_value = "urn:uuid:e0a7abe3-fffa-11e5-b78e-b8e85604f858"
         device_handler = manager.make_device_handler({'name': 'junos', 'use_filter': False})
         rpc = '<get-software-information/>'
         mock_recv.side_effect = self._read_file('get-software-information.xml')
@@ -321,3 +321,42 @@ class TestSession(unittest.TestCase):
         with open(fpath, "rb") as fp:
             lines = fp.readlines()
         return lines
+
+
+class TestReceiveBuffer(unittest.TestCase):
+
+    def test_recv_into(self):
+        buf = ReceiveBuffer(b'<rpc-reply>')
+
+        def read_into(view):
+            view[:6] = b'<ok/>\n'
+            return 6
+        self.assertEqual(buf.recv_into(read_into, 4096), 6)
+        self.assertEqual(buf.getvalue(), b'<rpc-reply><ok/>\n')
+        self.assertEqual(buf.recv_into(lambda view: 0, 4096), 0)
+        self.assertEqual(len(buf), 17)
+
+    def test_consume_reuses_buffer(self):
+        buf = ReceiveBuffer()
+        buf.write(b'first]]>]]>second')
+        backing = buf._buf
+        buf.consume(11)
+        self.assertEqual(buf.getvalue(), b'second')
+        buf.consume(6)
+        self.assertEqual(len(buf), 0)
+        buf.write(b'third')
+        self.assertIs(buf._buf, backing)
+        self.assertEqual(buf.getvalue(), b'third')
+
+    def test_file_like_access(self):
+        buf = ReceiveBuffer()
+        buf.write(b'junk]]>]]><rpc-reply/>')
+        buf.consume(10)
+        buf.seek(0, os.SEEK_END)
+        self.assertEqual(buf.tell(), 12)
+        buf.seek(buf.tell() - 3)
+        self.assertEqual(buf.read(), b'y/>')
+        buf.truncate(buf.tell() - 2)
+        self.assertEqual(buf.getvalue(), b'<rpc-reply')
+        with buf.getbuffer() as view:
+            self.assertEqual(view.tobytes(), b'<rpc-reply')
@@ -0,0 +1,115 @@
+import socket
+import sys
+import threading
+import time
+import unittest
+
+from ncclient import manager
+from ncclient.operations.rpc import RPC, RPCReplyListener
+from ncclient.transport.errors import SessionCloseError
+from ncclient.xml_ import new_ele
+
+if sys.platform != 'win32':
+    from ncclient.transport.reactor import Reactor
+    from ncclient.transport.unixSocket import UnixSocketSession
+
+HELLO = b"""<hello xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+<capabilities><capability>urn:ietf:params:netconf:base:1.0</capability></capabilities>
+<session-id>%d</session-id></hello>]]>]]>"""
+
+REPLY = b'<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" message-id="%s"><ok/></rpc-reply>]]>]]>'
+
+
+def read_message(peer):
+    data = b''
+    while not data.endswith(b']]>]]>'):
+        chunk = peer.recv(65536)
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+@unittest.skipIf(sys.platform.startswith('win'), "Skipping on Windows")
+class TestReactor(unittest.TestCase):
+
+    def setUp(self):
+        self.reactor = Reactor()
+        self.device_handler = manager.make_device_handler({'name': 'default'})
+        self.peers = []
+
+    def tearDown(self):
+        self.reactor.stop()
+        for peer in self.peers:
+            peer.close()
+
+    def _connect(self, session_id=1):
+        session = UnixSocketSession(self.device_handler)
+        session.reactor = self.reactor
+        session._socket, peer = socket.socketpair()
+        peer.settimeout(5)
+        self.peers.append(peer)
+        peer.sendall(HELLO % session_id)
+        session._connected = True
+        session._post_connect(timeout=5)
+        self.assertIn(b'<nc:hello', read_message(peer))
+        return session, peer
+
+    def test_sessions_share_reactor_thread(self):
+        threads = threading.active_count()
+        sessions = [self._connect(i) for i in range(1, 4)]
+        self.assertEqual(['1', '2', '3'], [s.id for s, _ in sessions])
+        self.assertEqual(3, self.reactor.sessions)
+        for session, peer in sessions:
+            self.assertFalse(session.is_alive())
+            rpc = RPC(session, self.device_handler, async_mode=True)
+            rpc._request(new_ele("commit"))
+            self.assertIn(b'<nc:commit/>', read_message(peer))
+            peer.sendall(REPLY % rpc.id.encode())
+            self.assertTrue(rpc.result(timeout=5).ok)
+        # the reactor and its dispatch workers, not a thread per session
+        self.assertLessEqual(threading.active_count() - threads, 3)
+        sessions[0][0].close()
+        sessions[1][1].close()
+        rpc = RPC(sessions[2][0], self.device_handler, async_mode=True)
+        rpc._request(new_ele("commit"))
+        read_message(sessions[2][1])
+        sessions[2][1].sendall(REPLY % rpc.id.encode())
+        rpc.result(timeout=5)
+        self.assertEqual(1, self.reactor.sessions)
+
+    def test_replies_dispatched_in_order(self):
+        session, peer = self._connect()
+        listener = RPCReplyListener(session, self.device_handler)
+        rpcs = [RPC(session, self.device_handler, async_mode=True) for _ in range(50)]
+        order = []
+        for rpc in rpcs:
+            rpc.add_done_callback(lambda f: order.append(f.id))
+        peer.sendall(b''.join(REPLY % rpc.id.encode() for rpc in rpcs))
+        for rpc in rpcs:
+            rpc.result(timeout=5)
+        self.assertEqual([rpc.id for rpc in rpcs], order)
+        self.assertEqual(0, listener.in_flight)
+
+    def test_peer_closing_fails_session(self):
+        session, peer = self._connect()
+        rpc = RPC(session, self.device_handler, async_mode=True)
+        peer.close()
+        self.assertIsInstance(rpc.exception(timeout=5), SessionCloseError)
+        # the session is closed right after the error has been dispatched
+        for _ in range(500):
+            if not session.connected:
+                break
+            time.sleep(0.01)
+        self.assertFalse(session.connected)
+        self.assertEqual(0, self.reactor.sessions)
+
+    def test_dispatch_in_reactor_thread(self):
+        self.reactor = Reactor(dispatch_workers=0)
+        session, peer = self._connect()
+        rpc = RPC(session, self.device_handler, async_mode=True)
+        threads = []
+        rpc.add_done_callback(lambda f: threads.append(threading.current_thread()))
+        peer.sendall(REPLY % rpc.id.encode())
+        rpc.result(timeout=5)
+        self.assertEqual([self.reactor], threads)
@@ -1,15 +1,18 @@
 import unittest
 try:
-    from unittest.mock import patch  # Python 3.4 and later
+    from unittest.mock import MagicMock, patch  # Python 3.4 and later
 except ImportError:
-    from mock import patch
+    from mock import MagicMock, patch
 from ncclient.transport.session import *
+from ncclient.transport.parser import ReceiveBuffer
 from ncclient.devices.junos import JunosDeviceHandler
 try:
     from Queue import Queue, Empty
 except ImportError:
     from queue import Queue, Empty
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 
 
@@ -62,8 +65,69 @@ class TestSession(unittest.TestCase):
         obj._device_handler = device_handler
         listener = HelloHandler(None, None)
         obj._listeners.add(listener)
+        obj._dispatch_message(hello_rpc_reply)
+        mock_handler.assert_called_once_with(parse_root(hello_rpc_reply), hello_rpc_reply)
+
+    @patch('ncclient.transport.session.HelloHandler.callback')
+    def test_dispatch_message_root_tags(self, mock_handler):
+        obj = Session([':candidate'])
+        obj._device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj.add_listener(HelloHandler(None, None))
+        any_listener = MagicMock(spec=SessionListener, raw_bytes=False, root_tags=None)
+        obj.add_listener(any_listener)
+        obj._dispatch_message(rpc_reply)
+        self.assertFalse(mock_handler.called)
+        any_listener.callback.assert_called_once_with(parse_root(rpc_reply), rpc_reply)
+        routes = obj._get_routes()
+        self.assertIs(routes, obj._get_routes())
+        # replaced, not modified, when the listeners change
+        reply_listener = MagicMock(spec=SessionListener, raw_bytes=False,
+                                   root_tags=('rpc-reply',))
+        obj.add_listener(reply_listener)
+        self.assertIsNot(routes, obj._get_routes())
+        self.assertNotIn('rpc-reply', routes)
         obj._dispatch_message(rpc_reply)
-        mock_handler.assert_called_once_with(parse_root(rpc_reply), rpc_reply)
+        reply_listener.callback.assert_called_once_with(parse_root(rpc_reply), rpc_reply)
+        self.assertEqual(2, any_listener.callback.call_count)
+        obj.remove_listener(reply_listener)
+        obj._dispatch_message(rpc_reply)
+        self.assertEqual(1, reply_listener.callback.call_count)
+
+    @patch('ncclient.transport.session.parse_root')
+    @patch('ncclient.transport.session.HelloHandler.callback')
+    def test_dispatch_message_element(self, mock_handler, mock_parse_root):
+        obj = Session([':candidate'])
+        obj._device_handler = JunosDeviceHandler({'name': 'junos'})
+        listener = HelloHandler(None, None)
+        obj._listeners.add(listener)
+        ele = to_ele(hello_rpc_reply)
+        obj._dispatch_message(hello_rpc_reply, ele=ele)
+        mock_handler.assert_called_once_with((ele.tag, ele.attrib), hello_rpc_reply)
+        self.assertFalse(mock_parse_root.called)
+
+    def test_dispatch_message_bytes(self):
+        obj = Session([':candidate'])
+        obj._device_handler = JunosDeviceHandler({'name': 'junos'})
+        raw = rpc_reply.encode('UTF-8')
+        text_listeners = [MagicMock(spec=SessionListener, raw_bytes=False, root_tags=None) for _ in range(2)]
+        bytes_listener = MagicMock(spec=SessionListener, raw_bytes=True, root_tags=None)
+        for l in text_listeners + [bytes_listener]:
+            obj._listeners.add(l)
+        obj._dispatch_message(raw)
+        root = parse_root(rpc_reply)
+        bytes_listener.callback.assert_called_once_with(root, raw)
+        # listeners that want a string get the same, once decoded, string
+        texts = [l.callback.call_args[0][1] for l in text_listeners]
+        self.assertEqual(texts[0], rpc_reply)
+        self.assertIs(texts[0], texts[1])
+
+    @patch('ncclient.devices.junos.JunosDeviceHandler.handle_raw_dispatch')
+    def test_dispatch_message_bytes_raw_dispatch(self, mock_handle_raw_dispatch):
+        mock_handle_raw_dispatch.return_value = False
+        obj = Session([':candidate'])
+        obj._device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj._dispatch_message(b'<rpc-reply message-id=101><ok/></rpc-reply>')
+        mock_handle_raw_dispatch.assert_called_once_with('<rpc-reply message-id=101><ok/></rpc-reply>')
 
     @patch('ncclient.transport.session.parse_root')
     @patch('ncclient.logging_.SessionLoggerAdapter.error')
@@ -183,7 +247,7 @@ class TestSession(unittest.TestCase):
         obj = Session(cap)
         obj._connected = True
         obj.send("Hello World")
-        self.assertEqual("Hello World", obj._q.get())
+        self.assertEqual("Hello World", obj._q.get_nowait())
 
     def test_send_disconnected(self):
         cap = [':candidate']
@@ -192,6 +256,153 @@ class TestSession(unittest.TestCase):
         self.assertRaises(TransportError,
             obj.send, "Hello World")
 
+    def test_write_output_coalesced(self):
+        obj = Session([':candidate'])
+        obj._connected = True
+        obj._base = NetconfBase.BASE_11
+        writes = []
+        def write(data):
+            writes.append(bytes(data))
+            return len(data)
+        obj._transport_write = write
+        obj._send_ready = lambda: True
+        obj.send("<get/>")
+        obj.send("<get-config/>")
+        obj._queue_output()
+        self.assertTrue(obj._q.empty())
+        obj._write_output()
+        self.assertEqual(writes, [b"\n#6\n<get/>\n##\n\n#13\n<get-config/>\n##\n"])
+        self.assertFalse(obj._out)
+
+    def test_max_queued_bytes(self):
+        obj = Session([':candidate'])
+        obj._connected = True
+        obj._transport_write = lambda data: len(data)
+        obj._send_ready = lambda: True
+        self.assertIsNone(obj.max_queued_bytes)
+        obj.max_queued_bytes = 100
+        obj.flow_policy = FlowPolicy.FAIL
+        obj.send("<get>%s</get>" % ("x" * 40))
+        self.assertEqual(51, obj.queued_bytes)
+        self.assertEqual(1, obj.queue_depth)
+        self.assertRaises(SessionBusyError, obj.send, "<get>%s</get>" % ("x" * 40))
+        obj._queue_output()
+        self.assertEqual(0, obj.queue_depth)
+        # framed
+        self.assertEqual(57, obj.queued_bytes)
+        obj.flow_policy = FlowPolicy.BLOCK
+        self.assertRaises(SessionBusyError, obj.send, "<get>%s</get>" % ("x" * 40), timeout=0.01)
+        threading.Timer(0.01, obj._write_output).start()
+        obj.send("<get>%s</get>" % ("x" * 40), timeout=5)
+        self.assertEqual(51, obj.queued_bytes)
+        obj._queue_output()
+        obj._write_output()
+        self.assertEqual(0, obj.queued_bytes)
+        # a message over the limit still goes out on its own
+        obj.send("<get>%s</get>" % ("x" * 200))
+        self.assertRaises(ValueError, setattr, obj, "max_queued_bytes", 0)
+        self.assertRaises(ValueError, setattr, obj, "flow_policy", 2)
+
+    def test_send_priority(self):
+        obj = Session([':candidate'])
+        obj._connected = True
+        writes = []
+        def write(data):
+            writes.append(bytes(data))
+            return len(data)
+        obj._transport_write = write
+        obj._send_ready = lambda: True
+        obj.send("<get-config/>", priority=Priority.LOW)
+        obj.send("<get/>")
+        obj.send("<lock/>", priority=Priority.HIGH)
+        obj.send("<unlock/>", priority=Priority.HIGH)
+        self.assertEqual(4, obj.queue_depth)
+        obj._queue_output()
+        obj._write_output()
+        self.assertEqual(b"".join(writes), b"<lock/>]]>]]><unlock/>]]>]]><get/>]]>]]><get-config/>]]>]]>")
+        self.assertRaises(ValueError, obj.send, "<get/>", priority=3)
+
+    def test_send_queue_get(self):
+        q = SendQueue()
+        self.assertRaises(Empty, q.get, 0.01)
+        threading.Timer(0.01, q.put, ("<get/>",)).start()
+        self.assertEqual("<get/>", q.get(5))
+        q.put("<get/>", Priority.LOW)
+        q.put("<lock/>", Priority.HIGH)
+        self.assertEqual("<lock/>", q.get())
+        self.assertEqual(1, q.qsize())
+
+    def test_send_priority_overtakes_queued_output(self):
+        obj = Session([':candidate'])
+        obj._connected = True
+        writes = []
+        def write(data):
+            writes.append(bytes(data))
+            return len(data)
+        obj._transport_write = write
+        obj._select_writable = True
+        bulk = "<get-config>%s</get-config>" % ("x" * 10000)
+        for _ in range(100):
+            obj.send(bulk)
+        obj._queue_output()
+        # only as much output as the transport is about to take is framed
+        self.assertGreaterEqual(obj._out_size, OUTPUT_BUFFER_SIZE)
+        self.assertLess(obj._out_size, OUTPUT_BUFFER_SIZE + len(bulk) + len(MSG_DELIM))
+        framed = 100 - obj.queue_depth
+        obj.send("<cancel-commit/>", priority=Priority.HIGH)
+        while obj._out:
+            obj._write_output()
+        data = b"".join(writes)
+        self.assertEqual((len(bulk) + len(MSG_DELIM)) * framed, data.index(b"<cancel-commit/>"))
+        self.assertEqual(len(data), (len(bulk) + len(MSG_DELIM)) * 100 + len(b"<cancel-commit/>]]>]]>"))
+        self.assertEqual(0, obj.queued_bytes)
+        self.assertEqual(0, obj._out_size)
+
+    def test_write_output_partial_writes(self):
+        obj = Session([':candidate'])
+        obj._connected = True
+        payload = "x" * (WRITE_COALESCE_SIZE + 1)
+        writes = []
+        def write(data):
+            self.assertIsInstance(data, memoryview)
+            self.assertLessEqual(len(data), WRITE_CHUNK_SIZE)
+            writes.append(bytes(data[:1000]))
+            return len(writes[-1])
+        obj._transport_write = write
+        obj._send_ready = lambda: True
+        obj.send(payload)
+        obj.send("<get/>")
+        obj._queue_output()
+        # a partial write hands control back to the main loop
+        obj._write_output()
+        self.assertEqual(len(writes), 1)
+        while obj._out:
+            obj._write_output()
+        self.assertEqual(b"".join(writes),
+                         payload.encode() + MSG_DELIM + b"<get/>" + MSG_DELIM)
+
+    def test_write_output_blocking(self):
+        obj = Session([':candidate'])
+        obj._connected = True
+        obj._select_writable = True
+        def write(data):
+            raise BlockingIOError()
+        obj._transport_write = write
+        obj.send("<get/>")
+        obj._queue_output()
+        obj._write_output()
+        self.assertEqual(bytes(obj._out[0]), b"<get/>" + MSG_DELIM)
+
+    def test_write_output_closed(self):
+        obj = Session([':candidate'])
+        obj._connected = True
+        obj._buffer = ReceiveBuffer()
+        obj._transport_write = lambda data: 0
+        obj._send_ready = lambda: True
+        obj.send("<get/>")
+        obj._queue_output()
+        self.assertRaises(SessionCloseError, obj._write_output)
+
     def test_connected(self):
         cap = [':candidate']
         obj = Session(cap)
@@ -209,6 +420,50 @@ class TestSession(unittest.TestCase):
         obj._server_capabilities = cap
         self.assertEqual(obj.server_capabilities, cap)
 
+    def test_read_size(self):
+        obj = Session([':validate'])
+        self.assertEqual(obj.read_size, 65536)
+        obj.read_size = 1024 * 1024
+        self.assertEqual(obj.read_size, 1024 * 1024)
+        with self.assertRaises(ValueError):
+            obj.read_size = 0
+
+    def test_dispatch_executor(self):
+        obj = Session([':candidate'])
+        obj._device_handler = JunosDeviceHandler({'name': 'junos'})
+        self.assertIsNone(obj.dispatch_executor)
+        executor = ThreadPoolExecutor(max_workers=4)
+        obj.dispatch_executor = executor
+        self.assertIs(obj.dispatch_executor, executor)
+        received = []
+        listener = MagicMock(spec=SessionListener, raw_bytes=False, root_tags=None)
+        listener.callback.side_effect = lambda root, raw: received.append(
+            (raw, threading.current_thread()))
+        obj._listeners.add(listener)
+        messages = [rpc_reply.replace('attrib1 = "test"', 'attrib1 = "%d"' % i)
+                    for i in range(100)]
+        for raw in messages:
+            obj._dispatch_message(raw)
+        executor.shutdown(wait=True)
+        # in order, and not in this thread
+        self.assertEqual(messages, [raw for raw, _ in received])
+        self.assertNotIn(threading.current_thread(), [t for _, t in received])
+        # once the executor is shut down, messages are dispatched right away
+        for raw in messages[:2]:
+            obj._dispatch_message(raw)
+        self.assertEqual(messages + messages[:2], [raw for raw, _ in received])
+        self.assertEqual(0, obj._dispatcher.pending(obj))
+
+    def test_dispatch_executor_invalid(self):
+        obj = Session([':candidate'])
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            with self.assertRaises(ValueError):
+                obj.dispatch_executor = executor
+        obj._connected = True
+        with self.assertRaises(SessionError):
+            obj.dispatch_executor = ThreadPoolExecutor(max_workers=1)
+        self.assertIsNone(obj.dispatch_executor)
+
     def test_id(self):
         cap = [':validate']
         obj = Session(cap)
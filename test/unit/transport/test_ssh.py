@@ -4,6 +4,7 @@ from unittest.mock import MagicMock, patch, call
 
 from ncclient.transport.ssh import SSHSession
 from ncclient.transport import AuthenticationError, SessionCloseError, NetconfBase
+from ncclient.transport.errors import NetconfFramingError
 import paramiko
 from ncclient.devices.junos import JunosDeviceHandler
 
@@ -86,7 +87,7 @@ class TestSSH(unittest.TestCase):
 
         for i in range(0, len(expected_messages)):
             call = mock_dispatch.call_args_list[i][0][0]
-            self.assertEqual(call, expected_messages[i])
+            self.assertEqual(call, expected_messages[i].encode('UTF-8'))
 
         self.assertEqual(obj._buffer.getvalue(), remainder)
 
@@ -106,10 +107,47 @@ class TestSSH(unittest.TestCase):
         expected_messages = [reply_data, reply_ok]
         for i in range(0, len(expected_messages)):
             call = mock_dispatch.call_args_list[i][0][0]
-            self.assertEqual(call, expected_messages[i])
+            self.assertEqual(call, expected_messages[i].encode('UTF-8'))
 
         self.assertEqual(obj._buffer.getvalue(), remainder)
 
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_parse11_incremental(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        obj._base = NetconfBase.BASE_11
+        data = bytes(rpc_reply11, "utf-8")
+        for i in range(len(data)):
+            obj.parser.parse(data[i:i + 1])
+
+        expected_messages = [reply_data, reply_ok]
+        self.assertEqual(mock_dispatch.call_count, len(expected_messages))
+        for i in range(0, len(expected_messages)):
+            call = mock_dispatch.call_args_list[i][0][0]
+            self.assertEqual(call, expected_messages[i].encode('UTF-8'))
+        self.assertEqual(obj._buffer.getvalue(),
+                         bytes(reply_ok_partial_chunk, "utf-8"))
+
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_parse11_multibyte_split_over_chunks(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        obj._base = NetconfBase.BASE_11
+        message = "<rpc-reply><ok>naïve garçon</ok></rpc-reply>".encode()
+        split = message.index("ï".encode()) + 1
+        obj.parser.parse(b"\n#%d\n%s" % (split, message[:split]))
+        obj.parser.parse(b"\n#%d\n%s\n##\n" % (len(message[split:]), message[split:]))
+        mock_dispatch.assert_called_once_with(message)
+
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_parse11_framing_error(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        obj._base = NetconfBase.BASE_11
+        self.assertRaises(NetconfFramingError, obj.parser.parse,
+                          b"<rpc-reply><ok/></rpc-reply>\n##\n")
+        self.assertFalse(mock_dispatch.called)
+
     @patch('ncclient.transport.ssh.Session._dispatch_message')
     def test_parse_incomplete_delimiter(self, mock_dispatch):
         device_handler = JunosDeviceHandler({'name': 'junos'})
@@ -123,6 +161,66 @@ class TestSSH(unittest.TestCase):
         obj._parse()
         self.assertTrue(mock_dispatch.called)
 
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_parse10_incremental(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        data = bytes(rpc_reply, "utf-8")
+        for i in range(len(data)):
+            obj.parser.parse(data[i:i + 1])
+
+        self.assertEqual(mock_dispatch.call_count, 2)
+        self.assertEqual(mock_dispatch.call_args_list[0][0][0], reply_data.encode('UTF-8'))
+        self.assertEqual(mock_dispatch.call_args_list[1][0][0], reply_ok.encode('UTF-8'))
+        self.assertEqual(obj._buffer.getvalue(), bytes("\n" + reply_ok, "utf-8"))
+
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_parse11_streaming(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        obj._base = NetconfBase.BASE_11
+        obj.streaming_parse = True
+        start_tag = '<rpc-reply message-id="101">'
+        obj.parser.parse(b"\n#%d\n%s" % (len(start_tag), start_tag.encode()))
+        self.assertEqual(obj.parser.message_root[0], "rpc-reply")
+        self.assertEqual(obj.parser.message_root[1]["message-id"], "101")
+        obj.parser.parse(b"\n#%d\n<ok/></rpc-reply>\n##\n" % len("<ok/></rpc-reply>"))
+        self.assertIsNone(obj.parser.message_root)
+        self.assertEqual(mock_dispatch.call_args[0][0],
+                         (start_tag + "<ok/></rpc-reply>").encode())
+        self.assertIsNotNone(mock_dispatch.call_args[1]["ele"].find("ok"))
+
+        mock_dispatch.reset_mock()
+        data = bytes(rpc_reply11, "utf-8")
+        for i in range(len(data)):
+            obj.parser.parse(data[i:i + 1])
+        self.assertEqual(mock_dispatch.call_count, 2)
+        raw, = mock_dispatch.call_args_list[0][0]
+        ele = mock_dispatch.call_args_list[0][1]["ele"]
+        self.assertEqual(raw, reply_data.encode('UTF-8'))
+        self.assertEqual(ele.findtext("software-information/host-name"), "R1")
+        # reply_ok is not well-formed, so it is left to the regular dispatch
+        self.assertEqual(mock_dispatch.call_args_list[1], call(reply_ok.encode('UTF-8')))
+
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_parse10_streaming(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        obj.streaming_parse = True
+        reply = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+                '<rpc-reply message-id="101"><ok/></rpc-reply>'
+        data = bytes("\n" + reply + "]]>]]>" + rpc_reply, "utf-8")
+        for i in range(len(data)):
+            obj.parser.parse(data[i:i + 1])
+
+        self.assertEqual(mock_dispatch.call_count, 3)
+        self.assertEqual(mock_dispatch.call_args_list[0][0][0], reply.encode())
+        ele = mock_dispatch.call_args_list[0][1]["ele"]
+        self.assertEqual(ele.attrib["message-id"], "101")
+        self.assertEqual(mock_dispatch.call_args_list[1][0][0], reply_data.encode('UTF-8'))
+        self.assertIn("ele", mock_dispatch.call_args_list[1][1])
+        self.assertEqual(mock_dispatch.call_args_list[2], call(reply_ok.encode('UTF-8')))
+
     @patch('paramiko.transport.Transport.auth_publickey')
     @patch('paramiko.agent.AgentSSH.get_keys')
     def test_auth_agent(self, mock_get_key, mock_auth_public_key):
@@ -16,6 +16,7 @@ import ssl
 import sys
 import unittest
 import socket
+import threading
 from unittest.mock import MagicMock, patch, call
 
 try:
@@ -48,6 +49,7 @@ class TestTLS(unittest.TestCase):
                         protocol=tls_proto)
         mock_wrap_socket.connect.assert_called_once_with(
             (HOST, DEFAULT_TLS_NETCONF_PORT))
+        mock_wrap_socket.setblocking.assert_called_once_with(False)
         self.assertTrue(session.connected)
 
     @patch('ssl.SSLContext.wrap_socket')
@@ -116,3 +118,40 @@ class TestTLS(unittest.TestCase):
         session.close()
         mock_sock_close_fn.assert_called_once_with()
         self.assertFalse(session._connected)
+
+    def _tls_pair(self):
+        "A session with a connected, non-blocking TLS socket, and the server end."
+        server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_ctx.load_cert_chain(CERTFILE_WITH_KEY)
+        client_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        client_ctx.check_hostname = False
+        client_ctx.verify_mode = ssl.CERT_NONE
+        a, b = socket.socketpair()
+        for sock in (a, b):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 16384)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 16384)
+        server = server_ctx.wrap_socket(b, server_side=True, do_handshake_on_connect=False)
+        client = client_ctx.wrap_socket(a, do_handshake_on_connect=False)
+        handshake = threading.Thread(target=server.do_handshake)
+        handshake.start()
+        client.do_handshake()
+        handshake.join()
+        client.setblocking(False)
+        session = TLSSession(MagicMock())
+        session._socket = client
+        session._connected = True
+        self.addCleanup(client.close)
+        self.addCleanup(server.close)
+        return session, server
+
+    def test_write_does_not_block(self):
+        session, server = self._tls_pair()
+        session.send(b"x" * (1 << 20))
+        # the peer reads nothing, so the socket fills up and the write
+        # returns instead of waiting
+        for _ in range(1000):
+            session._write_output()
+        self.assertTrue(session._out)
+        # nothing to read is not the end of the session
+        session._closing.clear()
+        self.assertTrue(session._receive())
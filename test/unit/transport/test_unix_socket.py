@@ -2,6 +2,8 @@
 import sys
 import unittest
 import socket
+import selectors
+import threading
 from ncclient.devices.junos import JunosDeviceHandler
 
 try:
@@ -14,6 +16,8 @@ if sys.platform != 'win32':
     from ncclient.transport.errors import UnixSocketError
     from ncclient.transport.unixSocket import UnixSocketSession
 
+selectors_select = selectors.DefaultSelector.select
+
 PATH = '/tmp/test_socket.sock'
 
 class TestUnixSocket(unittest.TestCase):
@@ -35,3 +39,57 @@ class TestUnixSocket(unittest.TestCase):
         session = UnixSocketSession(MagicMock())
         session.connect(path=PATH)
         self.assertTrue(session.connected)
+
+    @unittest.skipIf(sys.platform.startswith('win'), "Skipping on Windows")
+    def test_send_wakes_idle_session(self):
+        session = UnixSocketSession(MagicMock())
+        session._socket, peer = socket.socketpair()
+        session._connected = True
+        peer.settimeout(5)
+        timeouts = []
+
+        def select(selector, timeout=None):
+            timeouts.append(timeout)
+            return selectors_select(selector, timeout)
+
+        with patch('selectors.DefaultSelector.select', autospec=True,
+                   side_effect=select):
+            session.start()
+            session.send('<rpc/>')
+            self.assertEqual(peer.recv(4096), b'<rpc/>]]>]]>')
+            session.close()
+            session.join(5)
+        self.assertFalse(session.is_alive())
+        # an idle session blocks in select until it is woken up
+        self.assertIn(None, timeouts)
+        peer.close()
+
+    @unittest.skipIf(sys.platform.startswith('win'), "Skipping on Windows")
+    def test_write_interleaved_with_read(self):
+        # the peer only starts reading once its large reply has been read,
+        # so the upload must not keep the session from reading
+        session = UnixSocketSession(MagicMock())
+        session._socket, peer = socket.socketpair()
+        session._connected = True
+        peer.settimeout(5)
+        reply = '<rpc-reply>%s</rpc-reply>' % ('x' * (4 << 20))
+        upload = '<rpc>%s</rpc>' % ('y' * (4 << 20))
+        received = []
+        replied = threading.Event()
+        def dispatch(raw):
+            received.append(raw)
+            replied.set()
+        session._dispatch_message = dispatch
+        session.start()
+        session.send(upload)
+        peer.sendall(reply.encode() + b']]>]]>')
+        expected = len(upload) + len(']]>]]>')
+        data = bytearray()
+        while len(data) < expected:
+            data += peer.recv(expected - len(data))
+        self.assertEqual(bytes(data), upload.encode() + b']]>]]>')
+        self.assertTrue(replied.wait(5))
+        session.close()
+        session.join(5)
+        self.assertEqual(received, [reply.encode()])
+        peer.close()